@@ -1,1315 +1,88 @@
 import os
 import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from openai.types import CompletionUsage
 from db import db
+from encoding import encode
+from tool_registry import REGISTRY, ResultCache, cache_key, dispatch
+from budget import FALLBACK_ANSWER, TurnBudget
+from history import message_tokens
+from intents import answer as intent_answer
+from metrics import record_turn, turn_record
+from router import EXPAND_TOOL, needs_all_tools, select_tools, tools_tokens
+from scheduler import call_with_retry, call_with_retry_async
+from tools import TOOLS
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPEN_API_KEY"))
+# Model backend: "openai", or "mock" for the offline stand-in in mock_llm.py. Clients are
+# created on first use and reused, so connections are kept alive between requests;
+# set_client() replaces them (e.g. with a configured mock_llm.MockLLM)
+LLM_BACKEND = os.getenv("JARVIS_LLM_BACKEND", "openai")
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
 
-# Define tools that the AI can use
-TOOLS = [
-    {
-        "type": "function",
-        "function": {
-            "name": "get_events_this_week",
-            "description": "Get all events scheduled for this week",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_all_events",
-            "description": "Get all events in the calendar",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_todos_by_priority",
-            "description": "Get todos filtered by priority level (1=low to 5=high) and completion status",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "priority": {
-                        "type": "integer",
-                        "description": "Filter by priority level (1-5), omit for all priorities"
-                    },
-                    "completed": {
-                        "type": "boolean",
-                        "description": "Filter by completion status (default: false for incomplete todos)"
-                    }
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_overdue_todos",
-            "description": "Get all todos that are overdue and not yet completed",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_upcoming_todos",
-            "description": "Get todos due within a specified number of days",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "days": {
-                        "type": "integer",
-                        "description": "Number of days to look ahead (default: 7)"
-                    }
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_all_todos",
-            "description": "Get all incomplete todos, regardless of due date",
-            "parameters": {
-                "type": "object",
-                "properties": {}
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_goals",
-            "description": "Get all goals, optionally filtered by completion status",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "completed": {
-                        "type": "boolean",
-                        "description": "Filter by completion status (default: false for incomplete goals)"
-                    }
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_goal_details",
-            "description": "Get detailed information about a specific goal including attached todos and events",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "goal_id": {
-                        "type": "integer",
-                        "description": "The ID of the goal to retrieve"
-                    }
-                },
-                "required": ["goal_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_notes",
-            "description": "Get all notes",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_event",
-            "description": "Add a new event to the calendar",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Event title"
-                    },
-                    "date": {
-                        "type": "string",
-                        "description": "Event date in ISO format (e.g., 2026-02-08T14:00:00)"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "Event description (optional)"
-                    },
-                    "tags": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Tags for the event (optional)"
-                    }
-                },
-                "required": ["title", "date"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_todo",
-            "description": "Add a new todo item",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Todo title"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "Todo description (optional)"
-                    },
-                    "priority": {
-                        "type": "integer",
-                        "description": "Priority level 1-5 (1=low, 5=high). Default is 3."
-                    },
-                    "due_date": {
-                        "type": "string",
-                        "description": "Due date in ISO format (e.g., 2026-02-15T17:00:00) (optional)"
-                    },
-                    "tags": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Tags for the todo (optional)"
-                    }
-                },
-                "required": ["title"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_goal",
-            "description": "Add a new goal",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Goal title"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "Goal description (optional)"
-                    },
-                    "priority": {
-                        "type": "integer",
-                        "description": "Priority level 1-5 (1=low, 5=high). Default is 3."
-                    },
-                    "due_date": {
-                        "type": "string",
-                        "description": "Due date in ISO format (e.g., 2026-02-28T23:59:59) (optional)"
-                    },
-                    "tags": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Tags for the goal (optional)"
-                    }
-                },
-                "required": ["title"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_note",
-            "description": "Add a new note",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Note title"
-                    },
-                    "type": {
-                        "type": "string",
-                        "description": "Note type (e.g., 'general', 'idea', 'research', 'reminder')"
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "Note content"
-                    }
-                },
-                "required": ["title", "type", "content"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "delete_event",
-            "description": "Delete a specific event by ID",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "event_id": {
-                        "type": "integer",
-                        "description": "The ID of the event to delete"
-                    }
-                },
-                "required": ["event_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "delete_events_this_week",
-            "description": "Delete all events scheduled for this week",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "delete_todo",
-            "description": "Delete a specific todo by ID",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "todo_id": {
-                        "type": "integer",
-                        "description": "The ID of the todo to delete"
-                    }
-                },
-                "required": ["todo_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "delete_goal",
-            "description": "Delete a specific goal by ID",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "goal_id": {
-                        "type": "integer",
-                        "description": "The ID of the goal to delete"
-                    }
-                },
-                "required": ["goal_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "delete_note",
-            "description": "Delete a specific note by ID",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "note_id": {
-                        "type": "integer",
-                        "description": "The ID of the note to delete"
-                    }
-                },
-                "required": ["note_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "update_todo",
-            "description": "Update a todo's fields (title, description, priority, due date, tags, etc). Preserves all links and notes.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "todo_id": {
-                        "type": "integer",
-                        "description": "The ID of the todo to update"
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "New title (optional)"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "New description (optional)"
-                    },
-                    "priority": {
-                        "type": "integer",
-                        "description": "New priority 1-5 (optional)"
-                    },
-                    "due_date": {
-                        "type": "string",
-                        "description": "New due date in ISO format (optional)"
-                    },
-                    "tags": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "New tags (optional)"
-                    },
-                    "completed": {
-                        "type": "boolean",
-                        "description": "Mark as completed/incomplete (optional)"
-                    }
-                },
-                "required": ["todo_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "update_goal",
-            "description": "Update a goal's fields (title, description, priority, due date, tags, etc). Preserves all links and notes.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "goal_id": {
-                        "type": "integer",
-                        "description": "The ID of the goal to update"
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "New title (optional)"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "New description (optional)"
-                    },
-                    "priority": {
-                        "type": "integer",
-                        "description": "New priority 1-5 (optional)"
-                    },
-                    "due_date": {
-                        "type": "string",
-                        "description": "New due date in ISO format (optional)"
-                    },
-                    "tags": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "New tags (optional)"
-                    },
-                    "completed": {
-                        "type": "boolean",
-                        "description": "Mark as completed/incomplete (optional)"
-                    }
-                },
-                "required": ["goal_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "update_event",
-            "description": "Update an event's fields (title, description, date, tags, etc). Preserves all links and notes.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "event_id": {
-                        "type": "integer",
-                        "description": "The ID of the event to update"
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "New title (optional)"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "New description (optional)"
-                    },
-                    "date": {
-                        "type": "string",
-                        "description": "New date in ISO format (optional)"
-                    },
-                    "tags": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "New tags (optional)"
-                    }
-                },
-                "required": ["event_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "link_todo_to_goal",
-            "description": "Link a todo to a goal, indicating the todo contributes to the goal",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "todo_id": {
-                        "type": "integer",
-                        "description": "The ID of the todo to link"
-                    },
-                    "goal_id": {
-                        "type": "integer",
-                        "description": "The ID of the goal"
-                    }
-                },
-                "required": ["todo_id", "goal_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "link_todo_to_todo",
-            "description": "Link a todo to another todo as a subtask or related task",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "parent_todo_id": {
-                        "type": "integer",
-                        "description": "The ID of the parent todo"
-                    },
-                    "subtask_id": {
-                        "type": "integer",
-                        "description": "The ID of the subtask"
-                    }
-                },
-                "required": ["parent_todo_id", "subtask_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "link_event_to_goal",
-            "description": "Link an event to a goal, indicating the event contributes to the goal",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "event_id": {
-                        "type": "integer",
-                        "description": "The ID of the event to link"
-                    },
-                    "goal_id": {
-                        "type": "integer",
-                        "description": "The ID of the goal"
-                    }
-                },
-                "required": ["event_id", "goal_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "link_todo_to_event",
-            "description": "Link a todo to an event, indicating they are related",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "todo_id": {
-                        "type": "integer",
-                        "description": "The ID of the todo"
-                    },
-                    "event_id": {
-                        "type": "integer",
-                        "description": "The ID of the event"
-                    }
-                },
-                "required": ["todo_id", "event_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "link_goal_to_goal",
-            "description": "Link a goal to another goal as a sub-goal",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "parent_goal_id": {
-                        "type": "integer",
-                        "description": "The ID of the parent goal"
-                    },
-                    "subgoal_id": {
-                        "type": "integer",
-                        "description": "The ID of the sub-goal"
-                    }
-                },
-                "required": ["parent_goal_id", "subgoal_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "link_todo_to_note",
-            "description": "Link a todo to a note for reference or documentation",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "todo_id": {
-                        "type": "integer",
-                        "description": "The ID of the todo"
-                    },
-                    "note_id": {
-                        "type": "integer",
-                        "description": "The ID of the note"
-                    }
-                },
-                "required": ["todo_id", "note_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "unlink_items",
-            "description": "Remove a link between two items",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "from_type": {
-                        "type": "string",
-                        "description": "Type of the source item (todo, goal, event, note)"
-                    },
-                    "from_id": {
-                        "type": "integer",
-                        "description": "ID of the source item"
-                    },
-                    "to_type": {
-                        "type": "string",
-                        "description": "Type of the target item (todo, goal, event, note)"
-                    },
-                    "to_id": {
-                        "type": "integer",
-                        "description": "ID of the target item"
-                    }
-                },
-                "required": ["from_type", "from_id", "to_type", "to_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_linked_items",
-            "description": "Get all items linked to a specific item",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "item_type": {
-                        "type": "string",
-                        "description": "Type of the item (todo, goal, event, note)"
-                    },
-                    "item_id": {
-                        "type": "integer",
-                        "description": "ID of the item"
-                    }
-                },
-                "required": ["item_type", "item_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_dependent_note",
-            "description": "Add a note attached to an event, todo, goal, or another note. The note will be deleted if the parent is deleted.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Note title"
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "Note content"
-                    },
-                    "parent_type": {
-                        "type": "string",
-                        "description": "Type of parent item (event, todo, goal, or note)"
-                    },
-                    "parent_id": {
-                        "type": "integer",
-                        "description": "ID of the parent item"
-                    }
-                },
-                "required": ["title", "content", "parent_type", "parent_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_dependent_notes",
-            "description": "Get dependent notes for a specific item",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "parent_type": {
-                        "type": "string",
-                        "description": "Type of parent item (event, todo, goal, note)"
-                    },
-                    "parent_id": {
-                        "type": "integer",
-                        "description": "ID of the parent item"
-                    }
-                },
-                "required": ["parent_type", "parent_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "delete_dependent_note",
-            "description": "Delete a dependent note by ID",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "note_id": {
-                        "type": "integer",
-                        "description": "The ID of the dependent note to delete"
-                    }
-                },
-                "required": ["note_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_todos_by_title",
-            "description": "Search for todos by title (partial match, case-insensitive)",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Title or part of title to search for"
-                    }
-                },
-                "required": ["title"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_goals_by_title",
-            "description": "Search for goals by title (partial match, case-insensitive)",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Title or part of title to search for"
-                    }
-                },
-                "required": ["title"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_events_by_title",
-            "description": "Search for events by title (partial match, case-insensitive)",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Title or part of title to search for"
-                    }
-                },
-                "required": ["title"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_todos_by_tag",
-            "description": "Search todos by tag (PRIMARY search method). Returns all todos with the specified tag.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "tag": {
-                        "type": "string",
-                        "description": "Tag to search for (case-insensitive, e.g., 'apartment', 'rent', 'urgent')"
-                    }
-                },
-                "required": ["tag"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_goals_by_tag",
-            "description": "Search goals by tag (PRIMARY search method). Returns all goals with the specified tag.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "tag": {
-                        "type": "string",
-                        "description": "Tag to search for (case-insensitive, e.g., 'apartment', 'rent', 'urgent')"
-                    }
-                },
-                "required": ["tag"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_events_by_tag",
-            "description": "Search events by tag (PRIMARY search method). Returns all events with the specified tag.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "tag": {
-                        "type": "string",
-                        "description": "Tag to search for (case-insensitive, e.g., 'apartment', 'rent', 'urgent')"
-                    }
-                },
-                "required": ["tag"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_all_by_tag",
-            "description": "Search todos, goals, and events by tag simultaneously (PRIMARY search method). Most efficient way to find all items related to a topic.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "tag": {
-                        "type": "string",
-                        "description": "Tag to search for across all item types (case-insensitive, e.g., 'apartment', 'rent', 'urgent')"
-                    }
-                },
-                "required": ["tag"]
-            }
-        }
-    }
-]
+def _create_client(asynchronous: bool):
+    if LLM_BACKEND == "mock":
+        from mock_llm import AsyncMockLLM, MockLLM
+        return AsyncMockLLM() if asynchronous else MockLLM()
+    if LLM_BACKEND == "openai":
+        # Retries are left to scheduler.call_with_retry, which also applies the shared rate limits
+        return (AsyncOpenAI if asynchronous else OpenAI)(api_key=os.getenv("OPEN_API_KEY"), max_retries=0,
+                                                         timeout=REQUEST_TIMEOUT)
+    raise ValueError(f"Unknown LLM backend: {LLM_BACKEND} (expected 'openai' or 'mock')")
 
-def execute_function(function_name: str, function_args: dict, debug: bool = False) -> str:
-    """Execute a function and return the result as a string."""
-    if debug:
-        print(f"\n  [DEBUG] Executing function: {function_name}")
-        print(f"  [DEBUG] Arguments: {json.dumps(function_args, indent=2)}")
-    
-    if function_name == "get_events_this_week":
-        result = db.get_events_this_week()
-    elif function_name == "get_all_events":
-        result = db.get_all_events()
-    elif function_name == "get_todos_by_priority":
-        priority = function_args.get("priority")
-        completed = function_args.get("completed", False)
-        result = db.get_todos_by_priority(priority, completed)
-    elif function_name == "get_overdue_todos":
-        result = db.get_overdue_todos()
-    elif function_name == "get_upcoming_todos":
-        days = function_args.get("days", 7)
-        result = db.get_upcoming_todos(days)
-    elif function_name == "get_all_todos":
-        result = db.get_all_todos()
-    elif function_name == "get_goals":
-        completed = function_args.get("completed", False)
-        result = db.get_goals(completed)
-    elif function_name == "get_goal_details":
-        goal_id = function_args.get("goal_id")
-        result = db.get_goal_details(goal_id)
-    elif function_name == "get_notes":
-        result = db.get_notes()
-    elif function_name == "add_event":
-        try:
-            date = function_args.get("date")
-            dt = datetime.fromisoformat(date) if date else None
-            result = db.add_event(
-                title=function_args.get("title"),
-                date=dt,
-                description=function_args.get("description", ""),
-                tags=function_args.get("tags", [])
-            )
-            result = {"success": True, "event": db._serialize_event(result), "message": f"Event '{function_args.get('title')}' added successfully"}
-        except ValueError as e:
-            result = {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-10T14:00:00)"}
-    elif function_name == "add_todo":
-        try:
-            due_date = function_args.get("due_date")
-            due_dt = datetime.fromisoformat(due_date) if due_date else None
-            result = db.add_todo(
-                title=function_args.get("title"),
-                description=function_args.get("description", ""),
-                priority=function_args.get("priority", 3),
-                due_date=due_dt,
-                tags=function_args.get("tags", [])
-            )
-            result = {"success": True, "todo": db._serialize_todo(result), "message": f"Todo '{function_args.get('title')}' added successfully"}
-        except ValueError as e:
-            result = {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-15T17:00:00)"}
-    elif function_name == "add_goal":
-        try:
-            due_date = function_args.get("due_date")
-            due_dt = datetime.fromisoformat(due_date) if due_date else None
-            result = db.add_goal(
-                title=function_args.get("title"),
-                description=function_args.get("description", ""),
-                priority=function_args.get("priority", 3),
-                due_date=due_dt,
-                tags=function_args.get("tags", [])
-            )
-            result = {"success": True, "goal": db._serialize_goal(result), "message": f"Goal '{function_args.get('title')}' added successfully"}
-        except ValueError as e:
-            result = {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-28T23:59:59)"}
-    elif function_name == "add_note":
-        result = db.add_note(
-            title=function_args.get("title"),
-            type=function_args.get("type"),
-            content=function_args.get("content")
-        )
-        result = {"success": True, "note": db._serialize_note(result), "message": f"Note '{function_args.get('title')}' added successfully"}
-    elif function_name == "delete_event":
-        event_id = function_args.get("event_id")
-        success = db.delete_event(event_id)
-        if success:
-            result = {"success": True, "message": f"Event {event_id} deleted successfully"}
-        else:
-            result = {"success": False, "message": f"Event {event_id} not found"}
-    elif function_name == "delete_events_this_week":
-        count = db.delete_events_this_week()
-        result = {"success": True, "message": f"Deleted {count} event(s) from this week's schedule"}
-    elif function_name == "delete_todo":
-        todo_id = function_args.get("todo_id")
-        success = db.delete_todo(todo_id)
-        if success:
-            result = {"success": True, "message": f"Todo {todo_id} deleted successfully"}
-        else:
-            result = {"success": False, "message": f"Todo {todo_id} not found"}
-    elif function_name == "delete_goal":
-        goal_id = function_args.get("goal_id")
-        success = db.delete_goal(goal_id)
-        if success:
-            result = {"success": True, "message": f"Goal {goal_id} deleted successfully"}
-        else:
-            result = {"success": False, "message": f"Goal {goal_id} not found"}
-    elif function_name == "delete_note":
-        note_id = function_args.get("note_id")
-        success = db.delete_note(note_id)
-        if success:
-            result = {"success": True, "message": f"Note {note_id} deleted successfully"}
-        else:
-            result = {"success": False, "message": f"Note {note_id} not found"}
-    elif function_name == "update_todo":
-        try:
-            todo_id = function_args.get("todo_id")
-            due_date = function_args.get("due_date")
-            due_dt = datetime.fromisoformat(due_date) if due_date else None
-            updated_todo = db.update_todo(
-                todo_id=todo_id,
-                title=function_args.get("title"),
-                description=function_args.get("description"),
-                priority=function_args.get("priority"),
-                due_date=due_dt,
-                tags=function_args.get("tags"),
-                completed=function_args.get("completed")
-            )
-            if updated_todo:
-                result = {"success": True, "todo": updated_todo, "message": f"Todo {todo_id} updated successfully"}
-            else:
-                result = {"success": False, "message": f"Todo {todo_id} not found"}
-        except ValueError as e:
-            result = {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-15T17:00:00)"}
-    elif function_name == "update_goal":
-        try:
-            goal_id = function_args.get("goal_id")
-            due_date = function_args.get("due_date")
-            due_dt = datetime.fromisoformat(due_date) if due_date else None
-            updated_goal = db.update_goal(
-                goal_id=goal_id,
-                title=function_args.get("title"),
-                description=function_args.get("description"),
-                priority=function_args.get("priority"),
-                due_date=due_dt,
-                tags=function_args.get("tags"),
-                completed=function_args.get("completed")
-            )
-            if updated_goal:
-                result = {"success": True, "goal": updated_goal, "message": f"Goal {goal_id} updated successfully"}
-            else:
-                result = {"success": False, "message": f"Goal {goal_id} not found"}
-        except ValueError as e:
-            result = {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-28T23:59:59)"}
-    elif function_name == "update_event":
-        try:
-            event_id = function_args.get("event_id")
-            date = function_args.get("date")
-            dt = datetime.fromisoformat(date) if date else None
-            updated_event = db.update_event(
-                event_id=event_id,
-                title=function_args.get("title"),
-                description=function_args.get("description"),
-                date=dt,
-                tags=function_args.get("tags")
-            )
-            if updated_event:
-                result = {"success": True, "event": updated_event, "message": f"Event {event_id} updated successfully"}
-            else:
-                result = {"success": False, "message": f"Event {event_id} not found"}
-        except ValueError as e:
-            result = {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-10T14:00:00)"}
-    elif function_name == "link_todo_to_goal":
-        todo_id = function_args.get("todo_id")
-        goal_id = function_args.get("goal_id")
-        todo = next((t for t in db.todos if t.id == todo_id), None)
-        goal = next((g for g in db.goals if g.id == goal_id), None)
-        if todo and goal:
-            db.create_link('goal', goal_id, 'todo', todo_id)
-            result = {"success": True, "message": f"Linked todo '{todo.title}' to goal '{goal.title}'"}
-        else:
-            result = {"success": False, "message": f"Todo {todo_id} or Goal {goal_id} not found"}
-    elif function_name == "link_todo_to_todo":
-        parent_todo_id = function_args.get("parent_todo_id")
-        subtask_id = function_args.get("subtask_id")
-        parent = next((t for t in db.todos if t.id == parent_todo_id), None)
-        subtask = next((t for t in db.todos if t.id == subtask_id), None)
-        if parent and subtask:
-            db.create_link('todo', parent_todo_id, 'todo', subtask_id)
-            result = {"success": True, "message": f"Linked '{subtask.title}' as subtask of '{parent.title}'"}
-        else:
-            result = {"success": False, "message": f"Todo {parent_todo_id} or Todo {subtask_id} not found"}
-    elif function_name == "link_event_to_goal":
-        event_id = function_args.get("event_id")
-        goal_id = function_args.get("goal_id")
-        event = next((e for e in db.events if e.id == event_id), None)
-        goal = next((g for g in db.goals if g.id == goal_id), None)
-        if event and goal:
-            db.create_link('goal', goal_id, 'event', event_id)
-            result = {"success": True, "message": f"Linked event '{event.title}' to goal '{goal.title}'"}
-        else:
-            result = {"success": False, "message": f"Event {event_id} or Goal {goal_id} not found"}
-    elif function_name == "link_todo_to_event":
-        todo_id = function_args.get("todo_id")
-        event_id = function_args.get("event_id")
-        todo = next((t for t in db.todos if t.id == todo_id), None)
-        event = next((e for e in db.events if e.id == event_id), None)
-        if todo and event:
-            db.create_link('todo', todo_id, 'event', event_id)
-            result = {"success": True, "message": f"Linked todo '{todo.title}' to event '{event.title}'"}
-        else:
-            result = {"success": False, "message": f"Todo {todo_id} or Event {event_id} not found"}
-    elif function_name == "link_goal_to_goal":
-        parent_goal_id = function_args.get("parent_goal_id")
-        subgoal_id = function_args.get("subgoal_id")
-        parent_goal = next((g for g in db.goals if g.id == parent_goal_id), None)
-        subgoal = next((g for g in db.goals if g.id == subgoal_id), None)
-        if parent_goal and subgoal:
-            db.create_link('goal', parent_goal_id, 'goal', subgoal_id)
-            result = {"success": True, "message": f"Linked '{subgoal.title}' as sub-goal of '{parent_goal.title}'"}
-        else:
-            result = {"success": False, "message": f"Goal {parent_goal_id} or Goal {subgoal_id} not found"}
-    elif function_name == "link_todo_to_note":
-        todo_id = function_args.get("todo_id")
-        note_id = function_args.get("note_id")
-        todo = next((t for t in db.todos if t.id == todo_id), None)
-        note = next((n for n in db.notes if n.id == note_id), None)
-        if todo and note:
-            db.create_link('todo', todo_id, 'note', note_id)
-            result = {"success": True, "message": f"Linked todo '{todo.title}' to note '{note.title}'"}
-        else:
-            result = {"success": False, "message": f"Todo {todo_id} or Note {note_id} not found"}
-    elif function_name == "unlink_items":
-        from_type = function_args.get("from_type")
-        from_id = function_args.get("from_id")
-        to_type = function_args.get("to_type")
-        to_id = function_args.get("to_id")
-        # Find the link
-        link = next((l for l in db.links if l.from_type == from_type and l.from_id == from_id 
-                     and l.to_type == to_type and l.to_id == to_id), None)
-        if link:
-            success = db.delete_link(link.id)
-            if success:
-                result = {"success": True, "message": f"Unlinked {from_type} {from_id} from {to_type} {to_id}"}
-            else:
-                result = {"success": False, "message": "Error removing link"}
-        else:
-            result = {"success": False, "message": f"No link found between {from_type} {from_id} and {to_type} {to_id}"}
-    elif function_name == "get_linked_items":
-        item_type = function_args.get("item_type")
-        item_id = function_args.get("item_id")
-        
-        # Create lookup dictionaries for O(1) access instead of O(n)
-        todo_map = {t.id: t for t in db.todos}
-        goal_map = {g.id: g for g in db.goals}
-        event_map = {e.id: e for e in db.events}
-        note_map = {n.id: n for n in db.notes}
-        
-        # Get all outgoing links from this item
-        outgoing = db.get_links_from(item_type, item_id)
-        
-        # Get all incoming links to this item
-        incoming = db.get_links_to(item_type, item_id)
-        
-        # Serialize the results
-        result_outgoing = []
-        for link in outgoing:
-            item = None
-            if link.to_type == 'todo':
-                item = todo_map.get(link.to_id)
-            elif link.to_type == 'goal':
-                item = goal_map.get(link.to_id)
-            elif link.to_type == 'event':
-                item = event_map.get(link.to_id)
-            elif link.to_type == 'note':
-                item = note_map.get(link.to_id)
-            
-            if item:
-                result_outgoing.append({
-                    "relationship": f"{item_type} -> {link.to_type}",
-                    "type": link.to_type,
-                    "id": link.to_id,
-                    "title": getattr(item, 'title', 'N/A')
-                })
-        
-        result_incoming = []
-        for link in incoming:
-            item = None
-            if link.from_type == 'todo':
-                item = todo_map.get(link.from_id)
-            elif link.from_type == 'goal':
-                item = goal_map.get(link.from_id)
-            elif link.from_type == 'event':
-                item = event_map.get(link.from_id)
-            elif link.from_type == 'note':
-                item = note_map.get(link.from_id)
-            
-            if item:
-                result_incoming.append({
-                    "relationship": f"{link.from_type} -> {item_type}",
-                    "type": link.from_type,
-                    "id": link.from_id,
-                    "title": getattr(item, 'title', 'N/A')
-                })
-        
-        result = {
-            "item": {
-                "type": item_type,
-                "id": item_id
-            },
-            "links_from": result_outgoing,
-            "links_to": result_incoming
-        }
-    elif function_name == "add_dependent_note":
-        title = function_args.get("title")
-        content = function_args.get("content")
-        parent_type = function_args.get("parent_type")
-        parent_id = function_args.get("parent_id")
-        # Try to attach the dependent note. If the parent id is invalid, return candidate matches
-        # so the caller (AI) can confirm the correct id before retrying.
-        try:
-            note = db.add_dependent_note(title, content, parent_type, parent_id)
-            result = {"success": True, "note": {
-                "id": note.id,
-                "title": note.title,
-                "content": note.content,
-                "parent_type": note.parent_type,
-                "parent_id": note.parent_id
-            }, "message": f"Note '{title}' attached to {parent_type} {parent_id}"}
-        except ValueError as e:
-            # Parent not found — gather candidate matches by tag first (preferred),
-            # then fall back to title-based matches. Return candidates so the caller
-            # (AI) can confirm the correct id before retrying.
-            candidates = {}
+def get_client():
+    """The chat-completions client used by ask_ai (and the summarizer)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = _create_client(asynchronous=False)
+        return _client
 
-            # Build simple token candidates from title/content to use as tag searches.
-            tag_tokens = []
-            def extract_tokens(text: str):
-                tokens = []
-                for part in text.replace('/', ' ').replace('-', ' ').split():
-                    t = ''.join(ch for ch in part if ch.isalnum()).lower()
-                    if len(t) >= 3 and not t.isnumeric():
-                        tokens.append(t)
-                return tokens
+def get_async_client():
+    """The async chat-completions client used by ask_ai_async."""
+    global _async_client
+    with _client_lock:
+        if _async_client is None:
+            _async_client = _create_client(asynchronous=True)
+        return _async_client
 
-            if title:
-                tag_tokens.extend(extract_tokens(title))
-            if content:
-                tag_tokens.extend(extract_tokens(content))
+def set_client(client=None, async_client=None):
+    """
+    Use the given clients for every model call. Anything with the interface of
+    OpenAI() / AsyncOpenAI() works, e.g. mock_llm.MockLLM() / AsyncMockLLM().
+    A client left as None is created from LLM_BACKEND again on next use.
+    """
+    global _client, _async_client
+    with _client_lock:
+        _client = client
+        _async_client = async_client
 
-            # Deduplicate while preserving order, limit to first 6 tokens
-            seen_tokens = []
-            for tk in tag_tokens:
-                if tk not in seen_tokens:
-                    seen_tokens.append(tk)
-            tag_tokens = seen_tokens[:6]
+MODEL = "gpt-4o-mini"
 
-            # Try tag-based searches across all types (preferred)
-            tag_matches = {}
-            try:
-                for tk in tag_tokens:
-                    res = db.search_all_by_tag(tk)
-                    # Only include tokens that returned something
-                    if any(res.values()):
-                        tag_matches[tk] = res
-            except Exception:
-                tag_matches = {}
+# Offer only the tool groups relevant to each message (see router.py) instead of every tool
+ROUTE_TOOLS = True
 
-            # If no tag matches found, fall back to title-based searches using short phrases
-            title_matches = {}
-            if not tag_matches:
-                # Build short title phrases (title and first sentence fragment)
-                search_terms = []
-                if title:
-                    search_terms.append(title)
-                if content:
-                    first_sentence = content.split('.', 1)[0]
-                    if first_sentence and first_sentence not in search_terms:
-                        search_terms.append(first_sentence[:40])
+# Answer common questions ("what's overdue?") locally when they clearly match an intent in intents.py
+FAST_PATH = True
+LOCAL_USAGE = CompletionUsage(prompt_tokens=0, completion_tokens=0, total_tokens=0)  # Usage of a local answer
 
-                try:
-                    if parent_type == 'todo':
-                        matches = []
-                        for t in search_terms:
-                            matches.extend(db.search_todos_by_title(t))
-                        title_matches['todos_by_title'] = matches
-                    elif parent_type == 'goal':
-                        matches = []
-                        for t in search_terms:
-                            matches.extend(db.search_goals_by_title(t))
-                        title_matches['goals_by_title'] = matches
-                    elif parent_type == 'event':
-                        matches = []
-                        for t in search_terms:
-                            matches.extend(db.search_events_by_title(t))
-                        title_matches['events_by_title'] = matches
-                    else:
-                        matches_t = []
-                        matches_g = []
-                        matches_e = []
-                        for t in search_terms:
-                            matches_t.extend(db.search_todos_by_title(t))
-                            matches_g.extend(db.search_goals_by_title(t))
-                            matches_e.extend(db.search_events_by_title(t))
-                        title_matches = {
-                            'todos_by_title': matches_t,
-                            'goals_by_title': matches_g,
-                            'events_by_title': matches_e
-                        }
-                except Exception:
-                    title_matches = {}
+# Limits for ask_ai_async, in seconds
+REQUEST_TIMEOUT = 60.0  # One completion request, streaming included
+TURN_TIMEOUT = 180.0  # A whole turn: every request and tool call
 
-            # Combine candidates preferring tag matches
-            if tag_matches:
-                candidates['by_tag'] = tag_matches
-            if title_matches:
-                candidates['by_title'] = title_matches
-
-            result = {
-                "success": False,
-                "message": str(e),
-                "hint": "Parent id not found. Confirm the correct parent id before retrying, or pick from candidates.",
-                "candidates": candidates
-            }
-    elif function_name == "get_dependent_notes":
-        parent_type = function_args.get("parent_type")
-        parent_id = function_args.get("parent_id")
-        notes = db.get_dependent_notes(parent_type, parent_id)
-        result = {"notes": notes}
-    elif function_name == "delete_dependent_note":
-        note_id = function_args.get("note_id")
-        success = db.delete_dependent_note(note_id)
-        if success:
-            result = {"success": True, "message": f"Dependent note {note_id} deleted successfully"}
-        else:
-            result = {"success": False, "message": f"Dependent note {note_id} not found"}
-    elif function_name == "search_todos_by_title":
-        title = function_args.get("title")
-        result = db.search_todos_by_title(title)
-    elif function_name == "search_goals_by_title":
-        title = function_args.get("title")
-        result = db.search_goals_by_title(title)
-    elif function_name == "search_events_by_title":
-        title = function_args.get("title")
-        result = db.search_events_by_title(title)
-    elif function_name == "search_todos_by_tag":
-        tag = function_args.get("tag")
-        result = db.search_todos_by_tag(tag)
-    elif function_name == "search_goals_by_tag":
-        tag = function_args.get("tag")
-        result = db.search_goals_by_tag(tag)
-    elif function_name == "search_events_by_tag":
-        tag = function_args.get("tag")
-        result = db.search_events_by_tag(tag)
-    elif function_name == "search_all_by_tag":
-        tag = function_args.get("tag")
-        result = db.search_all_by_tag(tag)
-    else:
-        result = {"error": f"Unknown function: {function_name}"}
-    
-    if debug:
-        result_preview = str(result)[:200] + "..." if len(str(result)) > 200 else str(result)
-        print(f"  [DEBUG] Result: {result_preview}")
-    
-    return json.dumps(result, default=str)
-
-def ask_ai(user_input: str, debug: bool = False, messages_history: list = None) -> tuple[str, dict]:
-    """
-    Sends a user message to GPT with function calling capabilities.
-    The AI can call functions to access specific data as needed.
-    Supports multi-turn conversations for clarifying questions.
-    
-    Args:
-        user_input: The user's message
-        debug: Whether to print debug information
-        messages_history: Optional list of previous conversation messages to provide context
-    
-    Returns:
-        Tuple of (AI response, usage info)
-    """
-    if debug:
-        print(f"\n[DEBUG] User query: {user_input}")
-        print("[DEBUG] Sending to AI with available tools...")
-    
-    # Get current date for context
-    today = datetime.now().strftime("%A, %B %d, %Y")
-    
-    # Comprehensive system prompt - sent with every request to maintain consistency
-    system_prompt = f"""You are Jarvis, an intelligent personal assistant specializing in task management, goal tracking, and calendar organization.
+# Static instructions, sent first in every request. Keep this (and TOOLS) byte-stable:
+# anything that varies between requests belongs in _context_message(), or it defeats
+# the provider's prompt caching of the shared prefix.
+SYSTEM_PROMPT = """You are Jarvis, an intelligent personal assistant specializing in task management, goal tracking, and calendar organization.
 
 Your role is to help users manage their:
 - Events and calendar
@@ -1318,7 +91,7 @@ Your role is to help users manage their:
 - Notes and information
 
 Guidelines:
-1. Today's date is {today}. Use this to interpret relative dates like 'tomorrow', 'next week', 'this weekend', etc.
+1. Today's date is given in the context message just before the user's latest message. Use it to interpret relative dates like 'tomorrow', 'next week', 'this weekend', etc.
 2. When users provide incomplete information that is ambiguous or unclear, ask clarifying questions instead of making assumptions. Otherwise, attempt to fulfill the request without asking unnecessary questions.
 3. Be concise and friendly in your responses.
 4. When creating items (events, todos, goals, notes), confirm what you've created with a brief summary.
@@ -1329,90 +102,612 @@ Guidelines:
 9. IMPORTANT: Dependent notes are automatically included in all query results for events, todos, and goals (they appear in a 'notes' field). When presenting these items to the user, actively look for and mention any attached notes if they provide relevant context or important information. Integrate note information naturally into your response.
 10. CRITICAL: When a user asks to modify an item (e.g., "change the due date", "add a tag", "update priority"), ALWAYS use the update_todo, update_goal, or update_event functions. NEVER delete and recreate items, as this breaks all links and relationships. The update functions preserve all connections while changing only the specified fields.
 11. WHEN REFERENCING ITEMS: If the user refers to an item by name, description, or natural language (not by explicit ID), DO NOT call `add_dependent_note` or `update_*` directly. First call the appropriate search tool(s) (`search_all_by_tag`, `search_todos_by_tag`, `search_goals_by_tag`, `search_events_by_tag`, or title-based searches) to find candidate items, confirm the correct `id` with the user if ambiguous, then call the add/update tool with the confirmed numeric `id`.
+12. Tool results are compact: empty fields are left out, lists of items may come as "columns" and "rows", and long lists are cut short with the "total" count and a note. Never present a cut-short list as complete; give the total or narrow the query.
 
 Ethos:
 - Your goal is to assist users in staying organized, productive, and on top of their commitments.
 - In this spirit, feel free to make suggestions to improve their schedule, prioritize tasks, or remind them of important deadlines."""
+
+# Read-only tool calls of one round run concurrently on this pool
+TOOL_WORKERS = 4
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="jarvis-tool")
+
+# Send tool results to the model in the compact form of encoding.py (False: plain JSON)
+COMPACT_RESULTS = True
+
+# Results of read-only tools, reused until the database changes (or the entry expires)
+tool_cache = ResultCache()
+
+# Per-call timings of the most recent ask_ai turn (ask_ai_async keeps its own):
+# [{name, tool_call_id, ms, chars, parallel, cached}]
+last_tool_timings = []
+
+# Latency and token usage of each request in the most recent ask_ai turn:
+# [{ms, retries, prompt_tokens, cached_tokens, completion_tokens, tools_offered, tool_tokens_saved}]
+last_request_usage = []
+
+def _preview(text: str) -> str:
+    return text[:200] + "..." if len(text) > 200 else text
+
+def _run_tool(function_name: str, function_args: dict) -> tuple[str, bool]:
+    """Run a tool, or reuse a cached result. Returns (encoded result, whether it came from the cache)."""
+    if function_name == EXPAND_TOOL:
+        # Handled by the conversation loop, which offers every tool in the next request
+        return json.dumps({"success": True, "message": "All tools are available now"}), False
+    key = cache_key(function_name, function_args, db.version)
+    if key is not None:
+        content = tool_cache.get(key)
+        if content is not None:
+            return content, True
+    content = encode(dispatch(function_name, function_args), COMPACT_RESULTS)
+    if key is not None:
+        tool_cache.put(key, content)
+    return content, False
+
+def execute_function(function_name: str, function_args: dict, debug: bool = False) -> str:
+    """Execute a function and return the result as a string."""
+    if debug:
+        print(f"\n  [DEBUG] Executing function: {function_name}")
+        print(f"  [DEBUG] Arguments: {json.dumps(function_args, indent=2)}")
     
-    # Initialize messages with system context
+    result, cached = _run_tool(function_name, function_args)
+    
+    if debug:
+        print(f"  [DEBUG] Result{' (cached)' if cached else ''}: {_preview(result)}")
+    
+    return result
+
+def _timed(function_name: str, function_args: dict, lock) -> tuple[str, bool, float]:
+    """Run a tool under a database lock (db.lock.read or db.lock.write) and time it."""
+    start = time.perf_counter()
+    with lock():
+        content, cached = _run_tool(function_name, function_args)
+    return content, cached, (time.perf_counter() - start) * 1000
+
+def execute_tool_calls(tool_calls: list, debug: bool = False, timings: list = None) -> list:
+    """
+    Execute one round of tool calls and return their tool messages in call order.
+
+    Consecutive read-only calls run concurrently, each under the database read lock
+    (a lone read-only call runs directly, also under the read lock). Any other call is
+    a barrier: it runs alone under the write lock, after every call
+    before it and before every call after it, so mutations apply in the order the
+    model asked for them. Read-only results are served from tool_cache when possible.
+
+    Args:
+        tool_calls: Tool calls as sent back to the API ({"id", "function": {"name", "arguments"}})
+        debug: Whether to print debug information
+        timings: List to append per-call timings to (default: last_tool_timings)
+    """
+    if timings is None:
+        timings = last_tool_timings
+    calls = [(tc["function"]["name"], json.loads(tc["function"]["arguments"] or "{}")) for tc in tool_calls]
+    results = [None] * len(calls)
+    i = 0
+    while i < len(calls):
+        # Collect the run of read-only calls starting at i
+        j = i
+        while j < len(calls) and getattr(REGISTRY.get(calls[j][0]), "read_only", False):
+            j += 1
+        
+        if j - i > 1:
+            futures = [_tool_pool.submit(_timed, name, args, db.lock.read) for name, args in calls[i:j]]
+            for k, future in enumerate(futures, start=i):
+                results[k] = (*future.result(), True)
+        else:
+            # A lone read still only needs the read lock; mutations take the write lock
+            lock = db.lock.read if j > i else db.lock.write
+            j = i + 1
+            results[i] = (*_timed(*calls[i], lock), False)
+        i = j
+    
+    messages = []
+    for tc, (name, args), (content, cached, ms, parallel) in zip(tool_calls, calls, results):
+        timings.append({"name": name, "tool_call_id": tc["id"], "ms": round(ms, 3), "chars": len(content),
+                        "parallel": parallel, "cached": cached})
+        if debug:
+            how = ", ".join(label for label, flag in (("parallel", parallel), ("cached", cached)) if flag)
+            print(f"\n  [DEBUG] Executed function: {name} ({ms:.1f} ms{', ' + how if how else ''})")
+            print(f"  [DEBUG] Arguments: {json.dumps(args, indent=2)}")
+            print(f"  [DEBUG] Result: {_preview(content)}")
+        messages.append({"role": "tool", "tool_call_id": tc["id"], "content": content})
+    return messages
+
+def _tool_call_dicts(tool_calls) -> list:
+    """Tool calls of a response message in the format sent back to the API."""
+    return [
+        {
+            "id": tc.id,
+            "type": tc.type,
+            "function": {
+                "name": tc.function.name,
+                "arguments": tc.function.arguments
+            }
+        }
+        for tc in tool_calls or []
+    ]
+
+class _StreamedReply:
+    """Assembles a streamed completion from its chunks."""
+    
+    def __init__(self, on_delta):
+        self.on_delta = on_delta
+        self.content = []
+        self.calls = {}  # Tool call index -> call being assembled from its deltas
+        self.finish_reason = None
+        self.usage = None
+    
+    def feed(self, chunk):
+        if chunk.usage:
+            self.usage = chunk.usage  # Sent in a final chunk without choices
+        if not chunk.choices:
+            return
+        choice = chunk.choices[0]
+        delta = choice.delta
+        if delta.content:
+            self.content.append(delta.content)
+            self.on_delta(delta.content)
+        for tc in delta.tool_calls or []:
+            # The first delta of a call carries its id and name; later ones append argument fragments
+            call = self.calls.setdefault(tc.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function and tc.function.name:
+                call["function"]["name"] += tc.function.name
+            if tc.function and tc.function.arguments:
+                call["function"]["arguments"] += tc.function.arguments
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+    
+    def result(self) -> tuple:
+        tool_calls = [self.calls[i] for i in sorted(self.calls)]
+        return "".join(self.content) or None, tool_calls, self.finish_reason, self.usage
+
+def _request_args(messages: list, stream: bool, tools: list, tool_choice: str = "auto") -> dict:
+    args = {"model": MODEL, "messages": messages, "tools": tools, "tool_choice": tool_choice}
+    if stream:
+        args.update(stream=True, stream_options={"include_usage": True})
+    return args
+
+def _rate_limited(client) -> bool:
+    """Whether requests to this client go through the shared rate limits (not for an in-process mock)."""
+    return getattr(client, "rate_limited", True)
+
+def _prompt_tokens(messages: list, tools: list) -> int:
+    """Estimated prompt tokens of a request, charged to the shared token rate limit."""
+    return sum(message_tokens(m) for m in messages) + tools_tokens(tools)
+
+def _complete(messages: list, on_delta=None, tools: list = TOOLS, tool_choice: str = "auto", on_retry=None) -> tuple:
+    """
+    Request one completion offering the given tools, streamed if on_delta is given.
+    With tool_choice="none" the model must answer without calling them. Rate limits,
+    timeouts and server errors are retried (see scheduler.py), calling on_retry first.
+
+    Returns:
+        Tuple of (content, tool calls in API message format, finish reason, usage)
+    """
+    client = get_client()
+    create, limit = client.chat.completions.create, _rate_limited(client)
+    tokens = _prompt_tokens(messages, tools)
+    if on_delta is None:
+        response = call_with_retry(lambda: create(**_request_args(messages, False, tools, tool_choice)),
+                                   tokens, on_retry=on_retry, limit=limit)
+        message = response.choices[0].message
+        return message.content, _tool_call_dicts(message.tool_calls), response.choices[0].finish_reason, response.usage
+    
+    reply = _StreamedReply(on_delta)
+    stream = call_with_retry(lambda: create(**_request_args(messages, True, tools, tool_choice)), tokens,
+                             on_retry=on_retry, limit=limit)
+    for chunk in stream:
+        reply.feed(chunk)
+    return reply.result()
+
+async def _complete_async(messages: list, on_delta=None, tools: list = TOOLS, tool_choice: str = "auto",
+                          on_retry=None) -> tuple:
+    """Async version of _complete on the AsyncOpenAI client."""
+    client = get_async_client()
+    create, limit = client.chat.completions.create, _rate_limited(client)
+    tokens = _prompt_tokens(messages, tools)
+    if on_delta is None:
+        response = await call_with_retry_async(lambda: create(**_request_args(messages, False, tools, tool_choice)),
+                                               tokens, on_retry=on_retry, limit=limit)
+        message = response.choices[0].message
+        return message.content, _tool_call_dicts(message.tool_calls), response.choices[0].finish_reason, response.usage
+    
+    reply = _StreamedReply(on_delta)
+    stream = await call_with_retry_async(lambda: create(**_request_args(messages, True, tools, tool_choice)),
+                                         tokens, on_retry=on_retry, limit=limit)
+    async for chunk in stream:
+        reply.feed(chunk)
+    return reply.result()
+
+def _retry_logger(retries: list, debug: bool):
+    """on_retry callback that counts the retries of a request (and prints them in debug mode)."""
+    def on_retry(attempt: int, error: Exception, delay: float):
+        retries.append(delay)
+        if debug:
+            print(f"[DEBUG] Request failed ({type(error).__name__}: {error}); retry {attempt} in {delay:.1f}s")
+    return on_retry
+
+def _request(messages: list, first_token, tools: list, requests: list, tool_choice: str = "auto",
+             debug: bool = False) -> tuple:
+    """_complete, timed, with its latency, retries and usage appended to requests."""
+    retries = []
+    start = time.perf_counter()
+    reply = _complete(messages, first_token, tools, tool_choice, _retry_logger(retries, debug))
+    _record_usage(reply[3], requests, tools, (time.perf_counter() - start) * 1000, len(retries))
+    return reply
+
+async def _request_async(messages: list, first_token, tools: list, requests: list, tool_choice: str = "auto",
+                         debug: bool = False) -> tuple:
+    """Async version of _request."""
+    retries = []
+    start = time.perf_counter()
+    reply = await _complete_async(messages, first_token, tools, tool_choice, _retry_logger(retries, debug))
+    _record_usage(reply[3], requests, tools, (time.perf_counter() - start) * 1000, len(retries))
+    return reply
+
+def _context_message() -> dict:
+    """Volatile context (today's date, a summary of the user's data), sent after the cacheable prefix."""
+    today = datetime.now().strftime("%A, %B %d, %Y")
+    summary = db.summary()
+    return {"role": "system", "content": (
+        f"Today's date is {today}. The user currently has {summary['open_todos']} open todo(s) "
+        f"({summary['overdue_todos']} overdue), {summary['open_goals']} open goal(s) and "
+        f"{summary['events_next_7_days']} event(s) in the next 7 days."
+    )}
+
+def _build_messages(user_input: str, messages_history: list = None) -> list:
+    """
+    Messages for a new turn, ordered for provider-side prompt caching: the static system
+    prompt (and the static TOOLS sent alongside it) and the previous conversation form a
+    prefix that is identical from request to request; the context that changes between
+    turns comes last, just before the new user message.
+    """
     messages = [
-        {"role": "system", "content": system_prompt}
+        {"role": "system", "content": SYSTEM_PROMPT}
     ]
     
     # Add previous conversation history if provided
     if messages_history:
         messages.extend(messages_history)
     
+    messages.append(_context_message())
+    
     # Add the current user message
     messages.append({"role": "user", "content": user_input})
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        tools=TOOLS,
-        tool_choice="auto"
-    )
+    return messages
+
+def _record_usage(usage, requests: list, tools: list, ms: float, retries: int = 0):
+    """
+    Append one request's latency, retries and token counts: prompt tokens served from the provider's
+    cache, and the (estimated) tool schema tokens saved by offering a routed subset of TOOLS.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    requests.append({
+        "ms": round(ms, 1),
+        "retries": retries,
+        "prompt_tokens": usage.prompt_tokens if usage else 0,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        "completion_tokens": usage.completion_tokens if usage else 0,
+        "tools_offered": len(tools),
+        "tool_tokens_saved": tools_tokens(TOOLS) - tools_tokens(tools),
+    })
+
+def _turn_usage(requests: list) -> CompletionUsage:
+    """Token usage summed over every request of a turn."""
+    prompt = sum(r["prompt_tokens"] for r in requests)
+    completion = sum(r["completion_tokens"] for r in requests)
+    return CompletionUsage(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+def _print_summary(final_response: str, usage, first_token_ms, timings: list, requests: list):
+    print(f"\n[DEBUG] AI finished. Final response length: {len(final_response)} characters")
+    print(f"[DEBUG] Tokens used - Input: {usage.prompt_tokens}, Output: {usage.completion_tokens}")
+    if requests:
+        cached = sum(r["cached_tokens"] for r in requests)
+        saved = sum(r["tool_tokens_saved"] for r in requests)
+        request_ms = sum(r["ms"] for r in requests)
+        print(f"[DEBUG] {len(requests)} request(s) in {request_ms:.0f} ms: {cached} of {usage.prompt_tokens} prompt tokens "
+              f"served from the prompt cache, ~{saved} tool schema tokens saved by routing")
+    if first_token_ms is not None:
+        print(f"[DEBUG] First token after {first_token_ms:.0f} ms")
+    if timings:
+        total = sum(t["ms"] for t in timings)
+        hits = sum(1 for t in timings if t["cached"])
+        print(f"[DEBUG] {len(timings)} tool call(s), {total:.1f} ms of tool time, {hits} cache hit(s)")
+
+def _print_tool_calls(tool_calls: list):
+    print(f"[DEBUG] AI decided to call {len(tool_calls)} function(s):")
+    for tool_call in tool_calls:
+        print(f"  - {tool_call['function']['name']}")
+
+class _FirstToken:
+    """
+    Wraps a turn's on_delta callback to record the time to the first streamed token. Text
+    streamed before a round of tool calls stays on screen, so the next round's text is
+    set off from it by a blank line.
+    """
+    
+    def __init__(self, on_delta):
+        self.on_delta = on_delta
+        self.start = time.perf_counter()
+        self.ms = None
+        self.round_text = False  # Text was streamed in the current round
+        self.separate = False  # Start the next text with a blank line
+    
+    def __call__(self, text):
+        if self.ms is None:
+            self.ms = (time.perf_counter() - self.start) * 1000
+        if self.separate:
+            text = "\n\n" + text
+            self.separate = False
+        self.round_text = True
+        self.on_delta(text)
+    
+    def end_round(self):
+        """The current round ended in tool calls; later text belongs to the next one."""
+        self.separate = self.separate or self.round_text
+        self.round_text = False
+
+SUMMARY_PROMPT = ("Summarize this conversation between a user and their assistant Jarvis in at most 120 words. "
+                  "Keep the facts, decisions, item titles and IDs, and open questions that later messages may refer to.")
+
+def summarize_conversation(previous_summary: str, messages: list) -> str:
+    """Summarizer for ConversationHistory: fold old messages into the running summary with a model call."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    if previous_summary:
+        transcript = f"Summary so far: {previous_summary}\n{transcript}"
+    request = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": transcript}
+    ]
+    client = get_client()
+    response = call_with_retry(lambda: client.chat.completions.create(model=MODEL, messages=request, max_tokens=300),
+                               _prompt_tokens(request, []), limit=_rate_limited(client))
+    return (response.choices[0].message.content or "").strip()
+
+def _fast_answer(user_input: str, debug: bool, timings: list):
+    """The local answer to a message (see intents.py) and its intent, or None if the model should handle it."""
+    if not FAST_PATH:
+        return None
+    start = time.perf_counter()
+    
+    def run_tool(name, args):
+        # The raw result: the templates need every item, not the compact encoding sent to the model
+        tool_start = time.perf_counter()
+        with db.lock.read():
+            result = dispatch(name, args)
+        ms = (time.perf_counter() - tool_start) * 1000
+        timings.append({"name": name, "tool_call_id": None, "ms": round(ms, 3), "chars": 0,
+                        "parallel": False, "cached": False})
+        return result
     
+    found = intent_answer(user_input, run_tool)
+    if found is None:
+        return None
     if debug:
-        print(f"[DEBUG] Initial response finish_reason: {response.choices[0].finish_reason}")
+        print(f"[DEBUG] Answered locally (intent '{found[1].name}') in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return found
+
+def _record_turn(mode: str, start: float, requests: list, timings: list, first_token=None,
+                 fast_path: str = None, error: str = None, budget: TurnBudget = None):
+    """Write the metrics record of a turn that started at start (time.perf_counter())."""
+    record_turn(turn_record(mode, (time.perf_counter() - start) * 1000, list(requests), list(timings),
+                            streamed=first_token is not None, first_token_ms=first_token and first_token.ms,
+                            fast_path=fast_path, error=error, budget_hit=budget and budget.hit))
+
+def ask_ai(user_input: str, debug: bool = False, messages_history: list = None, on_delta=None,
+           budget: TurnBudget = None) -> tuple[str, dict]:
+    """
+    Sends a user message to GPT with function calling capabilities.
+    The AI can call functions to access specific data as needed.
+    Supports multi-turn conversations for clarifying questions.
     
-    # Process tool calls in a loop until the AI finishes
-    while response.choices[0].finish_reason == "tool_calls":
-        assistant_message = response.choices[0].message
+    Args:
+        user_input: The user's message
+        debug: Whether to print debug information
+        messages_history: Optional list of previous conversation messages to provide context
+        on_delta: Optional callback; if given, the response is streamed and each piece of
+            text is passed to it as it arrives (from the calling thread)
+        budget: Limits of the tool loop (default: TurnBudget() with the limits in budget.py).
+            When one is nearly reached, the model is asked for a final answer without tools
+    
+    Returns:
+        Tuple of (AI response, token usage summed over every request of the turn)
+    """
+    if debug:
+        print(f"\n[DEBUG] User query: {user_input}")
+        print("[DEBUG] Sending to AI with available tools...")
+    
+    start = time.perf_counter()
+    last_tool_timings.clear()
+    last_request_usage.clear()
+    first_token = _FirstToken(on_delta) if on_delta else None
+    budget = budget or TurnBudget()
+    
+    try:
+        local = _fast_answer(user_input, debug, last_tool_timings)
+        if local is not None:
+            text, intent = local
+            if first_token:
+                first_token(text)
+            _record_turn("sync", start, last_request_usage, last_tool_timings, first_token, fast_path=intent.name)
+            return text, LOCAL_USAGE
         
-        if debug:
-            print(f"[DEBUG] AI decided to call {len(assistant_message.tool_calls)} function(s):")
-            for tool_call in assistant_message.tool_calls:
-                print(f"  - {tool_call.function.name}")
+        messages = _build_messages(user_input, messages_history)
+        tools = select_tools(user_input) if ROUTE_TOOLS else TOOLS
+        
+        content, tool_calls, finish_reason, usage = _request(messages, first_token, tools, last_request_usage, debug=debug)
+        budget.spend(last_request_usage[-1])
         
-        # Append the assistant message with tool calls
-        messages.append({
-            "role": "assistant",
-            "content": assistant_message.content,
-            "tool_calls": [
-                {
-                    "id": tc.id,
-                    "type": tc.type,
-                    "function": {
-                        "name": tc.function.name,
-                        "arguments": tc.function.arguments
-                    }
-                }
-                for tc in assistant_message.tool_calls
-            ]
-        })
+        if debug:
+            print(f"[DEBUG] Initial response finish_reason: {finish_reason}")
         
-        # Process each tool call and add results
-        for tool_call in assistant_message.tool_calls:
-            function_name = tool_call.function.name
-            function_args = json.loads(tool_call.function.arguments)
-            function_result = execute_function(function_name, function_args, debug=debug)
+        # Process tool calls in a loop until the AI finishes
+        while finish_reason == "tool_calls":
+            if debug:
+                _print_tool_calls(tool_calls)
+            if first_token:
+                first_token.end_round()
             
-            # Add tool result as a separate message
+            # Append the assistant message with tool calls
             messages.append({
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "content": function_result
+                "role": "assistant",
+                "content": content,
+                "tool_calls": tool_calls
             })
+            
+            # Execute the tool calls (read-only ones in parallel) and add one result message each, in order
+            messages.extend(execute_tool_calls(tool_calls, debug=debug))
+            
+            # The routed subset was missing something: offer every tool from now on
+            if needs_all_tools(tool_calls, tools):
+                tools = TOOLS
+                if debug:
+                    print("[DEBUG] Switching to the full tool set")
+            
+            # Nearly out of budget: the next response must be the final answer
+            tool_choice = "auto"
+            if budget.check():
+                tool_choice = "none"
+                messages.append(budget.note())
+                if debug:
+                    print(f"[DEBUG] Turn budget reached ({budget.hit}), asking for a final answer")
+            
+            if debug:
+                print("[DEBUG] Requesting AI response with tool results...")
+            
+            # Get next response from AI
+            content, tool_calls, finish_reason, usage = _request(messages, first_token, tools, last_request_usage,
+                                                                 tool_choice, debug)
+            budget.spend(last_request_usage[-1])
+            
+            if debug:
+                print(f"[DEBUG] Response finish_reason: {finish_reason}")
+            if budget.hit:
+                break
+    except Exception as e:
+        _record_turn("sync", start, last_request_usage, last_tool_timings, first_token,
+                     error=type(e).__name__, budget=budget)
+        raise
+    
+    final_response = content or (FALLBACK_ANSWER if budget.hit else "")
+    if first_token and final_response and not content:
+        first_token(final_response)  # The fallback wasn't streamed by the model
+    usage = _turn_usage(last_request_usage)
+    
+    if debug:
+        _print_summary(final_response, usage, first_token and first_token.ms, last_tool_timings, last_request_usage)
+    
+    _record_turn("sync", start, last_request_usage, last_tool_timings, first_token, budget=budget)
+    return final_response, usage
+
+async def ask_ai_async(user_input: str, debug: bool = False, messages_history: list = None, on_delta=None,
+                       request_timeout: float = REQUEST_TIMEOUT, turn_timeout: float = TURN_TIMEOUT,
+                       budget: TurnBudget = None) -> tuple[str, dict]:
+    """
+    Async version of ask_ai on the AsyncOpenAI client. Conversations don't share any
+    per-turn state, so any number of them can run concurrently on one event loop.
+    
+    Cancelling the task stops the turn at its next await: a pending request is
+    aborted, and tool calls already running in worker threads finish (the database
+    stays consistent) but their results are discarded.
+    
+    Args:
+        user_input, debug, messages_history, on_delta, budget: As for ask_ai (on_delta is called on the event loop)
+        request_timeout: Seconds allowed for each completion request, streaming included
+        turn_timeout: Seconds allowed for the whole turn, tool calls included
+    
+    Returns:
+        Tuple of (AI response, token usage summed over every request of the turn)
+    
+    Raises:
+        TimeoutError: A request or the whole turn took too long
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + turn_timeout
+    
+    async def bounded(awaitable, limit=None):
+        """Await with the given limit, or with what is left of the turn if that is sooner."""
+        remaining = deadline - loop.time()
+        timeout = remaining if limit is None else min(limit, remaining)
+        try:
+            return await asyncio.wait_for(awaitable, max(timeout, 0))
+        except asyncio.TimeoutError:
+            if limit is not None and limit <= remaining:
+                raise TimeoutError(f"No response from the AI within {limit:g} seconds") from None
+            raise TimeoutError(f"The AI did not finish answering within {turn_timeout:g} seconds") from None
+    
+    if debug:
+        print(f"\n[DEBUG] User query: {user_input}")
+        print("[DEBUG] Sending to AI with available tools...")
+    
+    start = time.perf_counter()
+    timings = []
+    requests = []
+    first_token = _FirstToken(on_delta) if on_delta else None
+    budget = budget or TurnBudget()
+    
+    try:
+        local = await loop.run_in_executor(None, _fast_answer, user_input, debug, timings)
+        if local is not None:
+            text, intent = local
+            if first_token:
+                first_token(text)
+            _record_turn("async", start, requests, timings, first_token, fast_path=intent.name)
+            return text, LOCAL_USAGE
         
-        if debug:
-            print("[DEBUG] Requesting AI response with tool results...")
+        messages = await loop.run_in_executor(None, _build_messages, user_input, messages_history)
+        tools = select_tools(user_input) if ROUTE_TOOLS else TOOLS
         
-        # Get next response from AI
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            tools=TOOLS,
-            tool_choice="auto"
-        )
+        content, tool_calls, finish_reason, usage = await bounded(
+            _request_async(messages, first_token, tools, requests, debug=debug), request_timeout)
+        budget.spend(requests[-1])
         
-        if debug:
-            print(f"[DEBUG] Response finish_reason: {response.choices[0].finish_reason}")
+        while finish_reason == "tool_calls":
+            if debug:
+                _print_tool_calls(tool_calls)
+            if first_token:
+                first_token.end_round()
+            
+            messages.append({
+                "role": "assistant",
+                "content": content,
+                "tool_calls": tool_calls
+            })
+            
+            # Tools use the blocking Database, so they run in the default executor
+            messages.extend(await bounded(loop.run_in_executor(None, execute_tool_calls, tool_calls, debug, timings)))
+            if needs_all_tools(tool_calls, tools):
+                tools = TOOLS
+            
+            tool_choice = "auto"
+            if budget.check():
+                tool_choice = "none"
+                messages.append(budget.note())
+                if debug:
+                    print(f"[DEBUG] Turn budget reached ({budget.hit}), asking for a final answer")
+            
+            content, tool_calls, finish_reason, usage = await bounded(
+                _request_async(messages, first_token, tools, requests, tool_choice, debug), request_timeout)
+            budget.spend(requests[-1])
+            
+            if debug:
+                print(f"[DEBUG] Response finish_reason: {finish_reason}")
+            if budget.hit:
+                break
+    except (Exception, asyncio.CancelledError) as e:
+        _record_turn("async", start, requests, timings, first_token, error=type(e).__name__, budget=budget)
+        raise
     
-    final_response = response.choices[0].message.content
+    final_response = content or (FALLBACK_ANSWER if budget.hit else "")
+    if first_token and final_response and not content:
+        first_token(final_response)  # The fallback wasn't streamed by the model
+    usage = _turn_usage(requests)
     
     if debug:
-        print(f"\n[DEBUG] AI finished. Final response length: {len(final_response)} characters")
-        print(f"[DEBUG] Tokens used - Input: {response.usage.prompt_tokens}, Output: {response.usage.completion_tokens}")
+        _print_summary(final_response, usage, first_token and first_token.ms, timings, requests)
     
-    return final_response, response.usage
+    _record_turn("async", start, requests, timings, first_token, budget=budget)
+    return final_response, usage
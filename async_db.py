@@ -0,0 +1,57 @@
+"""
+asyncio facade over the Database.
+
+Every query and mutation of the wrapped Database is exposed as a coroutine with
+the same name and arguments. Calls run in an executor so serialization and disk
+writes never block the event loop. They go through the Database's own
+readers-writer lock, so queries run concurrently, mutations are serialized, and
+async and synchronous callers share one set of entities and indexes.
+
+Example:
+    adb = AsyncDatabase()
+    todos, events = await asyncio.gather(adb.get_overdue_todos(), adb.get_events_this_week())
+    await adb.add_todo("Pay rent", "", 4)
+"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Optional
+from db import Database, db as default_db
+
+
+class AsyncDatabase:
+    def __init__(self, database: Optional[Database] = None, executor: Optional[Executor] = None):
+        """
+        Args:
+            database: Database to wrap (default: the global instance from db.py)
+            executor: Executor for blocking calls (default: the event loop's default executor)
+        """
+        self.db = database or default_db
+        self._executor = executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Run any blocking callable in the executor (e.g. several Database calls that belong together)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    @property
+    def version(self) -> int:
+        return self.db.version
+
+    def subscribe(self, callback):
+        """Subscribe to the wrapped Database's change feed (see Database.subscribe)."""
+        return self.db.subscribe(callback)
+
+
+def _make_coroutine(name: str, method):
+    @functools.wraps(method)
+    async def coroutine(self, *args, **kwargs):
+        return await self.run(getattr(self.db, name), *args, **kwargs)
+    return coroutine
+
+
+# Mirror every locked query and mutation of Database as a coroutine
+for _name, _method in vars(Database).items():
+    if getattr(_method, 'lock_mode', None) in ('read', 'write') and _name not in ('load', 'commit'):
+        setattr(AsyncDatabase, _name, _make_coroutine(_name, _method))
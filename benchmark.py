@@ -0,0 +1,259 @@
+"""
+Scaling benchmark for the Database layer.
+
+For each size, synthetic data (see datagen.py) is written to a temporary file and
+timed through load, save, every get_*/search_* query, duplicate checks, scheduling,
+id allocation and the cascade deletes. The tokens each query result would take
+in the model's context are also counted, as plain JSON and in the compact tool
+result encoding of encoding.py (with and without the list cap). The JSON report records the commit and
+environment, so reports from different commits can be compared.
+
+Usage:
+    python benchmark.py --sizes 1000,10000,100000 --output bench.json
+    python benchmark.py --sizes 10000 --compare bench-before.json
+    python benchmark.py --sizes 1000 --tokens --output bench.json
+"""
+
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from datagen import generate
+from db import Database
+from encoding import compact, encode
+from history import estimate_tokens
+from storage import write_snapshot
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 5
+
+
+def _measure(fn: Callable, repeat: int) -> dict:
+    """Time `repeat` calls of fn (after one untimed warm-up call) in milliseconds."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3), 'runs': repeat}
+
+
+def _measure_each(fn: Callable, args: list) -> dict:
+    """Time one call of fn per argument (for operations that can't be repeated, like deletes)."""
+    times = []
+    for arg in args:
+        gc.collect()
+        start = time.perf_counter()
+        fn(arg)
+        times.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3), 'runs': len(times)}
+
+
+def _most_linked(database: Database, entity_type: str, count: int) -> List[int]:
+    """IDs of the items with the most links and dependent notes, i.e. the most expensive to delete."""
+    degree = {}
+    for link in database.links:
+        for kind, item_id in ((link.from_type, link.from_id), (link.to_type, link.to_id)):
+            if kind == entity_type:
+                degree[item_id] = degree.get(item_id, 0) + 1
+    for note in database.dependent_notes:
+        if note.parent_type == entity_type:
+            degree[note.parent_id] = degree.get(note.parent_id, 0) + 1
+    return sorted(degree, key=lambda i: -degree[i])[:count]
+
+
+def _queries(database: Database, now: datetime) -> Dict[str, Callable]:
+    """A representative call for every public query of the Database."""
+    goal_id = _most_linked(database, 'goal', 1)[0]
+    todo_id = _most_linked(database, 'todo', 1)[0]
+    event_id = database.events[len(database.events) // 2].id
+    week = (now, now + timedelta(days=7))
+    queries = {
+        'get_events_this_week': lambda: database.get_events_this_week(),
+        'get_events_between': lambda: database.get_events_between(*week),
+        'get_events_overlapping': lambda: database.get_events_overlapping(*week),
+        'get_event_conflicts': lambda: database.get_event_conflicts(now, now + timedelta(days=30)),
+        'get_conflicts_for_event': lambda: database.get_conflicts_for_event(event_id),
+        'get_all_events': lambda: database.get_all_events(),
+        'get_todos_by_priority': lambda: database.get_todos_by_priority(5),
+        'get_overdue_todos': lambda: database.get_overdue_todos(),
+        'get_all_todos': lambda: database.get_all_todos(),
+        'get_upcoming_todos': lambda: database.get_upcoming_todos(7),
+        'get_goals': lambda: database.get_goals(),
+        'get_goal_details': lambda: database.get_goal_details(goal_id),
+        'get_notes': lambda: database.get_notes(),
+        'get_dependent_notes': lambda: database.get_dependent_notes('todo', todo_id),
+        'get_links_from': lambda: database.get_links_from('goal', goal_id),
+        'get_links_to': lambda: database.get_links_to('todo', todo_id),
+        'get_related_todos': lambda: database.get_related_todos('goal', goal_id),
+        'get_related_goals': lambda: database.get_related_goals('todo', todo_id),
+        'get_related_events': lambda: database.get_related_events('goal', goal_id),
+        'get_parent_goal': lambda: database.get_parent_goal(todo_id),
+        'search_todos_by_title': lambda: database.search_todos_by_title('report'),
+        'search_goals_by_title': lambda: database.search_goals_by_title('launch'),
+        'search_events_by_title': lambda: database.search_events_by_title('standup'),
+        'search_todos_by_tag': lambda: database.search_todos_by_tag('work'),
+        'search_goals_by_tag': lambda: database.search_goals_by_tag('work'),
+        'search_events_by_tag': lambda: database.search_events_by_tag('work'),
+        'search_all_by_tag': lambda: database.search_all_by_tag('urgent'),
+        'find_duplicates': lambda: database.find_duplicates('todo', 'Finish the quarterly report'),
+        'find_free_slots': lambda: database.find_free_slots(now, now + timedelta(days=30)),
+        'propose_schedule': lambda: database.propose_schedule(now, now + timedelta(days=30)),
+    }
+    # Fail loudly when a query is added to the Database without a benchmark case
+    missing = [name for name, _ in inspect.getmembers(Database, inspect.isfunction)
+               if name.startswith(('get_', 'search_')) and name not in queries]
+    if missing:
+        raise RuntimeError(f"No benchmark case for {', '.join(missing)}")
+    return queries
+
+
+def encoding_tokens(queries: Dict[str, Callable]) -> Dict[str, dict]:
+    """
+    Tokens of each query's result as plain JSON vs the compact encoding sent to the model.
+    Queries returning model objects (links, related items) are skipped: tools only send
+    the dicts built from them.
+    """
+    report = {}
+    for name, query in queries.items():
+        result = query()
+        if not isinstance(result, dict) and not (isinstance(result, list) and all(isinstance(r, dict) for r in result)):
+            continue
+        result = json.loads(json.dumps(result, default=str))
+        plain = estimate_tokens(encode(result, compact_mode=False))
+        uncapped = estimate_tokens(json.dumps(compact(result, max_items=sys.maxsize), separators=(',', ':')))
+        capped = estimate_tokens(encode(result))
+        report[name] = {'json_tokens': plain, 'compact_tokens': uncapped, 'compact_capped_tokens': capped,
+                        'saved_pct': round(100 * (1 - uncapped / plain), 1) if plain else 0.0}
+    return report
+
+
+def bench_size(size: int, seed: int, repeat: int, workdir: str) -> dict:
+    """Run every benchmark against a fresh database of about `size` entities."""
+    now = datetime.now().replace(second=0, microsecond=0)
+    data = generate(size, seed, now)
+    path = os.path.join(workdir, f'bench-{size}.json')
+    file_bytes = write_snapshot(path, data)['bytes']
+    del data
+
+    results = {}
+    results['open'] = _measure_each(Database, [path])
+    database = Database(path)
+    counts = {kind: len(getattr(database, kind)) for kind in
+              ('notes', 'dependent_notes', 'todos', 'goals', 'events', 'links')}
+    results['load'] = _measure(database.load, repeat)
+    results['save'] = _measure(database.save, repeat)
+    queries = _queries(database, now)
+    for name, query in queries.items():
+        results[name] = _measure(query, repeat)
+    encoding = encoding_tokens(queries)
+
+    # ID allocation: a scan of every ID (first insert after load) vs the cached maximum
+    def new_id_cold():
+        database._last_ids.pop('todo', None)
+        database._new_id('todo', database.todos)
+    results['new_id_cold'] = _measure(new_id_cold, repeat)
+    results['new_id_cached'] = _measure(lambda: database._new_id('todo', database.todos), repeat)
+    results['add_todo'] = _measure(lambda: database.add_todo('Benchmark todo', '', 3), repeat)
+
+    # Cascade deletes of the most connected items (each one saves, as in normal use)
+    results['delete_goal'] = _measure_each(database.delete_goal, _most_linked(database, 'goal', repeat))
+    results['delete_todo'] = _measure_each(database.delete_todo, _most_linked(database, 'todo', repeat))
+    results['delete_event'] = _measure_each(database.delete_event, _most_linked(database, 'event', repeat))
+    results['delete_events_this_week'] = _measure_each(lambda _: database.delete_events_this_week(), [None])
+    return {'counts': counts, 'file_bytes': file_bytes, 'results': results, 'encoding': encoding}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, seed: int = 0, repeat: int = DEFAULT_REPEAT, progress=print) -> dict:
+    """Benchmark every size and return the report."""
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            progress(f"Benchmarking {size} entities...")
+            report['sizes'][str(size)] = bench_size(size, seed, repeat, workdir)
+    return report
+
+
+def compare(old: dict, new: dict) -> List[str]:
+    """Lines comparing median times of two reports (ratio > 1 means the new run is slower)."""
+    lines = [f"Comparing {old['meta'].get('commit')} -> {new['meta'].get('commit')}",
+             f"{'size':>8}  {'benchmark':<28} {'old ms':>10} {'new ms':>10} {'ratio':>7}"]
+    for size, entry in new['sizes'].items():
+        old_results = old['sizes'].get(size, {}).get('results', {})
+        for name, result in entry['results'].items():
+            if name not in old_results:
+                continue
+            before, after = old_results[name]['median_ms'], result['median_ms']
+            ratio = after / before if before else float('inf')
+            flag = '  slower' if ratio > 1.2 else ('  faster' if ratio < 0.8 else '')
+            lines.append(f"{size:>8}  {name:<28} {before:>10.3f} {after:>10.3f} {ratio:>6.2f}x{flag}")
+    return lines
+
+
+def encoding_table(report: dict) -> List[str]:
+    """Lines summarizing the per-query token counts of a report."""
+    lines = [f"{'size':>8}  {'query':<28} {'json':>9} {'compact':>9} {'capped':>9} {'saved':>7}"]
+    for size, entry in report['sizes'].items():
+        for name, tokens in entry.get('encoding', {}).items():
+            lines.append(f"{size:>8}  {name:<28} {tokens['json_tokens']:>9} {tokens['compact_tokens']:>9} "
+                         f"{tokens['compact_capped_tokens']:>9} {tokens['saved_pct']:>6.1f}%")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Database at several sizes')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated entity counts (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', help='Earlier report to compare against')
+    parser.add_argument('--tokens', action='store_true', help='Also print the tool result token table')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    report = run(sizes, args.seed, args.repeat, progress=lambda m: print(m, file=sys.stderr))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.tokens:
+        print('\n'.join(encoding_table(report)), file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            print('\n'.join(compare(json.load(f), report)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
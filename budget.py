@@ -0,0 +1,75 @@
+"""
+Per-turn budget for the tool loop of ask_ai.
+
+Without a limit, a confused model can keep calling tools for dozens of rounds. A
+TurnBudget caps a turn's tool rounds, wall time and tokens (prompt + completion,
+summed over its requests). Before each follow-up request the loop asks whether the
+budget would be exceeded by one more request like the last one; if so, that request
+is sent with tool_choice="none" and a note asking the model to answer with what it
+has, and the turn ends with that answer. The limit that was hit is recorded in the
+turn's metrics.
+"""
+
+import time
+from typing import Optional
+
+MAX_TOOL_ROUNDS = 8  # Rounds of tool calls per turn
+MAX_TURN_SECONDS = 60.0  # Wall time per turn (ask_ai_async's turn_timeout is the hard limit)
+MAX_TURN_TOKENS = 60000  # Prompt + completion tokens per turn
+
+FINAL_ANSWER_NOTE = ("The tool budget for this request is used up ({reason}). Do not call any more tools: "
+                     "answer now with the information gathered so far, and say briefly what you could not finish.")
+FALLBACK_ANSWER = "Sorry, I couldn't finish this request within its limits. Could you narrow it down?"
+
+REASONS = {
+    'rounds': "too many rounds of tool calls",
+    'time': "running out of time",
+    'tokens': "running out of tokens",
+}
+
+
+class TurnBudget:
+    """Limits of one turn of the tool loop, and what has been spent so far."""
+
+    def __init__(self, max_rounds: int = MAX_TOOL_ROUNDS, max_seconds: float = MAX_TURN_SECONDS,
+                 max_tokens: int = MAX_TURN_TOKENS):
+        self.max_rounds = max_rounds
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.start = time.perf_counter()
+        self.rounds = 0
+        self.tokens = 0
+        self.last_request_tokens = 0
+        self.last_request_seconds = 0.0
+        self.hit: Optional[str] = None  # The limit that ended the turn early: 'rounds', 'time' or 'tokens'
+
+    def spend(self, request: dict):
+        """Account for one completion request ({ms, prompt_tokens, completion_tokens, ...})."""
+        self.last_request_tokens = request["prompt_tokens"] + request["completion_tokens"]
+        self.last_request_seconds = request["ms"] / 1000
+        self.tokens += self.last_request_tokens
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def check(self) -> Optional[str]:
+        """
+        Called after each round of tool calls. Returns the limit one more request like the
+        last one would exceed ('rounds', 'time' or 'tokens'), or None if the model may keep
+        calling tools. A non-None result is also kept in self.hit.
+        """
+        self.rounds += 1
+        if self.rounds >= self.max_rounds:
+            self.hit = 'rounds'
+        elif self.elapsed() + self.last_request_seconds > self.max_seconds:
+            self.hit = 'time'
+        elif self.tokens + self.last_request_tokens > self.max_tokens:
+            self.hit = 'tokens'
+        return self.hit
+
+    def note(self) -> dict:
+        """System message asking for a final answer, sent with the last request."""
+        return {"role": "system", "content": FINAL_ANSWER_NOTE.format(reason=REASONS[self.hit])}
+
+    def report(self) -> dict:
+        return {"rounds": self.rounds, "tokens": self.tokens, "hit": self.hit}
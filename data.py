@@ -1,6 +1,22 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
+
+
+def normalize_tags(tags: Optional[List[str]]) -> List[str]:
+    """Normalize tag list to lowercase, trimmed, and deduplicated while preserving order."""
+    if not tags:
+        return []
+    seen = set()
+    normalized = []
+    for t in tags:
+        if not isinstance(t, str):
+            continue
+        s = t.strip().lower()
+        if s and s not in seen:
+            seen.add(s)
+            normalized.append(s)
+    return normalized
 
 @dataclass
 class Note:
@@ -20,6 +36,20 @@ class DependentNote:
     parent_id: int    # ID of the parent entity
     created_at: datetime = field(default_factory=datetime.now)
 
+@dataclass
+class Recurrence:
+    """Repeat rule for an event or todo. Occurrences are generated on demand, never stored."""
+    freq: str  # 'daily', 'weekly', 'monthly', or 'yearly'
+    interval: int = 1  # Repeat every `interval` periods
+    until: Optional[datetime] = None  # Last possible occurrence start
+    count: Optional[int] = None  # Total number of occurrences
+    # Per-occurrence overrides keyed by the occurrence's original start (ISO format).
+    # None cancels that occurrence; a dict replaces serialized fields (e.g. {'date': ..., 'title': ...})
+    exceptions: dict[str, Optional[dict]] = field(default_factory=dict)
+    # Start of the series when it differs from the item's own date: a recurring todo's due date
+    # advances as occurrences are completed, while its occurrences stay anchored here
+    anchor: Optional[datetime] = None
+
 @dataclass
 class ToDo:
     id: int
@@ -31,6 +61,7 @@ class ToDo:
     start_date: Optional[datetime] = None
     tags: list[str] = field(default_factory=list)
     created_at: datetime = field(default_factory=datetime.now)
+    recurrence: Optional[Recurrence] = None  # Repeats relative to due_date
 
 @dataclass
 class Goal:
@@ -47,9 +78,11 @@ class Goal:
 class Event:
     id: int
     title: str
-    date: datetime
+    date: datetime  # Start time
     description: str = ""
     tags: list[str] = field(default_factory=list)
+    end: Optional[datetime] = None
+    recurrence: Optional[Recurrence] = None  # Repeats relative to date
 
 @dataclass
 class Link:
@@ -66,4 +99,12 @@ class Link:
     from_id: int
     to_type: str    # 'goal', 'todo', 'event', 'note'
     to_id: int
-    created_at: datetime = field(default_factory=datetime.now)
\ No newline at end of file
+    created_at: datetime = field(default_factory=datetime.now)
+
+@dataclass
+class Change:
+    """A committed change to a single entity, delivered to Database subscribers."""
+    entity_type: str  # 'note', 'dependent_note', 'todo', 'goal', 'event', or 'link'
+    entity_id: int
+    operation: str    # 'add', 'update', or 'delete'
+    fields: list[str] = field(default_factory=list)  # Fields that changed (updates only)
@@ -0,0 +1,184 @@
+"""
+Seeded generator of realistic synthetic data for benchmarks and manual testing.
+
+The same seed and base date always produce the same data. Output is in db.json
+format (current schema version), so it can be written to a file and opened with
+Database(path).
+
+Usage:
+    python datagen.py 10000 --seed 1 --output /tmp/jarvis-10k.json
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+from migrations import SCHEMA_VERSION
+from storage import write_snapshot
+
+# Share of the generated entities per type
+MIX = {
+    'todos': 0.35,
+    'events': 0.25,
+    'goals': 0.05,
+    'notes': 0.10,
+    'dependent_notes': 0.10,
+    'links': 0.15,
+}
+
+VERBS = ['Finish', 'Review', 'Write', 'Plan', 'Call', 'Email', 'Prepare', 'Update', 'Fix', 'Book',
+         'Buy', 'Clean', 'Organize', 'Research', 'Submit', 'Schedule', 'Draft', 'Read', 'Pay', 'Renew']
+OBJECTS = ['report', 'presentation', 'budget', 'proposal', 'invoice', 'slides', 'blog post', 'roadmap',
+           'dentist appointment', 'car insurance', 'groceries', 'garage', 'taxes', 'newsletter',
+           'project plan', 'design doc', 'release notes', 'onboarding guide', 'flight', 'birthday gift']
+QUALIFIERS = ['', '', '', 'Q3', 'weekly', 'team', 'client', 'personal', 'draft', 'final']
+EVENT_TITLES = ['Team standup', 'Sprint planning', 'Retro', '1:1 with manager', 'Client call',
+                'Design review', 'Lunch with Sam', 'Gym', 'Dentist', 'Doctor appointment',
+                'All-hands', 'Interview', 'Workshop', 'Yoga class', 'Dinner with friends']
+GOAL_TITLES = ['Launch v{n}.0 release', 'Run a half marathon', 'Learn Spanish', 'Save ${n}k',
+               'Read {n} books', 'Ship the mobile app', 'Get promoted', 'Renovate the kitchen',
+               'Write a novel', 'Reach {n}k newsletter subscribers']
+TAGS = ['work', 'personal', 'health', 'finance', 'home', 'urgent', 'learning', 'family', 'errands', 'project']
+NOTE_TYPES = ['idea', 'meeting', 'journal', 'reference']
+SENTENCES = ['Follow up next week.', 'Blocked on feedback from the team.', 'Check the budget first.',
+             'See the shared folder for details.', 'Low effort, high impact.', 'Ask Alex about this.',
+             'Needs a second pair of eyes.', 'Remember to bring the documents.', 'Moved from last sprint.']
+
+
+def _text(rng: random.Random, max_sentences: int) -> str:
+    return ' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(0, max_sentences)))
+
+
+def _tags(rng: random.Random) -> list:
+    return rng.sample(TAGS, rng.choices([0, 1, 2, 3], weights=[2, 4, 3, 1])[0])
+
+
+def _priority(rng: random.Random) -> int:
+    return rng.choices([1, 2, 3, 4, 5], weights=[1, 2, 4, 2, 1])[0]
+
+
+def _work_time(rng: random.Random, day: datetime) -> datetime:
+    """A time on a 15-minute grid during working hours."""
+    return day.replace(hour=rng.randint(8, 17), minute=rng.choice([0, 15, 30, 45]), second=0, microsecond=0)
+
+
+def generate(size: int, seed: int = 0, base: Optional[datetime] = None) -> dict:
+    """
+    Generate about `size` entities (see MIX) in db.json format.
+
+    Args:
+        size: Total number of entities, links included
+        seed: Random seed; equal seeds and bases give identical data
+        base: Date the data is centered on (default: today at midnight)
+    """
+    rng = random.Random(seed)
+    base = (base or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    counts = {kind: max(1, int(size * share)) for kind, share in MIX.items()}
+
+    todos = []
+    for i in range(1, counts['todos'] + 1):
+        qualifier = rng.choice(QUALIFIERS)
+        title = ' '.join(w for w in (rng.choice(VERBS), qualifier, rng.choice(OBJECTS)) if w)
+        due = _work_time(rng, base + timedelta(days=rng.randint(-120, 120))) if rng.random() < 0.7 else None
+        start = due - timedelta(days=rng.randint(1, 14)) if due and rng.random() < 0.2 else None
+        completed = rng.random() < (0.8 if due and due < base else 0.1)
+        created = (due or base) - timedelta(days=rng.randint(1, 60), minutes=rng.randint(0, 1439))
+        recurrence = None
+        if due and rng.random() < 0.02:
+            recurrence = {'freq': rng.choice(['daily', 'weekly', 'monthly']), 'interval': 1,
+                          'until': None, 'count': None, 'exceptions': {}}
+        todos.append({
+            'id': i, 'title': title, 'description': _text(rng, 2), 'priority': _priority(rng),
+            'due_date': due.isoformat() if due else None, 'completed': completed,
+            'start_date': start.isoformat() if start else None, 'tags': _tags(rng),
+            'created_at': created.isoformat(), 'recurrence': recurrence,
+        })
+
+    events = []
+    for i in range(1, counts['events'] + 1):
+        day = base + timedelta(days=rng.randint(-180, 180))
+        if day.weekday() >= 5 and rng.random() < 0.7:
+            day -= timedelta(days=day.weekday() - 4)  # Mostly on weekdays
+        start = _work_time(rng, day)
+        end = start + timedelta(minutes=rng.choice([15, 30, 45, 60, 60, 90, 120]))
+        recurrence = None
+        if rng.random() < 0.03:
+            recurrence = {'freq': rng.choice(['daily', 'weekly', 'weekly', 'monthly']), 'interval': rng.choice([1, 1, 2]),
+                          'until': None, 'count': rng.choice([None, 10, 52]), 'exceptions': {}}
+        events.append({
+            'id': i, 'title': rng.choice(EVENT_TITLES), 'date': start.isoformat(), 'end': end.isoformat(),
+            'description': _text(rng, 1), 'tags': _tags(rng), 'recurrence': recurrence,
+        })
+
+    goals = []
+    for i in range(1, counts['goals'] + 1):
+        due = base + timedelta(days=rng.randint(-30, 365)) if rng.random() < 0.8 else None
+        goals.append({
+            'id': i, 'title': rng.choice(GOAL_TITLES).format(n=rng.randint(2, 20)),
+            'description': _text(rng, 3), 'priority': _priority(rng),
+            'due_date': due.isoformat() if due else None, 'completed': rng.random() < 0.15,
+            'tags': _tags(rng), 'created_at': (base - timedelta(days=rng.randint(1, 365))).isoformat(),
+        })
+
+    notes = [{
+        'id': i, 'title': f"{rng.choice(['Ideas for', 'Notes on', 'Thoughts about'])} {rng.choice(OBJECTS)}",
+        'type': rng.choice(NOTE_TYPES), 'created_at': (base - timedelta(days=rng.randint(0, 365))).isoformat(),
+        'content': _text(rng, 6),
+    } for i in range(1, counts['notes'] + 1)]
+
+    parents = {'todo': len(todos), 'goal': len(goals), 'event': len(events)}
+    dependent_notes = []
+    for i in range(1, counts['dependent_notes'] + 1):
+        parent_type = rng.choices(['todo', 'goal', 'event'], weights=[5, 2, 3])[0]
+        dependent_notes.append({
+            'id': i, 'title': rng.choice(['Context', 'Update', 'Follow-up', 'Details']),
+            'content': _text(rng, 3) or rng.choice(SENTENCES), 'parent_type': parent_type,
+            'parent_id': rng.randint(1, parents[parent_type]),
+            'created_at': (base - timedelta(days=rng.randint(0, 90))).isoformat(),
+        })
+
+    # Link graph: goals own todos, todos have subtasks, events serve goals, todos cite notes.
+    # Goal popularity is skewed, as in real data a few goals collect most of the work.
+    link_kinds = [('goal', 'todo', len(goals), len(todos)), ('todo', 'todo', len(todos), len(todos)),
+                  ('event', 'goal', len(events), len(goals)), ('todo', 'note', len(todos), len(notes))]
+    links = []
+    seen = set()
+    for _ in range(counts['links']):
+        from_type, to_type, n_from, n_to = rng.choices(link_kinds, weights=[6, 2, 1, 1])[0]
+        from_id = min(n_from, int(rng.paretovariate(1.2))) if from_type == 'goal' else rng.randint(1, n_from)
+        to_id = rng.randint(1, n_to)
+        key = (from_type, from_id, to_type, to_id)
+        if key in seen or (from_type == to_type and from_id == to_id):
+            continue
+        seen.add(key)
+        links.append({
+            'id': len(links) + 1, 'from_type': from_type, 'from_id': from_id, 'to_type': to_type,
+            'to_id': to_id, 'created_at': (base - timedelta(days=rng.randint(0, 90))).isoformat(),
+        })
+
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'notes': notes,
+        'dependent_notes': dependent_notes,
+        'todos': todos,
+        'goals': goals,
+        'events': events,
+        'links': links,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Jarvis database')
+    parser.add_argument('size', type=int, help='Approximate number of entities')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--base', help='ISO date the data is centered on (default: today)')
+    parser.add_argument('--output', default='db.synthetic.json')
+    args = parser.parse_args()
+    data = generate(args.size, args.seed, datetime.fromisoformat(args.base) if args.base else None)
+    stats = write_snapshot(args.output, data)
+    counts = ', '.join(f"{len(v)} {k}" for k, v in data.items() if isinstance(v, list))
+    print(f"Wrote {counts} to {args.output} ({stats['bytes']} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,84 +1,124 @@
-import json
-import os
-from datetime import datetime
-from typing import Optional, List
-from data import Note, DependentNote, ToDo, Goal, Event, Link
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from functools import wraps
+from typing import Callable, Optional, List
+from data import Note, DependentNote, ToDo, Goal, Event, Link, Change, Recurrence, normalize_tags
+from migrations import SCHEMA_VERSION, migrate
+from storage import read_snapshot, write_snapshot
+from locks import RWLock
+from recurrence import expand, next_occurrence, parse_recurrence, serialize_recurrence
+from interval_tree import IntervalTree
+from scheduling import find_overlapping_pairs, free_slots, propose_schedule
+from dedupe import DuplicateIndex, DuplicateError
 
 DB_FILE = "db.json"
+OCCURRENCE_CACHE_SIZE = 64  # Expanded recurrence windows kept between mutations
+DEFAULT_EVENT_DURATION = timedelta(hours=1)  # Assumed length of events without an end time
+CONFLICT_HORIZON_DAYS = 90  # How far ahead recurring events are checked for conflicts
+WORK_START = time(9)  # Default working hours used by the scheduler
+WORK_END = time(17)
+SCHEDULE_HORIZON_DAYS = 14  # Default scheduling window when no todo due dates extend it
+# What add_todo/add_goal/add_event do when a near-duplicate exists: add it anyway (callers can
+# report find_duplicates), return the existing item with the new details merged in, or raise DuplicateError
+DUPLICATE_POLICIES = ('warn', 'merge', 'reject')
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse an optional ISO timestamp from the database file."""
+    return datetime.fromisoformat(value) if value else None
+
+def _reads(method):
+    """Run a Database query under the shared read lock (queries may run concurrently)."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    wrapper.lock_mode = 'read'
+    return wrapper
+
+def _writes(method):
+    """Run a Database mutation under the exclusive write lock."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    wrapper.lock_mode = 'write'
+    return wrapper
 
 class Database:
-    def __init__(self):
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self.lock = RWLock()  # Guards the entity lists; see _reads/_writes
         self.notes: List[Note] = []
         self.dependent_notes: List[DependentNote] = []  # Notes with required parents
         self.todos: List[ToDo] = []
         self.goals: List[Goal] = []
         self.events: List[Event] = []
         self.links: List[Link] = []  # Relationship management
+        self.last_save_stats: Optional[dict] = None  # Duration and size of the most recent save
+        # Why the file at `path` could not be loaded; while set, save() refuses to overwrite it
+        self.load_error: Optional[str] = None
+        self.version = 0  # Incremented after every committed mutation
+        self._subscribers: List[Callable[[List[Change]], None]] = []
+        self._batch_depth = 0  # > 0 inside batch(); commits are deferred until it exits
+        self._pending_changes: List[Change] = []
+        self._last_ids: dict = {}  # Entity type -> largest ID in use, so inserts needn't scan
+        # (entity type, window start, window end) -> expanded occurrences; valid for one version
+        self._occurrence_cache: dict = {}
+        self._occurrence_cache_version = -1
+        # [start, end) index over non-recurring events, kept in sync by commit()
+        self.event_index = IntervalTree()
+        self.duplicate_policy = 'warn'  # Default for add_*; see DUPLICATE_POLICIES
+        # Entity type -> title index of open items for duplicate checks; built on first use
+        self._title_indexes: Optional[dict] = None
         self.load()
     
+    @_writes
     def load(self):
-        """Load data from JSON file."""
-        if not os.path.exists(DB_FILE):
-            return
+        """
+        Load data from JSON file, upgrading it first if it uses an older schema version.
         
+        If the file can't be read (no intact snapshot, a schema newer than this code, or
+        entries that fail to decode), the error is kept in load_error and saving is refused,
+        so the file and its backup aren't overwritten with an empty database.
+        """
+        self.load_error = None
         try:
-            with open(DB_FILE, 'r') as f:
-                data = json.load(f)
-            
-            # Load notes
-            for note_data in data.get('notes', []):
-                note_data['created_at'] = datetime.fromisoformat(note_data['created_at'])
-                self.notes.append(Note(**note_data))
+            # Falls back to the previous snapshot if the file is torn or fails its checksum
+            data, source = read_snapshot(self.path)
+            if data is None:
+                return
             
-            # Load dependent notes
-            for note_data in data.get('dependent_notes', []):
-                note_data['created_at'] = datetime.fromisoformat(note_data['created_at'])
-                self.dependent_notes.append(DependentNote(**note_data))
+            # One-time upgrade of older files; the decoders below assume SCHEMA_VERSION
+            migrated = migrate(data)
             
-            # Load todos
-            for todo_data in data.get('todos', []):
-                todo_data['due_date'] = datetime.fromisoformat(todo_data['due_date']) if todo_data.get('due_date') else None
-                todo_data['start_date'] = datetime.fromisoformat(todo_data['start_date']) if todo_data.get('start_date') else None
-                todo_data['created_at'] = datetime.fromisoformat(todo_data['created_at'])
-                # Remove old attachment fields if they exist (migration)
-                todo_data.pop('attached_to_todo_id', None)
-                todo_data.pop('attached_to_goal_id', None)
-                self.todos.append(ToDo(**todo_data))
-                # Normalize tags loaded from file
-                self.todos[-1].tags = self._normalize_tags(getattr(self.todos[-1], 'tags', []))
-            
-            # Load goals
-            for goal_data in data.get('goals', []):
-                goal_data['due_date'] = datetime.fromisoformat(goal_data['due_date']) if goal_data.get('due_date') else None
-                goal_data['created_at'] = datetime.fromisoformat(goal_data['created_at'])
-                # Remove old attachment fields if they exist (migration)
-                goal_data.pop('attached_todo_ids', None)
-                goal_data.pop('attached_goal_ids', None)
-                goal_data.pop('attached_event_ids', None)
-                self.goals.append(Goal(**goal_data))
-                # Normalize tags loaded from file
-                self.goals[-1].tags = self._normalize_tags(getattr(self.goals[-1], 'tags', []))
-            
-            # Load events
-            for event_data in data.get('events', []):
-                event_data['date'] = datetime.fromisoformat(event_data['date'])
-                # Remove old attachment field if it exists (migration)
-                event_data.pop('attached_to_goal_id', None)
-                self.events.append(Event(**event_data))
-                # Normalize tags loaded from file
-                self.events[-1].tags = self._normalize_tags(getattr(self.events[-1], 'tags', []))
-            
-            # Load links (relationships)
-            for link_data in data.get('links', []):
-                link_data['created_at'] = datetime.fromisoformat(link_data['created_at'])
-                self.links.append(Link(**link_data))
-        
+            # Decode everything before replacing anything, so a bad entry leaves the lists as they were
+            notes = [self._deserialize_note(d) for d in data.get('notes', [])]
+            dependent_notes = [self._deserialize_dependent_note(d) for d in data.get('dependent_notes', [])]
+            todos = [self._deserialize_todo(d) for d in data.get('todos', [])]
+            goals = [self._deserialize_goal(d) for d in data.get('goals', [])]
+            events = [self._deserialize_event(d) for d in data.get('events', [])]
+            links = [self._deserialize_link(d) for d in data.get('links', [])]
         except Exception as e:
-            print(f"Error loading database: {e}")
+            self.load_error = str(e)
+            print(f"Error loading database: {e}. Changes will not be saved until {self.path} is fixed or moved aside.")
+            return
+        
+        self.notes, self.dependent_notes, self.todos = notes, dependent_notes, todos
+        self.goals, self.events, self.links = goals, events, links
+        self._rebuild_indexes()
+        self.version += 1  # Anything cached for the previous data is stale
+        
+        # Persist the upgrade so the migrations never run again for this file,
+        # and restore the main file if it had to be recovered from another snapshot
+        if migrated or source != self.path:
+            self.save()
     
     def save(self):
-        """Save data to JSON file."""
+        """Save data to JSON file as a checksummed snapshot, atomically replacing the previous one."""
+        if self.load_error:
+            raise RuntimeError(f"Not saving over {self.path}, which failed to load: {self.load_error}")
         data = {
+            'schema_version': SCHEMA_VERSION,
             'notes': [self._serialize_note(n) for n in self.notes],
             'dependent_notes': [self._serialize_dependent_note(n) for n in self.dependent_notes],
             'todos': [self._serialize_todo(t) for t in self.todos],
@@ -87,23 +127,219 @@ class Database:
             'links': [self._serialize_link(l) for l in self.links],
         }
         
-        with open(DB_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        self.last_save_stats = write_snapshot(self.path, data)
+    
+    # Change feed
+    
+    def subscribe(self, callback: Callable[[List[Change]], None]) -> Callable[[], None]:
+        """
+        Register a callback that receives the list of changes after each committed mutation.
+        
+        Callbacks run synchronously on the thread that made the change (e.g. the AI worker
+        thread), so UI consumers should hand the work back to their own thread.
+        
+        Returns:
+            A function that unsubscribes the callback
+        """
+        self._subscribers.append(callback)
+        
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+    
+    @_writes
+    def commit(self, changes: List[Change]):
+        """Save, then notify subscribers of changes (also for callers that edit entity objects directly)."""
+        if self._batch_depth:
+            self._pending_changes.extend(changes)
+            return
+        self.save()
+        self.version += 1
+        self._update_indexes(changes)
+        for callback in list(self._subscribers):
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"Error in database subscriber: {e}")
+    
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group many mutations into a single save and change notification.
+        
+        Holds the write lock for the whole block. Commits inside it are collected and
+        applied once on exit (also when the block raises, since the entities have already
+        changed); indexes, the version and subscribers catch up at that point. Batches nest.
+        
+        Example:
+            with db.batch():
+                for title in titles:
+                    db.add_todo(title, "", 3)
+        """
+        with self.lock.write():
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._pending_changes:
+                    changes, self._pending_changes = self._pending_changes, []
+                    self.commit(changes)
+    
+    # Indexes
+    
+    @staticmethod
+    def _event_end(event: Event) -> datetime:
+        """End of an event, assuming DEFAULT_EVENT_DURATION when none is set."""
+        return event.end if event.end and event.end >= event.date else event.date + DEFAULT_EVENT_DURATION
+    
+    def _index_event(self, event: Event):
+        # Recurring events have unbounded ranges; their occurrences are expanded per query instead
+        if event.recurrence:
+            self.event_index.remove(event.id)
+        else:
+            self.event_index.insert(event.id, event.date, self._event_end(event), event)
+    
+    def _rebuild_indexes(self):
+        """Rebuild all indexes from the entity lists (after loading)."""
+        self.event_index.clear()
+        for e in self.events:
+            self._index_event(e)
+        self._title_indexes = None
+        self._last_ids = {}
+    
+    def _new_id(self, entity_type: str, items: list) -> int:
+        """One more than the largest ID of this entity type."""
+        last = self._last_ids.get(entity_type)
+        if last is None:
+            last = max((item.id for item in items), default=0)
+        self._last_ids[entity_type] = last + 1
+        return last + 1
+    
+    def _title_index(self, entity_type: str) -> DuplicateIndex:
+        if self._title_indexes is None:
+            # Built fully before publishing, so concurrent readers never see a partial index
+            indexes = {'todo': DuplicateIndex(), 'goal': DuplicateIndex(), 'event': DuplicateIndex()}
+            for entity_type_, items in (('todo', self.todos), ('goal', self.goals), ('event', self.events)):
+                for item in items:
+                    if not getattr(item, 'completed', False):
+                        indexes[entity_type_].add(item.id, item.title)
+            self._title_indexes = indexes
+        return self._title_indexes[entity_type]
+    
+    def _update_title_indexes(self, changes: List[Change]):
+        for change in changes:
+            if change.entity_type not in self._title_indexes:
+                continue
+            index = self._title_indexes[change.entity_type]
+            if change.operation == 'delete':
+                index.remove(change.entity_id)
+            elif change.operation == 'add' or {'title', 'completed'} & set(change.fields):
+                item = self._get_entity(change.entity_type, change.entity_id)
+                if item and not getattr(item, 'completed', False):
+                    index.add(item.id, item.title)
+                else:
+                    index.remove(change.entity_id)
+    
+    def _update_indexes(self, changes: List[Change]):
+        """Apply committed changes to the indexes incrementally."""
+        if self._title_indexes is not None:
+            self._update_title_indexes(changes)
+        for change in changes:
+            if change.operation == 'delete':
+                self._last_ids.pop(change.entity_type, None)  # The largest ID may be free again
+        event_changes = [c for c in changes if c.entity_type == 'event']
+        if not event_changes:
+            return
+        events = {e.id: e for e in self.events} if any(c.operation != 'delete' for c in event_changes) else {}
+        for change in event_changes:
+            if change.operation == 'delete':
+                self.event_index.remove(change.entity_id)
+            elif change.entity_id in events:
+                self._index_event(events[change.entity_id])
     
     def _normalize_tags(self, tags: Optional[List[str]]) -> List[str]:
         """Normalize tag list to lowercase, trimmed, and deduplicated while preserving order."""
-        if not tags:
-            return []
-        seen = set()
-        normalized = []
-        for t in tags:
-            if not isinstance(t, str):
-                continue
-            s = t.strip().lower()
-            if s and s not in seen:
-                seen.add(s)
-                normalized.append(s)
-        return normalized
+        return normalize_tags(tags)
+    
+    # Decoders (file records are already at SCHEMA_VERSION, see migrations.py)
+    
+    @staticmethod
+    def _deserialize_note(d: dict) -> Note:
+        return Note(
+            id=d['id'],
+            title=d['title'],
+            type=d['type'],
+            created_at=datetime.fromisoformat(d['created_at']),
+            content=d['content'],
+        )
+    
+    @staticmethod
+    def _deserialize_dependent_note(d: dict) -> DependentNote:
+        return DependentNote(
+            id=d['id'],
+            title=d['title'],
+            content=d['content'],
+            parent_type=d['parent_type'],
+            parent_id=d['parent_id'],
+            created_at=datetime.fromisoformat(d['created_at']),
+        )
+    
+    @staticmethod
+    def _deserialize_todo(d: dict) -> ToDo:
+        return ToDo(
+            id=d['id'],
+            title=d['title'],
+            description=d['description'],
+            priority=d['priority'],
+            due_date=_parse_datetime(d.get('due_date')),
+            completed=d.get('completed', False),
+            start_date=_parse_datetime(d.get('start_date')),
+            tags=d.get('tags', []),
+            created_at=datetime.fromisoformat(d['created_at']),
+            recurrence=parse_recurrence(d.get('recurrence')),
+        )
+    
+    @staticmethod
+    def _deserialize_goal(d: dict) -> Goal:
+        return Goal(
+            id=d['id'],
+            title=d['title'],
+            description=d['description'],
+            priority=d['priority'],
+            due_date=_parse_datetime(d.get('due_date')),
+            completed=d.get('completed', False),
+            tags=d.get('tags', []),
+            created_at=datetime.fromisoformat(d['created_at']),
+        )
+    
+    @staticmethod
+    def _deserialize_event(d: dict) -> Event:
+        return Event(
+            id=d['id'],
+            title=d['title'],
+            date=datetime.fromisoformat(d['date']),
+            description=d.get('description', ""),
+            tags=d.get('tags', []),
+            end=_parse_datetime(d.get('end')),
+            recurrence=parse_recurrence(d.get('recurrence')),
+        )
+    
+    @staticmethod
+    def _deserialize_link(d: dict) -> Link:
+        return Link(
+            id=d['id'],
+            from_type=d['from_type'],
+            from_id=d['from_id'],
+            to_type=d['to_type'],
+            to_id=d['to_id'],
+            created_at=datetime.fromisoformat(d['created_at']),
+        )
+    
+    # Serializers
+    
     @staticmethod
     def _serialize_note(note: Note) -> dict:
         return {
@@ -137,6 +373,7 @@ class Database:
             'start_date': todo.start_date.isoformat() if todo.start_date else None,
             'tags': todo.tags,
             'created_at': todo.created_at.isoformat(),
+            'recurrence': serialize_recurrence(todo.recurrence),
         }
     
     def _serialize_todo_with_notes(self, todo: ToDo) -> dict:
@@ -182,8 +419,10 @@ class Database:
             'id': event.id,
             'title': event.title,
             'date': event.date.isoformat(),
+            'end': event.end.isoformat() if event.end else None,
             'description': event.description,
             'tags': event.tags,
+            'recurrence': serialize_recurrence(event.recurrence),
         }
     
     def _serialize_event_with_notes(self, event: Event) -> dict:
@@ -209,11 +448,62 @@ class Database:
             'created_at': link.created_at.isoformat(),
         }
     
+    # Recurrence expansion
+    
+    def _serialize_event_occurrence(self, event: Event, original: datetime, override: dict) -> dict:
+        """Serialize one occurrence of a recurring event, applying its exception override."""
+        event_dict = self._serialize_event_with_notes(event)
+        start = datetime.fromisoformat(override['date']) if override.get('date') else original
+        event_dict['date'] = start.isoformat()
+        if event.end:
+            event_dict['end'] = (start + (event.end - event.date)).isoformat()
+        event_dict.update({k: v for k, v in override.items() if k != 'date'})
+        event_dict['occurrence'] = original.isoformat()
+        return event_dict
+    
+    def _serialize_todo_occurrence(self, todo: ToDo, original: datetime, override: dict) -> dict:
+        """Serialize one occurrence of a recurring todo (its series anchored at rule.anchor, or its due date)."""
+        todo_dict = self._serialize_todo_with_notes(todo)
+        due = datetime.fromisoformat(override['date']) if override.get('date') else original
+        todo_dict['due_date'] = due.isoformat()
+        if todo.start_date:
+            todo_dict['start_date'] = (due - (todo.due_date - todo.start_date)).isoformat()
+        todo_dict.update({k: v for k, v in override.items() if k != 'date'})
+        todo_dict['occurrence'] = original.isoformat()
+        return todo_dict
+    
+    def _recurring_occurrences(self, entity_type: str, window_start: datetime, window_end: datetime) -> List[dict]:
+        """Serialized occurrences of recurring events or todos starting in the window (cached per window)."""
+        if self._occurrence_cache_version != self.version or len(self._occurrence_cache) >= OCCURRENCE_CACHE_SIZE:
+            self._occurrence_cache = {}
+            self._occurrence_cache_version = self.version
+        key = (entity_type, window_start, window_end)
+        cached = self._occurrence_cache.get(key)
+        if cached is None:
+            cached = []
+            if entity_type == 'event':
+                for e in self.events:
+                    if e.recurrence:
+                        cached.extend(self._serialize_event_occurrence(e, original, override)
+                                      for original, override in expand(e.date, e.recurrence, window_start, window_end))
+            else:
+                for t in self.todos:
+                    if t.recurrence and t.due_date and not t.completed:
+                        # Occurrences before the due date (the current one) have been completed
+                        cached.extend(self._serialize_todo_occurrence(t, original, override)
+                                      for original, override in expand(t.recurrence.anchor or t.due_date, t.recurrence,
+                                                                       window_start, window_end)
+                                      if original >= t.due_date)
+            self._occurrence_cache[key] = cached
+        # Copies, so callers can't modify the cached entries
+        return [dict(o) for o in cached]
+    
     # Link management methods
     
+    @_writes
     def create_link(self, from_type: str, from_id: int, to_type: str, to_id: int) -> Link:
         """Create a link between two entities."""
-        link_id = max([l.id for l in self.links], default=0) + 1
+        link_id = self._new_id('link', self.links)
         link = Link(
             id=link_id,
             from_type=from_type,
@@ -222,44 +512,51 @@ class Database:
             to_id=to_id
         )
         self.links.append(link)
-        self.save()
+        self.commit([Change('link', link.id, 'add')])
         return link
     
+    @_writes
     def delete_link(self, link_id: int) -> bool:
         """Delete a link by ID."""
         link = next((l for l in self.links if l.id == link_id), None)
         if link:
             self.links.remove(link)
-            self.save()
+            self.commit([Change('link', link_id, 'delete')])
             return True
         return False
     
+    @_reads
     def get_links_from(self, from_type: str, from_id: int) -> List[Link]:
         """Get all links originating from a specific entity."""
         return [l for l in self.links if l.from_type == from_type and l.from_id == from_id]
     
+    @_reads
     def get_links_to(self, to_type: str, to_id: int) -> List[Link]:
         """Get all links pointing to a specific entity."""
         return [l for l in self.links if l.to_type == to_type and l.to_id == to_id]
     
+    @_reads
     def get_related_todos(self, entity_type: str, entity_id: int) -> List[ToDo]:
         """Get all todos related to an entity (used for goals, other todos, etc)."""
         links = self.get_links_from(entity_type, entity_id)
         todo_ids = [l.to_id for l in links if l.to_type == 'todo']
         return [t for t in self.todos if t.id in todo_ids]
     
+    @_reads
     def get_related_goals(self, entity_type: str, entity_id: int) -> List[Goal]:
         """Get all goals related to an entity."""
         links = self.get_links_from(entity_type, entity_id)
         goal_ids = [l.to_id for l in links if l.to_type == 'goal']
         return [g for g in self.goals if g.id in goal_ids]
     
+    @_reads
     def get_related_events(self, entity_type: str, entity_id: int) -> List[Event]:
         """Get all events related to an entity."""
         links = self.get_links_from(entity_type, entity_id)
         event_ids = [l.to_id for l in links if l.to_type == 'event']
         return [e for e in self.events if e.id in event_ids]
     
+    @_reads
     def get_parent_goal(self, todo_id: int) -> Optional[Goal]:
         """Get the parent goal of a todo (if linked)."""
         links = self.get_links_to('goal', next((l for l in self.links if l.from_type == 'todo' and l.from_id == todo_id and l.to_type == 'goal'), None))
@@ -272,18 +569,197 @@ class Database:
     
     # Query functions for AI to use
     
+    @_reads
     def get_events_this_week(self) -> List[dict]:
-        """Get events scheduled for this week with attached notes."""
-        from datetime import timedelta
+        """Get events scheduled for this week (including recurring occurrences) with attached notes."""
         today = datetime.today()
         week_end = today + timedelta(days=7)
-        upcoming = [e for e in self.events if today <= e.start <= week_end]
-        return [self._serialize_event_with_notes(e) for e in upcoming]
+        # Expand over whole days so repeated calls share one cached window
+        day_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        events = self.get_events_between(day_start, day_start + timedelta(days=8))
+        return [e for e in events if today <= datetime.fromisoformat(e['date']) <= week_end]
+    
+    @_reads
+    def get_events_between(self, start: datetime, end: datetime) -> List[dict]:
+        """Get events starting in [start, end), expanding recurring events into occurrences, sorted by start."""
+        events = [self._serialize_event_with_notes(e) for e in self.events
+                  if not e.recurrence and start <= e.date < end]
+        events.extend(self._recurring_occurrences('event', start, end))
+        events.sort(key=lambda e: e['date'])
+        return events
+    
+    @_reads
+    def get_events_overlapping(self, start: datetime, end: Optional[datetime] = None) -> List[dict]:
+        """
+        Get events whose [start, end) range overlaps [start, end), including recurring occurrences.
+        Without `end`, returns the events in progress at `start`. Events without an end time are
+        assumed to last DEFAULT_EVENT_DURATION.
+        """
+        if end is None:
+            matches = self.event_index.at(start)
+        else:
+            matches = self.event_index.overlapping(start, end)
+        events = [self._serialize_event_with_notes(e) for e in matches]
+        
+        # Recurring events aren't in the index; occurrences starting up to one duration
+        # before the query can still reach into it
+        window_end = end if end is not None else start + timedelta(microseconds=1)
+        for e in self.events:
+            if not e.recurrence:
+                continue
+            duration = self._event_end(e) - e.date
+            for original, override in expand(e.date, e.recurrence, start - duration, window_end):
+                occurrence = self._serialize_event_occurrence(e, original, override)
+                occ_start = datetime.fromisoformat(occurrence['date'])
+                if occ_start + duration > start:
+                    events.append(occurrence)
+        events.sort(key=lambda e: e['date'])
+        return events
+    
+    @staticmethod
+    def _event_range(event_dict: dict):
+        """[start, end) of a serialized event or occurrence."""
+        start = datetime.fromisoformat(event_dict['date'])
+        end = datetime.fromisoformat(event_dict['end']) if event_dict.get('end') else None
+        return start, end if end and end >= start else start + DEFAULT_EVENT_DURATION
+    
+    @staticmethod
+    def _conflict_summary(event_dict: dict) -> dict:
+        summary = {k: event_dict[k] for k in ('id', 'title', 'date', 'end') if event_dict.get(k)}
+        if 'occurrence' in event_dict:
+            summary['occurrence'] = event_dict['occurrence']
+        return summary
+    
+    @_reads
+    def get_event_conflicts(self, start: datetime, end: datetime) -> List[dict]:
+        """Get every pair of overlapping events (including recurring occurrences) within [start, end)."""
+        events = self.get_events_overlapping(start, end)
+        pairs = find_overlapping_pairs((*self._event_range(e), e) for e in events)
+        conflicts = []
+        for first, second in pairs:
+            first_start, first_end = self._event_range(first)
+            second_start, second_end = self._event_range(second)
+            conflicts.append({
+                'events': [self._conflict_summary(first), self._conflict_summary(second)],
+                'overlap_start': max(first_start, second_start).isoformat(),
+                'overlap_end': min(first_end, second_end).isoformat(),
+            })
+        return conflicts
+    
+    @_reads
+    def get_conflicts_for_event(self, event_id: int) -> List[dict]:
+        """
+        Get events that overlap a given event, using the event time index.
+        Recurring events are checked occurrence by occurrence over the next CONFLICT_HORIZON_DAYS.
+        """
+        event = next((e for e in self.events if e.id == event_id), None)
+        if not event:
+            return []
+        if event.recurrence:
+            window_start = max(event.date, datetime.now())
+            ranges = [self._event_range(o) for o in self._recurring_occurrences(
+                'event', window_start, window_start + timedelta(days=CONFLICT_HORIZON_DAYS)) if o['id'] == event_id]
+        else:
+            ranges = [(event.date, self._event_end(event))]
+        
+        conflicts = []
+        for start, end in ranges:
+            conflicts.extend(self._conflict_summary(e) for e in self.get_events_overlapping(start, end)
+                             if e['id'] != event_id)
+        return conflicts
     
+    # Scheduling
+    
+    def _busy_ranges(self, start: datetime, end: datetime) -> List[tuple]:
+        """[start, end) ranges of all events and recurring occurrences overlapping the window."""
+        busy = [(e.date, self._event_end(e)) for e in self.event_index.overlapping(start, end)]
+        for e in self.events:
+            if e.recurrence:
+                duration = self._event_end(e) - e.date
+                for original, override in expand(e.date, e.recurrence, start - duration, end):
+                    occ_start = datetime.fromisoformat(override['date']) if override.get('date') else original
+                    busy.append((occ_start, occ_start + duration))
+        return busy
+    
+    @_reads
+    def find_free_slots(self, start: datetime, end: datetime, work_start: time = WORK_START,
+                        work_end: time = WORK_END, min_minutes: int = 30) -> List[dict]:
+        """Get free time windows within working hours (Mon-Fri) between start and end."""
+        slots = free_slots(self._busy_ranges(start, end), start, end, work_start, work_end,
+                           timedelta(minutes=min_minutes))
+        return [{
+            'start': s.isoformat(),
+            'end': e.isoformat(),
+            'minutes': int((e - s).total_seconds() // 60),
+        } for s, e in slots]
+    
+    @_reads
+    def summary(self, now: Optional[datetime] = None) -> dict:
+        """Counts of open and upcoming items, for a quick overview of the user's state."""
+        now = now or datetime.now()
+        open_todos = [t for t in self.todos if not t.completed]
+        return {
+            'open_todos': len(open_todos),
+            'overdue_todos': sum(1 for t in open_todos if t.due_date and t.due_date < now),
+            'open_goals': sum(1 for g in self.goals if not g.completed),
+            'events_next_7_days': len(self._busy_ranges(now, now + timedelta(days=7))),
+        }
+    
+    @_reads
+    def propose_schedule(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         default_minutes: int = 60, durations: Optional[dict] = None,
+                         work_start: time = WORK_START, work_end: time = WORK_END) -> dict:
+        """
+        Propose times for incomplete todos in free working hours, earliest due date first, then by priority.
+        Nothing is saved; overdue todos are placed as soon as possible.
+        
+        Args:
+            start: Start of the scheduling window (default: now)
+            end: End of the window (default: the latest due date, at least SCHEDULE_HORIZON_DAYS ahead)
+            default_minutes: Estimated duration of todos without one in `durations`
+            durations: Optional {todo_id: minutes} estimates
+        """
+        start = start or datetime.now().replace(second=0, microsecond=0)
+        todos = [t for t in self.todos if not t.completed]
+        if end is None:
+            end = max([t.due_date for t in todos if t.due_date] + [start + timedelta(days=SCHEDULE_HORIZON_DAYS)])
+        durations = {int(k): v for k, v in (durations or {}).items()}
+        
+        tasks = [{
+            'id': t.id,
+            'duration': timedelta(minutes=durations.get(t.id, default_minutes)),
+            'priority': t.priority,
+            'earliest': t.start_date,
+            'deadline': t.due_date if t.due_date and t.due_date > start else None,
+            'urgent': bool(t.due_date and t.due_date <= start),
+        } for t in todos]
+        slots = free_slots(self._busy_ranges(start, end), start, end, work_start, work_end,
+                           timedelta(minutes=15))
+        placements, unscheduled = propose_schedule(tasks, slots)
+        
+        titles = {t.id: t for t in todos}
+        return {
+            'window': {'start': start.isoformat(), 'end': end.isoformat()},
+            'schedule': [{
+                'todo_id': p['id'],
+                'title': titles[p['id']].title,
+                'start': p['start'].isoformat(),
+                'end': p['end'].isoformat(),
+            } for p in placements],
+            'unscheduled': [{
+                'todo_id': t['id'],
+                'title': titles[t['id']].title,
+                'due_date': titles[t['id']].due_date.isoformat() if titles[t['id']].due_date else None,
+                'reason': 'not enough free time before the due date',
+            } for t in unscheduled],
+        }
+    
+    @_reads
     def get_all_events(self) -> List[dict]:
         """Get all events with attached notes."""
         return [self._serialize_event_with_notes(e) for e in self.events]
     
+    @_reads
     def get_todos_by_priority(self, priority: Optional[int] = None, completed: bool = False) -> List[dict]:
         """Get todos, optionally filtered by priority and completion status, with attached notes."""
         filtered = [t for t in self.todos if t.completed == completed]
@@ -291,22 +767,26 @@ class Database:
             filtered = [t for t in filtered if t.priority == priority]
         return [self._serialize_todo_with_notes(t) for t in filtered]
     
+    @_reads
     def get_overdue_todos(self) -> List[dict]:
         """Get todos that are overdue with attached notes."""
         now = datetime.now()
         overdue = [t for t in self.todos if t.due_date and t.due_date < now and not t.completed]
         return [self._serialize_todo_with_notes(t) for t in overdue]
     
+    @_reads
     def get_all_todos(self) -> List[dict]:
         """Get all incomplete todos with attached notes, regardless of due date."""
         incomplete = [t for t in self.todos if not t.completed]
         return [self._serialize_todo_with_notes(t) for t in incomplete]
     
+    @_reads
     def get_goals(self, completed: bool = False) -> List[dict]:
         """Get goals, optionally filtered by completion status, with attached notes."""
         filtered = [g for g in self.goals if g.completed == completed]
         return [self._serialize_goal_with_notes(g) for g in filtered]
     
+    @_reads
     def get_goal_details(self, goal_id: int) -> Optional[dict]:
         """Get detailed information about a specific goal including attached todos and events."""
         goal = next((g for g in self.goals if g.id == goal_id), None)
@@ -321,62 +801,96 @@ class Database:
         
         return goal_dict
     
+    @_reads
     def get_notes(self) -> List[dict]:
         """Get all notes."""
         return [self._serialize_note(n) for n in self.notes]
     
+    @_reads
     def get_upcoming_todos(self, days: int = 7) -> List[dict]:
-        """Get todos due within specified number of days, with attached notes."""
-        from datetime import timedelta
+        """Get todos due within specified number of days (including recurring occurrences), with attached notes."""
         today = datetime.today()
         end_date = today + timedelta(days=days)
-        upcoming = [t for t in self.todos if t.due_date and today <= t.due_date <= end_date and not t.completed]
-        return [self._serialize_todo_with_notes(t) for t in upcoming]
+        upcoming = [self._serialize_todo_with_notes(t) for t in self.todos
+                    if not t.recurrence and t.due_date and today <= t.due_date <= end_date and not t.completed]
+        # Expand over whole days so repeated calls share one cached window
+        day_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        occurrences = self._recurring_occurrences('todo', day_start, day_start + timedelta(days=days + 1))
+        upcoming.extend(o for o in occurrences if today <= datetime.fromisoformat(o['due_date']) <= end_date)
+        return upcoming
     
+    @_writes
     def add_note(self, title: str, type: str, content: str) -> Note:
         """Add a new note."""
-        note_id = max([n.id for n in self.notes], default=0) + 1
+        note_id = self._new_id('note', self.notes)
         note = Note(id=note_id, title=title, type=type, created_at=datetime.now(), content=content)
         self.notes.append(note)
-        self.save()
+        self.commit([Change('note', note.id, 'add')])
         return note
     
+    @_writes
     def add_todo(self, title: str, description: str, priority: int, due_date: Optional[datetime] = None,
-                 start_date: Optional[datetime] = None, tags: Optional[List[str]] = None) -> ToDo:
-        """Add a new todo."""
-        todo_id = max([t.id for t in self.todos], default=0) + 1
+                 start_date: Optional[datetime] = None, tags: Optional[List[str]] = None,
+                 recurrence: Optional[Recurrence] = None, on_duplicate: Optional[str] = None) -> ToDo:
+        """
+        Add a new todo. A recurring todo repeats relative to its due date.
+        `on_duplicate` overrides the database's duplicate policy (see DUPLICATE_POLICIES); when
+        merging, the existing todo is returned.
+        """
+        if recurrence and not due_date:
+            raise ValueError("A recurring todo needs a due date")
+        existing = self._resolve_duplicate('todo', title, on_duplicate)
+        if existing:
+            return self._merge_duplicate('todo', existing, description=description, priority=priority,
+                                         due_date=due_date, start_date=start_date, tags=tags)
+        todo_id = self._new_id('todo', self.todos)
         todo = ToDo(
             id=todo_id, title=title, description=description, priority=priority,
-            due_date=due_date, start_date=start_date, tags=self._normalize_tags(tags or []), created_at=datetime.now()
+            due_date=due_date, start_date=start_date, tags=self._normalize_tags(tags or []), created_at=datetime.now(),
+            recurrence=recurrence
         )
         self.todos.append(todo)
-        self.save()
+        self.commit([Change('todo', todo.id, 'add')])
         return todo
     
+    @_writes
     def add_goal(self, title: str, description: str, priority: int, due_date: Optional[datetime] = None,
-                 tags: Optional[List[str]] = None) -> Goal:
-        """Add a new goal."""
-        goal_id = max([g.id for g in self.goals], default=0) + 1
+                 tags: Optional[List[str]] = None, on_duplicate: Optional[str] = None) -> Goal:
+        """Add a new goal, applying the duplicate policy like add_todo."""
+        existing = self._resolve_duplicate('goal', title, on_duplicate)
+        if existing:
+            return self._merge_duplicate('goal', existing, description=description, priority=priority,
+                                         due_date=due_date, tags=tags)
+        goal_id = self._new_id('goal', self.goals)
         goal = Goal(
             id=goal_id, title=title, description=description, priority=priority,
             due_date=due_date, tags=self._normalize_tags(tags or []), created_at=datetime.now()
         )
         self.goals.append(goal)
-        self.save()
+        self.commit([Change('goal', goal.id, 'add')])
         return goal
     
+    @_writes
     def add_event(self, title: str, date: datetime, description: str = "",
-                  tags: Optional[List[str]] = None) -> Event:
-        """Add a new event."""
-        event_id = max([e.id for e in self.events], default=0) + 1
+                  tags: Optional[List[str]] = None, end: Optional[datetime] = None,
+                  recurrence: Optional[Recurrence] = None, on_duplicate: Optional[str] = None) -> Event:
+        """
+        Add a new event, optionally repeating according to a recurrence rule. Events with similar
+        titles on the same day count as duplicates (see add_todo for `on_duplicate`).
+        """
+        existing = self._resolve_duplicate('event', title, on_duplicate, date)
+        if existing:
+            return self._merge_duplicate('event', existing, description=description, end=end, tags=tags)
+        event_id = self._new_id('event', self.events)
         event = Event(
             id=event_id, title=title, date=date, description=description,
-            tags=self._normalize_tags(tags or [])
+            tags=self._normalize_tags(tags or []), end=end, recurrence=recurrence
         )
         self.events.append(event)
-        self.save()
+        self.commit([Change('event', event.id, 'add')])
         return event
     
+    @_writes
     def add_dependent_note(self, title: str, content: str, parent_type: str, parent_id: int) -> DependentNote:
         """Add a dependent note (must have a parent)."""
         # Verify parent exists
@@ -384,7 +898,7 @@ class Database:
         if not parent:
             raise ValueError(f"{parent_type} with id {parent_id} not found")
         
-        note_id = max([n.id for n in self.dependent_notes], default=0) + 1
+        note_id = self._new_id('dependent_note', self.dependent_notes)
         note = DependentNote(
             id=note_id,
             title=title,
@@ -394,7 +908,7 @@ class Database:
             created_at=datetime.now()
         )
         self.dependent_notes.append(note)
-        self.save()
+        self.commit([Change('dependent_note', note.id, 'add')])
         return note
     
     def _get_entity(self, entity_type: str, entity_id: int):
@@ -409,106 +923,196 @@ class Database:
             return next((n for n in self.dependent_notes if n.id == entity_id), None)
         return None
     
+    # Duplicate detection
+    
+    def _occurs_on_day(self, event: Event, day: datetime) -> bool:
+        day_start = datetime.combine(day.date(), time())
+        if event.recurrence:
+            return any(True for _ in expand(event.date, event.recurrence, day_start, day_start + timedelta(days=1)))
+        return event.date.date() == day.date()
+    
+    @_reads
+    def find_duplicates(self, entity_type: str, title: str, date: Optional[datetime] = None,
+                        exclude_id: Optional[int] = None) -> List[dict]:
+        """
+        Find open todos, goals or events whose titles are near-duplicates of `title`.
+        
+        Args:
+            entity_type: 'todo', 'goal' or 'event'
+            date: For events, only events on the same day count as duplicates
+            exclude_id: Item to leave out (e.g. the one being renamed)
+        
+        Returns:
+            Serialized matches with a 'similarity' score (0-1), most similar first
+        """
+        if entity_type not in ('todo', 'goal', 'event'):
+            raise ValueError(f"Invalid entity type {entity_type!r}")
+        serialize = {'todo': self._serialize_todo, 'goal': self._serialize_goal, 'event': self._serialize_event}[entity_type]
+        duplicates = []
+        for entity_id, similarity in self._title_index(entity_type).find(title, exclude=exclude_id):
+            entity = self._get_entity(entity_type, entity_id)
+            if entity is None or (entity_type == 'event' and date and not self._occurs_on_day(entity, date)):
+                continue
+            duplicates.append({**serialize(entity), 'similarity': similarity})
+        return duplicates
+    
+    def _resolve_duplicate(self, entity_type: str, title: str, on_duplicate: Optional[str],
+                           date: Optional[datetime] = None):
+        """Apply the duplicate policy to a new item. Returns the existing item to merge into, if any."""
+        policy = on_duplicate or self.duplicate_policy
+        if policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Invalid duplicate policy {policy!r}; expected one of {', '.join(DUPLICATE_POLICIES)}")
+        if policy == 'warn':
+            return None
+        duplicates = self.find_duplicates(entity_type, title, date)
+        if not duplicates:
+            return None
+        best = duplicates[0]
+        if policy == 'reject':
+            raise DuplicateError(
+                f"{entity_type.capitalize()} '{title}' looks like a duplicate of '{best['title']}' (ID: {best['id']})",
+                duplicates)
+        return self._get_entity(entity_type, best['id'])
+    
+    def _merge_duplicate(self, entity_type: str, existing, **fields):
+        """Merge a new item's details into an existing one: union tags, raise priority, fill empty fields."""
+        changed = []
+        for name, value in fields.items():
+            if name == 'tags':
+                merged = self._normalize_tags(existing.tags + (value or []))
+                if merged != existing.tags:
+                    existing.tags = merged
+                    changed.append('tags')
+            elif name == 'priority':
+                if value is not None and value > existing.priority:
+                    existing.priority = value
+                    changed.append('priority')
+            elif value and not getattr(existing, name):
+                setattr(existing, name, value)
+                changed.append(name)
+        if changed:
+            self.commit([Change(entity_type, existing.id, 'update', changed)])
+        return existing
+    
     # Delete functions
     
+    def _remove_links(self, entity_type: str, entity_id: int) -> List[Change]:
+        """Remove all links touching an entity. Returns the resulting changes."""
+        changes = []
+        kept = []
+        for l in self.links:
+            if (l.from_type == entity_type and l.from_id == entity_id) or (l.to_type == entity_type and l.to_id == entity_id):
+                changes.append(Change('link', l.id, 'delete'))
+            else:
+                kept.append(l)
+        self.links = kept
+        return changes
+    
+    def _remove_dependent_notes(self, parent_type: str, parent_id: int) -> List[Change]:
+        """Remove all dependent notes owned by an entity. Returns the resulting changes."""
+        changes = []
+        kept = []
+        for n in self.dependent_notes:
+            if n.parent_type == parent_type and n.parent_id == parent_id:
+                changes.append(Change('dependent_note', n.id, 'delete'))
+            else:
+                kept.append(n)
+        self.dependent_notes = kept
+        return changes
+    
+    @_writes
     def delete_event(self, event_id: int) -> bool:
         """Delete an event by ID and all associated links and dependent notes."""
         event = next((e for e in self.events if e.id == event_id), None)
         if event:
             self.events.remove(event)
-            # Clean up associated links
-            self.links = [l for l in self.links if not (
-                (l.from_type == 'event' and l.from_id == event_id) or
-                (l.to_type == 'event' and l.to_id == event_id)
-            )]
-            # Clean up dependent notes
-            self.dependent_notes = [n for n in self.dependent_notes if not (
-                n.parent_type == 'event' and n.parent_id == event_id
-            )]
-            self.save()
+            changes = [Change('event', event_id, 'delete')]
+            # Clean up associated links and dependent notes
+            changes += self._remove_links('event', event_id)
+            changes += self._remove_dependent_notes('event', event_id)
+            self.commit(changes)
             return True
         return False
     
+    @_writes
     def delete_events_this_week(self) -> int:
-        """Delete all events scheduled for this week. Returns count deleted."""
-        from datetime import timedelta
+        """Delete all events scheduled for this week. Occurrences of recurring events are cancelled instead. Returns count removed."""
         today = datetime.today()
         week_end = today + timedelta(days=7)
-        events_to_delete = [e for e in self.events if today <= e.start <= week_end]
+        # [today, week_end), as expand() treats windows
+        events_to_delete = [e for e in self.events if not e.recurrence and today <= e.date < week_end]
+        changes = []
+        cancelled = 0
+        for event in self.events:
+            if event.recurrence:
+                originals = [original for original, _ in expand(event.date, event.recurrence, today, week_end)]
+                for original in originals:
+                    event.recurrence.exceptions[original.isoformat()] = None
+                if originals:
+                    cancelled += len(originals)
+                    changes.append(Change('event', event.id, 'update', ['recurrence']))
         for event in events_to_delete:
             self.events.remove(event)
-            # Clean up associated links
-            self.links = [l for l in self.links if not (
-                (l.from_type == 'event' and l.from_id == event.id) or
-                (l.to_type == 'event' and l.to_id == event.id)
-            )]
-            # Clean up dependent notes
-            self.dependent_notes = [n for n in self.dependent_notes if not (
-                n.parent_type == 'event' and n.parent_id == event.id
-            )]
-        if events_to_delete:
-            self.save()
-        return len(events_to_delete)
+            changes.append(Change('event', event.id, 'delete'))
+            # Clean up associated links and dependent notes
+            changes += self._remove_links('event', event.id)
+            changes += self._remove_dependent_notes('event', event.id)
+        if changes:
+            self.commit(changes)
+        return len(events_to_delete) + cancelled
     
+    @_writes
     def delete_todo(self, todo_id: int) -> bool:
         """Delete a todo by ID and all associated links and dependent notes."""
         todo = next((t for t in self.todos if t.id == todo_id), None)
         if todo:
             self.todos.remove(todo)
-            # Clean up associated links
-            self.links = [l for l in self.links if not (
-                (l.from_type == 'todo' and l.from_id == todo_id) or
-                (l.to_type == 'todo' and l.to_id == todo_id)
-            )]
-            # Clean up dependent notes
-            self.dependent_notes = [n for n in self.dependent_notes if not (
-                n.parent_type == 'todo' and n.parent_id == todo_id
-            )]
-            self.save()
+            changes = [Change('todo', todo_id, 'delete')]
+            # Clean up associated links and dependent notes
+            changes += self._remove_links('todo', todo_id)
+            changes += self._remove_dependent_notes('todo', todo_id)
+            self.commit(changes)
             return True
         return False
     
+    @_writes
     def delete_goal(self, goal_id: int) -> bool:
         """Delete a goal by ID and all associated links and dependent notes."""
         goal = next((g for g in self.goals if g.id == goal_id), None)
         if goal:
             self.goals.remove(goal)
-            # Clean up associated links
-            self.links = [l for l in self.links if not (
-                (l.from_type == 'goal' and l.from_id == goal_id) or
-                (l.to_type == 'goal' and l.to_id == goal_id)
-            )]
-            # Clean up dependent notes
-            self.dependent_notes = [n for n in self.dependent_notes if not (
-                n.parent_type == 'goal' and n.parent_id == goal_id
-            )]
-            self.save()
+            changes = [Change('goal', goal_id, 'delete')]
+            # Clean up associated links and dependent notes
+            changes += self._remove_links('goal', goal_id)
+            changes += self._remove_dependent_notes('goal', goal_id)
+            self.commit(changes)
             return True
         return False
     
+    @_writes
     def delete_note(self, note_id: int) -> bool:
         """Delete a note by ID and all associated links."""
         note = next((n for n in self.notes if n.id == note_id), None)
         if note:
             self.notes.remove(note)
+            changes = [Change('note', note_id, 'delete')]
             # Clean up associated links
-            self.links = [l for l in self.links if not (
-                (l.from_type == 'note' and l.from_id == note_id) or
-                (l.to_type == 'note' and l.to_id == note_id)
-            )]
-            self.save()
+            changes += self._remove_links('note', note_id)
+            self.commit(changes)
             return True
         return False
     
+    @_writes
     def delete_dependent_note(self, note_id: int) -> bool:
         """Delete a dependent note by ID."""
         note = next((n for n in self.dependent_notes if n.id == note_id), None)
         if note:
             self.dependent_notes.remove(note)
-            self.save()
+            self.commit([Change('dependent_note', note_id, 'delete')])
             return True
         return False
     
+    @_reads
     def get_dependent_notes(self, parent_type: str = None, parent_id: int = None) -> List[dict]:
         """Get dependent notes, optionally filtered by parent."""
         if parent_type and parent_id:
@@ -527,34 +1131,68 @@ class Database:
     
     # Update functions (preserve links and notes while updating fields)
     
+    @_writes
     def update_todo(self, todo_id: int, title: Optional[str] = None, description: Optional[str] = None,
                     priority: Optional[int] = None, due_date: Optional[datetime] = None,
                     start_date: Optional[datetime] = None, tags: Optional[List[str]] = None,
-                    completed: Optional[bool] = None) -> Optional[dict]:
-        """Update a todo's fields while preserving all links and dependent notes."""
+                    completed: Optional[bool] = None, recurrence: Optional[Recurrence] = None) -> Optional[dict]:
+        """
+        Update a todo's fields while preserving all links and dependent notes.
+        
+        Completing a recurring todo advances it to its next occurrence instead; it is only
+        marked completed once the series has ended.
+        """
         todo = next((t for t in self.todos if t.id == todo_id), None)
         if not todo:
             return None
         
         # Only update fields that were provided
+        changed = []
         if title is not None:
             todo.title = title
+            changed.append('title')
         if description is not None:
             todo.description = description
+            changed.append('description')
         if priority is not None:
             todo.priority = priority
+            changed.append('priority')
         if due_date is not None:
             todo.due_date = due_date
+            changed.append('due_date')
+            if todo.recurrence and todo.recurrence.anchor:
+                todo.recurrence.anchor = None  # Rescheduled: the series now starts at the new due date
+                changed.append('recurrence')
         if start_date is not None:
             todo.start_date = start_date
+            changed.append('start_date')
         if tags is not None:
             todo.tags = self._normalize_tags(tags)
+            changed.append('tags')
+        if recurrence is not None:
+            todo.recurrence = recurrence
+            changed.append('recurrence')
+        if completed and todo.recurrence and todo.due_date:
+            # The due date of a recurring todo is the original start of its current occurrence;
+            # stepping from the series anchor keeps e.g. a monthly todo on the 31st from drifting
+            anchor = todo.recurrence.anchor or todo.due_date
+            next_due = next_occurrence(anchor, todo.recurrence, todo.due_date)
+            if next_due:
+                if todo.start_date:
+                    todo.start_date = next_due - (todo.due_date - todo.start_date)
+                    changed.append('start_date')
+                todo.recurrence.anchor = anchor
+                todo.due_date = next_due
+                changed += ['recurrence', 'due_date']
+                completed = None
         if completed is not None:
             todo.completed = completed
+            changed.append('completed')
         
-        self.save()
+        self.commit([Change('todo', todo_id, 'update', changed)])
         return self._serialize_todo_with_notes(todo)
     
+    @_writes
     def update_goal(self, goal_id: int, title: Optional[str] = None, description: Optional[str] = None,
                     priority: Optional[int] = None, due_date: Optional[datetime] = None,
                     tags: Optional[List[str]] = None, completed: Optional[bool] = None) -> Optional[dict]:
@@ -564,45 +1202,85 @@ class Database:
             return None
         
         # Only update fields that were provided
+        changed = []
         if title is not None:
             goal.title = title
+            changed.append('title')
         if description is not None:
             goal.description = description
+            changed.append('description')
         if priority is not None:
             goal.priority = priority
+            changed.append('priority')
         if due_date is not None:
             goal.due_date = due_date
+            changed.append('due_date')
         if tags is not None:
             goal.tags = self._normalize_tags(tags)
+            changed.append('tags')
         if completed is not None:
             goal.completed = completed
+            changed.append('completed')
         
-        self.save()
+        self.commit([Change('goal', goal_id, 'update', changed)])
         return self._serialize_goal_with_notes(goal)
     
+    @_writes
     def update_event(self, event_id: int, title: Optional[str] = None, description: Optional[str] = None,
-                     start: Optional[datetime] = None, end: Optional[datetime] = None,
-                     tags: Optional[List[str]] = None) -> Optional[dict]:
+                     date: Optional[datetime] = None, end: Optional[datetime] = None,
+                     tags: Optional[List[str]] = None, recurrence: Optional[Recurrence] = None) -> Optional[dict]:
         """Update an event's fields while preserving all links and dependent notes."""
         event = next((e for e in self.events if e.id == event_id), None)
         if not event:
             return None
         
         # Only update fields that were provided
+        changed = []
         if title is not None:
             event.title = title
+            changed.append('title')
         if description is not None:
             event.description = description
-        if start is not None:
-            event.start = start
+            changed.append('description')
+        if date is not None:
+            event.date = date
+            changed.append('date')
         if end is not None:
             event.end = end
+            changed.append('end')
         if tags is not None:
             event.tags = self._normalize_tags(tags)
+            changed.append('tags')
+        if recurrence is not None:
+            event.recurrence = recurrence
+            changed.append('recurrence')
         
-        self.save()
+        self.commit([Change('event', event_id, 'update', changed)])
         return self._serialize_event_with_notes(event)
     
+    @_writes
+    def set_occurrence_exception(self, entity_type: str, entity_id: int, occurrence: datetime,
+                                 override: Optional[dict]) -> bool:
+        """
+        Cancel (override=None) or modify one occurrence of a recurring event or todo.
+        
+        Args:
+            entity_type: 'event' or 'todo'
+            entity_id: ID of the recurring item
+            occurrence: Original start (events) or due date (todos) of the occurrence
+            override: Serialized fields to replace for that occurrence, e.g. {'date': '2026-03-04T15:00:00'}
+        
+        Returns:
+            False if the item doesn't exist or isn't recurring
+        """
+        item = self._get_entity(entity_type, entity_id) if entity_type in ('event', 'todo') else None
+        if not item or not item.recurrence:
+            return False
+        item.recurrence.exceptions[occurrence.isoformat()] = override
+        self.commit([Change(entity_type, entity_id, 'update', ['recurrence'])])
+        return True
+    
+    @_writes
     def update_note(self, note_id: int, title: Optional[str] = None, content: Optional[str] = None,
                     note_type: Optional[str] = None) -> Optional[dict]:
         """Update a standalone note's fields."""
@@ -611,16 +1289,21 @@ class Database:
             return None
         
         # Only update fields that were provided
+        changed = []
         if title is not None:
             note.title = title
+            changed.append('title')
         if content is not None:
             note.content = content
+            changed.append('content')
         if note_type is not None:
             note.type = note_type
+            changed.append('type')
         
-        self.save()
+        self.commit([Change('note', note_id, 'update', changed)])
         return self._serialize_note(note)
     
+    @_writes
     def update_dependent_note(self, note_id: int, title: Optional[str] = None,
                               content: Optional[str] = None) -> Optional[dict]:
         """Update a dependent note's title or content."""
@@ -629,12 +1312,15 @@ class Database:
             return None
         
         # Only update fields that were provided
+        changed = []
         if title is not None:
             note.title = title
+            changed.append('title')
         if content is not None:
             note.content = content
+            changed.append('content')
         
-        self.save()
+        self.commit([Change('dependent_note', note_id, 'update', changed)])
         return {
             'id': note.id,
             'title': note.title,
@@ -646,18 +1332,21 @@ class Database:
     
     # Search functions
     
+    @_reads
     def search_todos_by_title(self, title: str) -> List[dict]:
         """Search todos by title (case-insensitive partial match)."""
         search = title.lower()
         matching = [t for t in self.todos if search in t.title.lower()]
         return [self._serialize_todo_with_notes(t) for t in matching]
 
+    @_reads
     def search_goals_by_title(self, title: str) -> List[dict]:
         """Search goals by title (case-insensitive partial match)."""
         search = title.lower()
         matching = [g for g in self.goals if search in g.title.lower()]
         return [self._serialize_goal_with_notes(g) for g in matching]
 
+    @_reads
     def search_events_by_title(self, title: str) -> List[dict]:
         """Search events by title (case-insensitive partial match)."""
         search = title.lower()
@@ -666,24 +1355,28 @@ class Database:
 
     # Tag-based search functions (primary search method)
     
+    @_reads
     def search_todos_by_tag(self, tag: str) -> List[dict]:
         """Search todos by tag (case-insensitive match)."""
         tag_lower = tag.lower()
         matching = [t for t in self.todos if any(tag_lower == t_tag.lower() for t_tag in t.tags)]
         return [self._serialize_todo_with_notes(t) for t in matching]
 
+    @_reads
     def search_goals_by_tag(self, tag: str) -> List[dict]:
         """Search goals by tag (case-insensitive match)."""
         tag_lower = tag.lower()
         matching = [g for g in self.goals if any(tag_lower == g_tag.lower() for g_tag in g.tags)]
         return [self._serialize_goal_with_notes(g) for g in matching]
 
+    @_reads
     def search_events_by_tag(self, tag: str) -> List[dict]:
         """Search events by tag (case-insensitive match)."""
         tag_lower = tag.lower()
         matching = [e for e in self.events if any(tag_lower == e_tag.lower() for e_tag in e.tags)]
         return [self._serialize_event_with_notes(e) for e in matching]
 
+    @_reads
     def search_all_by_tag(self, tag: str) -> dict:
         """Search todos, goals, and events by tag and return all results."""
         return {
@@ -0,0 +1,140 @@
+"""
+Near-duplicate detection for item titles.
+
+Titles are normalized (case, punctuation and filler words removed) and turned
+into a set of shingles: the remaining words plus the character trigrams of each
+word, so "Finish the report" matches "finish report" exactly and "Finsh report"
+still scores high. Each title gets a MinHash signature, and signatures are
+bucketed by band (locality-sensitive hashing), so a lookup only compares the new
+title against the few stored titles that share a band instead of every item.
+Candidates are then scored by the exact Jaccard similarity of their shingles.
+"""
+
+import random
+import re
+import zlib
+from functools import lru_cache
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+DUPLICATE_THRESHOLD = 0.55  # Minimum Jaccard similarity reported as a probable duplicate
+NUM_HASHES = 32
+BANDS = 16  # NUM_HASHES / BANDS rows per band; lower bands catch pairs from ~0.3 similarity up
+
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'my', 'our', 'your', 'to', 'for', 'of', 'on', 'in', 'at', 'with',
+    'and', 'some', 'up', 'go', 'please',
+})
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240501)  # Fixed seed so signatures are identical across runs
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip punctuation and filler words: 'Finish the report!' -> 'finish report'."""
+    words = _WORD_RE.findall((title or '').lower())
+    kept = [w for w in words if w not in STOPWORDS]
+    return ' '.join(kept or words)
+
+
+def shingles(title: str) -> Set[str]:
+    """Words of the normalized title plus the character trigrams of each word."""
+    result = set()
+    for word in normalize_title(title).split():
+        result.add(word)
+        padded = f"^{word}$"
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+@lru_cache(maxsize=1 << 16)
+def _shingle_hashes(shingle: str) -> Tuple[int, ...]:
+    # Words and trigrams repeat across titles, so each shingle's hash vector is computed once
+    h = zlib.crc32(shingle.encode())
+    return tuple((a * h + b) % _PRIME for a, b in _HASH_PARAMS)
+
+
+def minhash(shingle_set: Set[str]) -> Tuple[int, ...]:
+    """MinHash signature of a shingle set."""
+    if not shingle_set:
+        return (0,) * NUM_HASHES
+    return tuple(map(min, zip(*map(_shingle_hashes, shingle_set))))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class DuplicateIndex:
+    """Title index of one entity type that finds stored titles similar to a new one."""
+
+    def __init__(self):
+        self._shingles: Dict[Hashable, Set[str]] = {}
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._shingles
+
+    @staticmethod
+    def _bands(signature: Tuple[int, ...]):
+        rows = NUM_HASHES // BANDS
+        for band in range(BANDS):
+            yield band, signature[band * rows:(band + 1) * rows]
+
+    def add(self, key: Hashable, title: str):
+        """Index a title, replacing any title already indexed under this key."""
+        self.remove(key)
+        shingle_set = shingles(title)
+        signature = minhash(shingle_set)
+        self._shingles[key] = shingle_set
+        self._signatures[key] = signature
+        for bucket in self._bands(signature):
+            self._buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, key: Hashable) -> bool:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return False
+        del self._shingles[key]
+        for bucket in self._bands(signature):
+            keys = self._buckets[bucket]
+            keys.discard(key)
+            if not keys:
+                del self._buckets[bucket]
+        return True
+
+    def clear(self):
+        self._shingles = {}
+        self._signatures = {}
+        self._buckets = {}
+
+    def find(self, title: str, threshold: float = DUPLICATE_THRESHOLD,
+             exclude: Optional[Hashable] = None) -> List[Tuple[Hashable, float]]:
+        """(key, similarity) of indexed titles at least `threshold` similar to `title`, most similar first."""
+        shingle_set = shingles(title)
+        candidates = set()
+        for bucket in self._bands(minhash(shingle_set)):
+            candidates.update(self._buckets.get(bucket, ()))
+        candidates.discard(exclude)
+        matches = []
+        for key in candidates:
+            score = jaccard(shingle_set, self._shingles[key])
+            if score >= threshold:
+                matches.append((key, round(score, 3)))
+        matches.sort(key=lambda m: (-m[1], str(m[0])))
+        return matches
+
+
+class DuplicateError(ValueError):
+    """Raised when an insert is rejected as a near-duplicate; `duplicates` holds the matching items."""
+
+    def __init__(self, message: str, duplicates: List[dict]):
+        super().__init__(message)
+        self.duplicates = duplicates
@@ -0,0 +1,86 @@
+"""
+Compact encoding of tool results for the model's context.
+
+Plain json.dumps spends many tokens on things the model doesn't need: null and
+empty fields, microsecond timestamps, the same keys repeated for every item of a
+list, and long lists in full. encode() instead:
+
+- drops null and empty fields ("description": "", "tags": [], "notes": null)
+- shortens timestamps (2026-02-10T14:00:00.000000 -> 2026-02-10T14:00, midnight -> 2026-02-10),
+  which are still valid ISO input for the tools
+- writes lists of similar objects as a table: {"columns": [...], "rows": [[...], ...]}
+- keeps the first MAX_ITEMS items of long lists and says how many were left out
+
+Example:
+    encode([{"id": 1, "title": "Pay rent", "due_date": "2026-02-01T00:00:00", "tags": []}, ...])
+    -> {"columns":["id","title","due_date"],"rows":[[1,"Pay rent","2026-02-01"],...]}
+"""
+
+import json
+import re
+from typing import Any, List
+
+MAX_ITEMS = 25  # Items of a list sent to the model; the rest are counted, not listed
+TABLE_MIN_ROWS = 3  # Lists of at least this many objects are written as tables
+TRUNCATED_HINT = "Only the first {shown} of {total} items are shown. Use a narrower query (e.g. search by tag or title, or a shorter date range) to see the others."
+
+_TIMESTAMP = re.compile(r"^(\d{4}-\d\d-\d\d)[T ](\d\d:\d\d)(:\d\d(\.\d+)?)?$")
+
+
+def shorten_timestamp(value: str) -> str:
+    """Drop seconds (when zero) and microseconds from an ISO timestamp, and the time at midnight."""
+    match = _TIMESTAMP.match(value)
+    if not match:
+        return value
+    date, hours_minutes, seconds = match.group(1), match.group(2), match.group(3) or ''
+    if seconds and not seconds.startswith(':00'):
+        return f"{date}T{hours_minutes}{seconds[:3]}"
+    return date if hours_minutes == '00:00' else f"{date}T{hours_minutes}"
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == '' or value == [] or value == {}
+
+
+def compact(value: Any, max_items: int = MAX_ITEMS) -> Any:
+    """The compact form of a JSON-serializable value (see the module docstring)."""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            item = compact(item, max_items)
+            if not _is_empty(item):
+                result[key] = item
+        return result
+    if isinstance(value, (list, tuple)):
+        items = [compact(item, max_items) for item in value[:max_items]]
+        table = _table(items)
+        if len(value) <= max_items:
+            return table if table is not None else items
+        result = table if table is not None else {"items": items}
+        result["total"] = len(value)
+        result["note"] = TRUNCATED_HINT.format(shown=max_items, total=len(value))
+        return result
+    if isinstance(value, str):
+        return shorten_timestamp(value)
+    return value
+
+
+def _table(items: List[Any]):
+    """Header-plus-rows form of a list of objects, or None if it isn't one (or is too short)."""
+    if len(items) < TABLE_MIN_ROWS or not all(isinstance(item, dict) for item in items):
+        return None
+    columns = []
+    for item in items:
+        for key in item:
+            if key not in columns:
+                columns.append(key)
+    return {"columns": columns, "rows": [[item.get(key) for key in columns] for item in items]}
+
+
+def encode(result: Any, compact_mode: bool = True) -> str:
+    """Serialize a tool result for the model: compact (default) or plain JSON."""
+    if not compact_mode:
+        return json.dumps(result, default=str)
+    # Round-trip through json first so dates and other objects become strings (default=str)
+    plain = json.loads(json.dumps(result, default=str))
+    return json.dumps(compact(plain), separators=(',', ':'), ensure_ascii=False)
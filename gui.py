@@ -1,10 +1,13 @@
 import tkinter as tk
 from tkinter import scrolledtext, ttk, messagebox
 from tkcalendar import Calendar
+import asyncio
 import threading
-from datetime import datetime
-from ai_client import ask_ai
+from datetime import datetime, timedelta
+from ai_client import ask_ai_async, summarize_conversation
+from data import Change
 from db import db
+from history import ConversationHistory
 
 # Panel width settings (adjust these to change Goals/To-Dos widths)
 class JarvisGUI:
@@ -15,8 +18,14 @@ class JarvisGUI:
         self.root.configure(bg="#f0f0f0")
         
         self.debug = False
-        self.response_thread = None
-        self.conversation_history = []  # Maintain conversation context
+        self.response_future = None  # Pending AI response; cancelled by the Stop button
+        
+        # AI requests run as coroutines on an event loop in a background thread
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="jarvis-ai", daemon=True).start()
+        # Conversation context, summarized as it grows so requests stay small
+        self.conversation_history = ConversationHistory(summarizer=summarize_conversation)
+        self.streaming = False  # True while a streamed response is being shown
         
         # Track calendar double-clicks
         self.last_calendar_click = None
@@ -112,6 +121,9 @@ class JarvisGUI:
         send_button = ttk.Button(entry_frame, text="Send", command=self.send_message, width=10)
         send_button.pack(side=tk.RIGHT)
         
+        self.stop_button = ttk.Button(entry_frame, text="Stop", command=self.stop_response, width=8, state=tk.DISABLED)
+        self.stop_button.pack(side=tk.RIGHT, padx=(0, 5))
+        
         # Welcome message
         self.add_message("Welcome to Jarvis!", "info")
         self.add_message("Ask me about your events, todos, goals, and notes.", "info")
@@ -187,8 +199,10 @@ class JarvisGUI:
         # Configure calendar tag for event dates
         self.calendar.tag_config("event", background="lightgreen", foreground="black")
         
-        # Load and tag event dates on calendar
+        # Load and tag event dates on calendar (re-marked when the displayed month changes,
+        # since recurring events are only expanded for the visible range)
         self.load_event_dates()
+        self.calendar.bind("<<CalendarMonthChanged>>", lambda e: self.load_event_dates())
         
         # Bind click events to all calendar date labels
         self.calendar.bind("<Button-1>", self._on_calendar_click, add=True)
@@ -196,6 +210,9 @@ class JarvisGUI:
             child.bind("<Button-1>", self._on_calendar_click, add=True)
             for grandchild in child.winfo_children():
                 grandchild.bind("<Button-1>", self._on_calendar_click, add=True)
+
+        # Keep panels in sync with the database, including changes made by the AI
+        self.db.subscribe(self._on_db_change)
     
     def setup_styles(self):
         """Configure ttk styles"""
@@ -238,7 +255,7 @@ class JarvisGUI:
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
         self.add_message("Conversation history cleared.\n", "info")
     
     def send_message(self):
@@ -256,49 +273,76 @@ class JarvisGUI:
         
         # Disable send button and input field while processing
         self.input_field.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL)
         
-        # Start AI response in a separate thread to keep UI responsive
-        self.response_thread = threading.Thread(
-            target=self._get_ai_response,
-            args=(user_input,),
-            daemon=True
-        )
-        self.response_thread.start()
+        # Get the AI response on the background event loop to keep the UI responsive
+        self.response_future = asyncio.run_coroutine_threadsafe(self._get_ai_response(user_input), self.loop)
+        self.response_future.add_done_callback(self._on_response_done)
     
-    def _get_ai_response(self, user_input):
-        """Get AI response in background thread"""
+    def stop_response(self):
+        """Cancel the pending AI response"""
+        if self.response_future:
+            self.response_future.cancel()
+    
+    def _on_response_done(self, future):
+        """Called when a response finishes, fails or is cancelled (possibly before it started)"""
+        if future.cancelled():
+            self.root.after(0, self._display_stopped)
+        # Re-enable input field
+        self.root.after(0, self._enable_input)
+    
+    async def _get_ai_response(self, user_input):
+        """Get AI response on the background event loop"""
         try:
             if self.debug:
-                self.add_message("\n[DEBUG] Sending query to AI...", "debug")
+                self.root.after(0, self.add_message, "\n[DEBUG] Sending query to AI...", "debug")
             
-            ai_message, usage = ask_ai(user_input, debug=self.debug, messages_history=self.conversation_history)
+            # Stream the reply into the chat display; Tk calls must run on the main thread
+            ai_message, usage = await ask_ai_async(user_input, debug=self.debug, messages_history=self.conversation_history.messages(),
+                                                   on_delta=lambda text: self.root.after(0, self._append_delta, text))
             
             # Add this exchange to conversation history for context
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": ai_message})
+            self.conversation_history.add_turn(user_input, ai_message)
             
             # Add AI response to display in main thread
             self.root.after(0, self._display_ai_response, ai_message, usage)
         
         except Exception as e:
             self.root.after(0, self._display_error, str(e))
-        
-        finally:
-            # Re-enable input field
-            self.root.after(0, self._enable_input)
+    
+    def _append_delta(self, text):
+        """Append streamed response text to the chat display (called from main thread)"""
+        if not self.streaming:
+            self.streaming = True
+            self.add_message("\nJarvis: ", "ai")
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, text, "ai")
+        self.chat_display.config(state=tk.DISABLED)
+        self.chat_display.see(tk.END)
     
     def _display_ai_response(self, ai_message, usage):
         """Display AI response (called from main thread)"""
-        self.add_message(f"\nJarvis: {ai_message}", "ai")
+        if self.streaming:
+            self.streaming = False  # Already shown as it arrived
+        else:
+            self.add_message(f"\nJarvis: {ai_message}", "ai")
         tokens_info = f"\n(Tokens used: Input: {usage.prompt_tokens}, Output: {usage.completion_tokens})"
         self.add_message(tokens_info, "info")
     
+    def _display_stopped(self):
+        """Note a cancelled response (called from main thread)"""
+        self.streaming = False
+        self.add_message("\n(Stopped)", "info")
+    
     def _display_error(self, error_msg):
         """Display error message (called from main thread)"""
+        self.streaming = False
         self.add_message(f"\nError: {error_msg}", "error")
     
     def _enable_input(self):
         """Re-enable input field (called from main thread)"""
+        self.response_future = None
+        self.stop_button.config(state=tk.DISABLED)
         self.input_field.config(state=tk.NORMAL)
         self.input_field.focus()
 
@@ -310,17 +354,21 @@ class JarvisGUI:
 
             goals = self.db.get_goals(completed=False)
             for g in goals:
-                gid = g.get('id')
-                title = g.get('title', '')
-                priority = g.get('priority', '')
-                due = g.get('due_date') or ''
-                if due:
-                    # show date portion only
-                    due = due.split('T')[0]
-                self.goals_tree.insert('', tk.END, iid=str(gid), values=(title, priority, due))
+                self.goals_tree.insert('', tk.END, iid=str(g.get('id')), values=self._goal_row_values(g))
         except Exception as e:
             self.add_message(f"Error loading goals: {e}", "error")
 
+    @staticmethod
+    def _goal_row_values(g):
+        """Treeview column values for a serialized goal."""
+        title = g.get('title', '')
+        priority = g.get('priority', '')
+        due = g.get('due_date') or ''
+        if due:
+            # show date portion only
+            due = due.split('T')[0]
+        return (title, priority, due)
+
     def _on_goal_double_click(self, event):
         """Open an edit dialog for the selected goal."""
         sel = self.goals_tree.selection()
@@ -394,17 +442,15 @@ class JarvisGUI:
                     messagebox.showerror("Validation Error", "Due date must be YYYY-MM-DD.")
                     return
 
-            # Update goal object
-            goal_obj.title = new_title
-            goal_obj.description = new_desc
-            goal_obj.priority = new_priority
-            goal_obj.due_date = new_due
-            goal_obj.completed = bool(completed_var.get())
-
             try:
-                # Save DB and refresh UI
-                self.db.save()
-                self.load_goals()
+                # One save under the write lock; the change feed refreshes the goals panel
+                with self.db.batch():
+                    self.db.update_goal(gid, title=new_title, description=new_desc, priority=new_priority,
+                                        due_date=new_due, completed=bool(completed_var.get()))
+                    # update_goal leaves the due date alone when it isn't given; clear it if left blank
+                    if new_due is None and goal_obj.due_date is not None:
+                        goal_obj.due_date = None
+                        self.db.commit([Change('goal', gid, 'update', ['due_date'])])
                 win.destroy()
                 self.add_message(f"Goal '{new_title}' updated.", "info")
             except Exception as e:
@@ -439,38 +485,71 @@ class JarvisGUI:
 
             todos = self.db.get_all_todos()
             for t in todos:
-                tid = t.get('id')
-                title = t.get('title', '')
-                priority = t.get('priority', '')
-                due = t.get('due_date') or ''
-                if due:
-                    due = due.split('T')[0]
-                completed = 'Yes' if t.get('completed') else 'No'
-                self.todos_tree.insert('', tk.END, iid=str(tid), values=(title, priority, due, completed))
+                self.todos_tree.insert('', tk.END, iid=str(t.get('id')), values=self._todo_row_values(t))
         except Exception as e:
             self.add_message(f"Error loading todos: {e}", "error")
 
+    @staticmethod
+    def _todo_row_values(t):
+        """Treeview column values for a serialized todo."""
+        title = t.get('title', '')
+        priority = t.get('priority', '')
+        due = t.get('due_date') or ''
+        if due:
+            due = due.split('T')[0]
+        completed = 'Yes' if t.get('completed') else 'No'
+        return (title, priority, due, completed)
+
+    def _on_db_change(self, changes):
+        """Database subscriber; may run on the AI worker thread, so defer to the Tk main thread."""
+        self.root.after(0, self._apply_db_changes, changes)
+
+    def _apply_db_changes(self, changes):
+        """Update only the affected goal/todo rows, and re-mark the calendar if events changed."""
+        try:
+            for change in changes:
+                if change.entity_type == 'goal':
+                    goal = next((g for g in self.db.goals if g.id == change.entity_id), None)
+                    # The goals panel only lists incomplete goals
+                    row = self._goal_row_values(self.db._serialize_goal(goal)) if goal and not goal.completed else None
+                    self._update_tree_row(self.goals_tree, change.entity_id, row)
+                elif change.entity_type == 'todo':
+                    todo = next((t for t in self.db.todos if t.id == change.entity_id), None)
+                    # The todos panel only lists incomplete todos
+                    row = self._todo_row_values(self.db._serialize_todo(todo)) if todo and not todo.completed else None
+                    self._update_tree_row(self.todos_tree, change.entity_id, row)
+            if any(c.entity_type == 'event' for c in changes):
+                self.load_event_dates()
+        except Exception as e:
+            self.add_message(f"Error refreshing panels: {e}", "error")
+
+    @staticmethod
+    def _update_tree_row(tree, entity_id, values):
+        """Insert, update, or (when values is None) remove a single treeview row."""
+        iid = str(entity_id)
+        if values is None:
+            if tree.exists(iid):
+                tree.delete(iid)
+        elif tree.exists(iid):
+            tree.item(iid, values=values)
+        else:
+            tree.insert('', tk.END, iid=iid, values=values)
+
     def load_event_dates(self):
-        """Load event dates from database and tag them on the calendar."""
+        """Tag dates with events (including recurring occurrences) around the displayed month."""
         try:
-            # Get all events from database
-            events = self.db.get_all_events()
+            # The calendar also shows days of the neighbouring months
+            month, year = self.calendar.get_displayed_month()
+            window_start = datetime(year, month, 1) - timedelta(days=7)
+            window_end = datetime(year + month // 12, month % 12 + 1, 1) + timedelta(days=14)
+            events = self.db.get_events_between(window_start, window_end)
             
             # Extract unique dates and tag them
-            event_dates = set()
-            for event in events:
-                # Extract date from event
-                event_date = event.get('date')
-                if event_date:
-                    # Parse ISO format date
-                    if isinstance(event_date, str):
-                        date_only = event_date.split('T')[0]
-                        parsed_date = datetime.fromisoformat(date_only).date()
-                        event_dates.add(parsed_date)
-                    else:
-                        parsed_date = event_date.date() if isinstance(event_date, datetime) else event_date
-                        event_dates.add(parsed_date)
+            event_dates = {datetime.fromisoformat(e['date']).date() for e in events}
             
+            # Clear previous marks so deleted or moved events disappear
+            self.calendar.calevent_remove('all')
+
             # Tag each event date on the calendar using calevent_create
             for date in event_dates:
                 self.calendar.calevent_create(date, "", "event")
@@ -505,43 +584,38 @@ class JarvisGUI:
             if not selected_date:
                 return
             
-            # Check if there are events on this date
-            events_on_date = []
-            all_events = self.db.get_all_events()
-            
-            for e in all_events:
-                event_date = e.get('date')
-                
-                if isinstance(event_date, str):
-                    parsed_date = datetime.fromisoformat(event_date.split('T')[0]).date()
-                else:
-                    parsed_date = event_date.date() if isinstance(event_date, datetime) else event_date
-                
-                if parsed_date == selected_date:
-                    events_on_date.append(e)
+            # Check if there are events (or recurring occurrences) on this date
+            day_start = datetime.combine(selected_date, datetime.min.time())
+            events_on_date = self.db.get_events_between(day_start, day_start + timedelta(days=1))
             
             # If no events, allow creating a new one; if one event, edit it; if multiple, show list
             if not events_on_date:
                 self._open_event_editor(None, selected_date)
             elif len(events_on_date) == 1:
-                # Open editor for the single event
+                # Open editor for the single event (or, for a recurring event, that occurrence)
                 event_id = events_on_date[0].get('id')
                 event_obj = next((e for e in self.db.events if e.id == event_id), None)
                 if event_obj:
-                    self._open_event_editor(event_obj)
+                    occurrence = events_on_date[0] if events_on_date[0].get('occurrence') else None
+                    self._open_event_editor(event_obj, occurrence=occurrence)
             else:
                 # Multiple events - show selection dialog
                 messagebox.showinfo("Multiple Events", f"Found {len(events_on_date)} events on this date. Feature coming soon.")
         except Exception as e:
             self.add_message(f"Error handling calendar date: {e}", "error")
 
-    def _open_event_editor(self, event_obj=None, new_date=None):
-        """Open an event editor dialog."""
+    def _open_event_editor(self, event_obj=None, new_date=None, occurrence=None):
+        """
+        Open an event editor dialog. Given an occurrence of a recurring event (as returned
+        by get_events_between), only that occurrence is changed, not the whole series.
+        """
         if event_obj is None and new_date is None:
             return
         
         win = tk.Toplevel(self.root)
-        if event_obj:
+        if occurrence:
+            win.title(f"Edit Occurrence: {occurrence['title']} ({occurrence['occurrence']})")
+        elif event_obj:
             win.title(f"Edit Event: {event_obj.title}")
         else:
             win.title(f"New Event: {new_date}")
@@ -550,7 +624,11 @@ class JarvisGUI:
 
         # Title
         ttk.Label(win, text="Title:").grid(row=0, column=0, sticky=tk.W, padx=8, pady=6)
-        title_var = tk.StringVar(value=event_obj.title if event_obj else "")
+        if occurrence:
+            title_val = occurrence['title']
+        else:
+            title_val = event_obj.title if event_obj else ""
+        title_var = tk.StringVar(value=title_val)
         title_entry = ttk.Entry(win, textvariable=title_var, width=60)
         title_entry.grid(row=0, column=1, padx=8, pady=6)
 
@@ -558,12 +636,16 @@ class JarvisGUI:
         ttk.Label(win, text="Description:").grid(row=1, column=0, sticky=tk.NW, padx=8, pady=6)
         desc_text = tk.Text(win, width=60, height=8)
         desc_text.grid(row=1, column=1, padx=8, pady=6)
-        if event_obj:
+        if occurrence:
+            desc_text.insert(tk.END, occurrence.get('description') or "")
+        elif event_obj:
             desc_text.insert(tk.END, event_obj.description or "")
 
         # Date
         ttk.Label(win, text="Date (YYYY-MM-DD HH:MM):").grid(row=2, column=0, sticky=tk.W, padx=8, pady=6)
-        if event_obj:
+        if occurrence:
+            date_val = occurrence['date']
+        elif event_obj:
             date_val = event_obj.date.isoformat() if event_obj.date else ""
         else:
             date_val = f"{new_date} 12:00"
@@ -573,7 +655,11 @@ class JarvisGUI:
 
         # Tags
         ttk.Label(win, text="Tags (comma separated):").grid(row=3, column=0, sticky=tk.W, padx=8, pady=6)
-        tags_var = tk.StringVar(value=','.join(getattr(event_obj, 'tags', []) or []) if event_obj else "")
+        if occurrence:
+            tags_val = ','.join(occurrence.get('tags') or [])
+        else:
+            tags_val = ','.join(getattr(event_obj, 'tags', []) or []) if event_obj else ""
+        tags_var = tk.StringVar(value=tags_val)
         tags_entry = ttk.Entry(win, textvariable=tags_var, width=40)
         tags_entry.grid(row=3, column=1, sticky=tk.W, padx=8, pady=6)
 
@@ -606,21 +692,28 @@ class JarvisGUI:
             tags_input = tags_var.get().strip()
             new_tags = [t.strip() for t in tags_input.split(',') if t.strip()]
 
-            if event_obj:
-                # Update existing event
-                event_obj.title = new_title
-                event_obj.description = new_desc
-                event_obj.date = new_date_obj
-                event_obj.tags = new_tags
-                msg = f"Event '{new_title}' updated."
-            else:
-                # Create new event
-                self.db.add_event(new_title, new_date_obj, new_desc, new_tags)
-                msg = f"Event '{new_title}' created."
-
             try:
-                self.db.save()
-                self.load_event_dates()  # Refresh calendar
+                # Saving commits the change; the change feed refreshes the calendar
+                if occurrence:
+                    # Override this occurrence only, where it differs from the series
+                    original = datetime.fromisoformat(occurrence['occurrence'])
+                    override = {}
+                    if new_date_obj != original:
+                        override['date'] = new_date_obj.isoformat()
+                    for field, value in (('title', new_title), ('description', new_desc), ('tags', new_tags)):
+                        if value != (getattr(event_obj, field) or type(value)()):
+                            override[field] = value
+                    self.db.set_occurrence_exception('event', event_obj.id, original, override)
+                    msg = f"Occurrence of '{new_title}' on {original:%Y-%m-%d} updated."
+                elif event_obj:
+                    # Update existing event
+                    self.db.update_event(event_obj.id, title=new_title, description=new_desc,
+                                         date=new_date_obj, tags=new_tags)
+                    msg = f"Event '{new_title}' updated."
+                else:
+                    # Create new event
+                    self.db.add_event(new_title, new_date_obj, new_desc, new_tags)
+                    msg = f"Event '{new_title}' created."
                 win.destroy()
                 self.add_message(msg, "info")
             except Exception as e:
@@ -746,18 +839,21 @@ class JarvisGUI:
             tags_input = tags_var.get().strip()
             new_tags = [t.strip() for t in tags_input.split(',') if t.strip()]
 
-            # Update todo object
-            todo_obj.title = new_title
-            todo_obj.description = new_desc
-            todo_obj.priority = new_priority
-            todo_obj.due_date = new_due
-            todo_obj.start_date = new_start
-            todo_obj.completed = bool(completed_var.get())
-            todo_obj.tags = new_tags
-
             try:
-                self.db.save()
-                self.load_todos()
+                # One save under the write lock; the change feed refreshes the todos panel
+                with self.db.batch():
+                    # update_todo moves a completed recurring todo on to its next occurrence, and
+                    # re-anchors its series when the due date changes, so only pass a changed date
+                    self.db.update_todo(tid, title=new_title, description=new_desc, priority=new_priority,
+                                        due_date=new_due if new_due != todo_obj.due_date else None,
+                                        start_date=new_start, tags=new_tags, completed=bool(completed_var.get()))
+                    # update_todo leaves dates it isn't given alone; clear the ones left blank here
+                    cleared = [field for field, value in (('due_date', new_due), ('start_date', new_start))
+                               if value is None and getattr(todo_obj, field) is not None]
+                    for field in cleared:
+                        setattr(todo_obj, field, None)
+                    if cleared:
+                        self.db.commit([Change('todo', tid, 'update', cleared)])
                 win.destroy()
                 self.add_message(f"To-Do '{new_title}' updated.", "info")
             except Exception as e:
@@ -0,0 +1,160 @@
+"""
+Token-budgeted conversation history.
+
+Every exchange is kept until the history outgrows its token budget. The oldest
+turns are then folded into a running summary on a background thread, so the
+history sent with each request stays about the same size however long the
+session runs. The most recent turns are pinned: they are always sent verbatim.
+
+Tokens are counted with tiktoken when it is installed, otherwise estimated from
+the text length (about 4 characters per token for English).
+"""
+
+import threading
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # Not installed, or the encoding can't be loaded offline
+    _encoding = None
+
+HISTORY_TOKEN_BUDGET = 3000  # Tokens of history (summary included) sent with each request
+PINNED_TURNS = 3  # Most recent exchanges that are never summarized or dropped
+# Compaction shrinks the history to this share of the budget, so it doesn't run after every turn
+COMPACT_TARGET = 0.6
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators of each message
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+Turn = Tuple[dict, dict]  # (user message, assistant message)
+
+
+def estimate_tokens(text: str) -> int:
+    """Number of tokens in text (tiktoken if available, else a length-based estimate)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def extractive_summary(previous_summary: Optional[str], messages: List[dict], max_tokens: int = 300) -> str:
+    """
+    Summarize without a model: the previous summary plus the first sentence of each
+    message, trimmed from the front (oldest first) to fit max_tokens. With no
+    messages, this just trims previous_summary.
+    """
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        text = " ".join((message.get("content") or "").split())
+        sentence = text.split(". ", 1)[0][:160]
+        speaker = "User" if message["role"] == "user" else "Jarvis"
+        lines.append(f"{speaker}: {sentence}")
+    while len(lines) > 1 and estimate_tokens(" | ".join(lines)) > max_tokens:
+        lines.pop(0)
+    summary = " | ".join(lines)
+    if estimate_tokens(summary) > max_tokens:
+        summary = "..." + summary[-max_tokens * 4:]  # Keep the most recent part
+    return summary
+
+
+class ConversationHistory:
+    """User/assistant exchanges of one session, kept within a token budget."""
+
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, pinned_turns: int = PINNED_TURNS,
+                 summarizer: Optional[Callable[[Optional[str], List[dict]], str]] = None):
+        """
+        Args:
+            budget: Tokens of history to send with each request
+            pinned_turns: Number of most recent exchanges always sent verbatim
+            summarizer: Function (previous summary, messages) -> new summary, e.g. a model call.
+                It runs on a background thread; if it fails, extractive_summary is used instead
+        """
+        self.budget = budget
+        self.pinned_turns = pinned_turns
+        self.summarizer = summarizer
+        self.summary: Optional[str] = None
+        self._turns: List[Turn] = []
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._generation = 0  # Bumped by clear() so a running compaction discards its result
+
+    def __len__(self):
+        return len(self._turns)
+
+    def add_turn(self, user_content: str, assistant_content: str):
+        """Record an exchange, and start compacting in the background if over budget."""
+        with self._lock:
+            self._turns.append(({"role": "user", "content": user_content},
+                                {"role": "assistant", "content": assistant_content}))
+            over = self._tokens(self._turns, self.summary) > self.budget
+            if over and not (self._compactor and self._compactor.is_alive()):
+                self._compactor = threading.Thread(target=self.compact, name="history-compactor", daemon=True)
+                self._compactor.start()
+
+    def clear(self):
+        with self._lock:
+            self._turns = []
+            self.summary = None
+            self._generation += 1
+
+    def messages(self) -> List[dict]:
+        """
+        Messages to send before the new user message: the summary (if any) and the turns.
+        If a compaction hasn't caught up yet, the oldest unpinned turns are left out so the
+        result never exceeds the budget (they will be part of the summary once it's done).
+        """
+        with self._lock:
+            turns = list(self._turns)
+            summary = self.summary
+        start = 0
+        while len(turns) - start > self.pinned_turns and self._tokens(turns[start:], summary) > self.budget:
+            start += 1
+        messages = [{"role": "system", "content": SUMMARY_PREFIX + summary}] if summary else []
+        for user, assistant in turns[start:]:
+            messages.extend((user, assistant))
+        return messages
+
+    def tokens(self) -> int:
+        """Tokens of the full history, summary included."""
+        with self._lock:
+            return self._tokens(self._turns, self.summary)
+
+    def compact(self):
+        """Fold the oldest unpinned turns into the summary until the history fits COMPACT_TARGET of the budget."""
+        with self._lock:
+            generation = self._generation
+            turns = list(self._turns)
+            summary = self.summary
+        target = self.budget * COMPACT_TARGET
+        count = 0
+        while len(turns) - count > self.pinned_turns and self._tokens(turns[count:], summary) > target:
+            count += 1
+        if not count:
+            return
+        old_messages = [m for turn in turns[:count] for m in turn]
+        summary_budget = int(target // 3)
+
+        new_summary = None
+        if self.summarizer:
+            try:
+                new_summary = self.summarizer(summary, old_messages)
+            except Exception as e:
+                print(f"Error summarizing conversation history: {e}")
+        if not new_summary or estimate_tokens(new_summary) > summary_budget:
+            new_summary = extractive_summary(new_summary or summary, [] if new_summary else old_messages, summary_budget)
+
+        with self._lock:
+            # Turns are only ever appended, so the summarized ones are still the oldest
+            if generation == self._generation:
+                self._turns = self._turns[count:]
+                self.summary = new_summary
+
+    @staticmethod
+    def _tokens(turns: List[Turn], summary: Optional[str]) -> int:
+        total = estimate_tokens(SUMMARY_PREFIX + summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+        return total + sum(message_tokens(m) for turn in turns for m in turn)
@@ -0,0 +1,503 @@
+"""
+Streaming bulk import and export.
+
+Formats:
+- ics:   iCalendar events (VEVENT with SUMMARY, DTSTART, DTEND, DESCRIPTION, CATEGORIES,
+         RRULE and EXDATE)
+- csv:   todos, one per row (title, description, priority, due_date, start_date, completed, tags)
+- jsonl: every entity type, one JSON object per line with a "type" key and the same fields
+         as db.json. IDs are remapped on import, so links and dependent notes follow their items.
+
+Files are processed as generator pipelines (lines -> records -> inserts), so memory stays
+bounded by the chunk size rather than the file size. Inserts are grouped with
+Database.batch(), giving one save and one change notification per chunk instead of
+one per item.
+
+Usage:
+    python main.py import calendar.ics
+    python main.py import todos.csv --on-duplicate reject
+    python main.py export backup.jsonl --types todo,goal
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO
+from data import Change
+from db import Database, db as default_db
+from dedupe import DuplicateError
+from recurrence import parse_recurrence
+
+IMPORT_CHUNK_SIZE = 500  # Records per batch (one save per batch)
+FORMATS = ('ics', 'csv', 'jsonl')
+ENTITY_TYPES = ('note', 'todo', 'goal', 'event', 'dependent_note', 'link')  # Parents before children
+CSV_FIELDS = ['id', 'title', 'description', 'priority', 'due_date', 'start_date', 'completed', 'tags']
+
+
+def detect_format(path: str) -> str:
+    """Format from the file extension (.ics/.ical, .csv, .jsonl/.ndjson)."""
+    ext = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+    fmt = {'ics': 'ics', 'ical': 'ics', 'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(ext)
+    if fmt is None:
+        raise ValueError(f"Cannot tell the format of {path!r}; use one of {', '.join(FORMATS)}")
+    return fmt
+
+
+# iCalendar
+
+_ICS_ESCAPES = {'n': '\n', 'N': '\n', ',': ',', ';': ';', '\\': '\\'}
+_ICS_SUPPORTED_RRULE = {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'WKST'}
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    """Join folded content lines (continuation lines start with a space or tab)."""
+    current = None
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _parse_content_line(line: str):
+    """Split 'NAME;PARAM=x:value' into (name, params, value)."""
+    in_quotes = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == ':' and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return None, {}, ''
+    name, *param_parts = head.split(';')
+    params = {}
+    for part in param_parts:
+        key, _, val = part.partition('=')
+        params[key.upper()] = val.strip('"')
+    return name.upper(), params, value
+
+
+def _ics_unescape(value: str) -> str:
+    return re.sub(r'\\(.)', lambda m: _ICS_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def _ics_escape(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _parse_ics_datetime(value: str) -> datetime:
+    """Parse DATE or DATE-TIME values. UTC times are converted to local time; TZID times are kept as wall time."""
+    value = value.strip()
+    if len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d')
+    if value.endswith('Z'):
+        utc = datetime.strptime(value[:-1], '%Y%m%dT%H%M%S').replace(tzinfo=timezone.utc)
+        return utc.astimezone().replace(tzinfo=None)
+    return datetime.strptime(value, '%Y%m%dT%H%M%S')
+
+
+def _format_ics_datetime(dt: datetime) -> str:
+    return dt.strftime('%Y%m%dT%H%M%S')
+
+
+def _parse_rrule(value: str) -> Optional[dict]:
+    parts = dict(part.split('=', 1) for part in value.split(';') if '=' in part)
+    unsupported = set(parts) - _ICS_SUPPORTED_RRULE
+    if unsupported:
+        raise ValueError(f"unsupported RRULE part(s) {', '.join(sorted(unsupported))}")
+    return {
+        'freq': parts.get('FREQ', '').lower(),
+        'interval': int(parts.get('INTERVAL', 1)),
+        'count': int(parts['COUNT']) if 'COUNT' in parts else None,
+        'until': _parse_ics_datetime(parts['UNTIL']).isoformat() if 'UNTIL' in parts else None,
+    }
+
+
+def read_ics(lines: Iterable[str]) -> Iterator[dict]:
+    """Yield event records from iCalendar lines, one VEVENT at a time."""
+    event = None
+    for line in _unfold(lines):
+        name, params, value = _parse_content_line(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = {'type': 'event', 'title': '', 'description': '', 'tags': []}
+            exdates = []
+            rrule = None
+        elif event is None:
+            continue
+        elif name == 'END' and value.upper() == 'VEVENT':
+            if rrule:
+                try:
+                    event['recurrence'] = _parse_rrule(rrule)
+                    event['recurrence']['exceptions'] = {d: None for d in exdates}
+                except ValueError as e:
+                    print(f"Event '{event['title']}': {e}; importing its first occurrence only")
+            yield event
+            event = None
+        elif name == 'SUMMARY':
+            event['title'] = _ics_unescape(value)
+        elif name == 'DESCRIPTION':
+            event['description'] = _ics_unescape(value)
+        elif name == 'DTSTART':
+            event['date'] = _parse_ics_datetime(value).isoformat()
+        elif name == 'DTEND':
+            event['end'] = _parse_ics_datetime(value).isoformat()
+        elif name == 'CATEGORIES':
+            event['tags'] += [_ics_unescape(t) for t in re.split(r'(?<!\\),', value) if t]
+        elif name == 'RRULE':
+            rrule = value
+        elif name == 'EXDATE':
+            exdates += [_parse_ics_datetime(d).isoformat() for d in value.split(',') if d]
+        elif name == 'RECURRENCE-ID':
+            event['recurrence_id'] = value  # Override of one occurrence; rejected by _import_record
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets without splitting multi-byte characters."""
+    parts = []
+    current, size = '', 0
+    for ch in line:
+        n = len(ch.encode('utf-8'))
+        if size + n > 75:
+            parts.append(current)
+            current, size = ' ', 1
+        current += ch
+        size += n
+    parts.append(current)
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def _ics_event_lines(uid: str, record: dict, stamp: str) -> Iterator[str]:
+    yield 'BEGIN:VEVENT'
+    yield f'UID:{uid}'
+    yield f'DTSTAMP:{stamp}'
+    yield f"DTSTART:{_format_ics_datetime(datetime.fromisoformat(record['date']))}"
+    if record.get('end'):
+        yield f"DTEND:{_format_ics_datetime(datetime.fromisoformat(record['end']))}"
+    yield f"SUMMARY:{_ics_escape(record['title'])}"
+    if record.get('description'):
+        yield f"DESCRIPTION:{_ics_escape(record['description'])}"
+    if record.get('tags'):
+        yield f"CATEGORIES:{','.join(_ics_escape(t) for t in record['tags'])}"
+    rule = record.get('recurrence')
+    if rule:
+        parts = [f"FREQ={rule['freq'].upper()}", f"INTERVAL={rule['interval']}"]
+        if rule.get('count'):
+            parts.append(f"COUNT={rule['count']}")
+        if rule.get('until'):
+            parts.append(f"UNTIL={_format_ics_datetime(datetime.fromisoformat(rule['until']))}")
+        yield f"RRULE:{';'.join(parts)}"
+        # Cancelled and moved occurrences are both excluded; moved ones are written as separate events
+        for original in rule.get('exceptions') or {}:
+            yield f"EXDATE:{_format_ics_datetime(datetime.fromisoformat(original))}"
+    yield 'END:VEVENT'
+
+
+def write_ics(records: Iterable[dict], out: TextIO) -> Iterator[dict]:
+    """Write event records as an iCalendar file, yielding each record once written."""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    out.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Jarvis//EN\r\n')
+    for record in records:
+        for line in _ics_event_lines(f"event-{record['id']}@jarvis", record, stamp):
+            out.write(_fold(line))
+        for original, override in ((record.get('recurrence') or {}).get('exceptions') or {}).items():
+            if override:
+                moved = {**record, 'recurrence': None, 'date': original, **override}
+                if record.get('end') and not override.get('end'):
+                    duration = datetime.fromisoformat(record['end']) - datetime.fromisoformat(record['date'])
+                    moved['end'] = (datetime.fromisoformat(moved['date']) + duration).isoformat()
+                for line in _ics_event_lines(f"event-{record['id']}-{original}@jarvis", moved, stamp):
+                    out.write(_fold(line))
+        yield record
+    out.write('END:VCALENDAR\r\n')
+
+
+# CSV (todos)
+
+def read_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """Yield todo records from CSV rows. Only the title column is required."""
+    for row in csv.DictReader(lines):
+        row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+        tags = re.split(r'[;,]', row.get('tags', ''))
+        yield {
+            'type': 'todo',
+            'title': row.get('title', ''),
+            'description': row.get('description', ''),
+            'priority': int(row['priority']) if row.get('priority') else 3,
+            'due_date': row.get('due_date') or None,
+            'start_date': row.get('start_date') or None,
+            'completed': row.get('completed', '').lower() in ('1', 'true', 'yes', 'y', 'x'),
+            'tags': [t for t in tags if t.strip()],
+        }
+
+
+def write_csv(records: Iterable[dict], out: TextIO) -> Iterator[dict]:
+    """Write todo records as CSV, yielding each record once written."""
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow({**record, 'tags': ';'.join(record.get('tags') or [])})
+        yield record
+
+
+# JSONL (all entity types)
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[dict]:
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Skipping line {number}: invalid JSON ({e})")
+
+
+def write_jsonl(records: Iterable[dict], out: TextIO) -> Iterator[dict]:
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        yield record
+
+
+READERS = {'ics': read_ics, 'csv': read_csv, 'jsonl': read_jsonl}
+WRITERS = {'ics': write_ics, 'csv': write_csv, 'jsonl': write_jsonl}
+EXPORT_TYPES = {'ics': ('event',), 'csv': ('todo',), 'jsonl': ENTITY_TYPES}
+
+
+# Import
+
+def _optional_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _import_record(database: Database, record: dict, id_map: dict, on_duplicate: Optional[str]) -> bool:
+    """
+    Insert one record, remembering its new ID so later links and dependent notes can refer to it.
+    Returns False if the duplicate policy merged it into an existing item instead.
+    """
+    kind = record.get('type')
+    old_id = record.get('id')
+    created_at = _optional_datetime(record.get('created_at'))
+    if kind in ('todo', 'goal', 'event', 'note') and not (record.get('title') or '').strip():
+        raise ValueError(f"{kind} has no title")
+    # With on_duplicate='merge', add_* returns an existing item instead of adding one
+    items = {'todo': database.todos, 'goal': database.goals, 'event': database.events}.get(kind)
+    count = len(items) if items is not None else 0
+    if kind == 'todo':
+        item = database.add_todo(
+            record['title'], record.get('description', ''), int(record.get('priority') or 3),
+            due_date=_optional_datetime(record.get('due_date')),
+            start_date=_optional_datetime(record.get('start_date')),
+            tags=record.get('tags'), recurrence=parse_recurrence(record.get('recurrence')),
+            on_duplicate=on_duplicate)
+    elif kind == 'goal':
+        item = database.add_goal(
+            record['title'], record.get('description', ''), int(record.get('priority') or 3),
+            due_date=_optional_datetime(record.get('due_date')), tags=record.get('tags'),
+            on_duplicate=on_duplicate)
+    elif kind == 'event':
+        if record.get('recurrence_id'):
+            raise ValueError("overrides of single occurrences (RECURRENCE-ID) are not supported")
+        if not record.get('date'):
+            raise ValueError("event has no start date")
+        item = database.add_event(
+            record['title'], datetime.fromisoformat(record['date']), record.get('description', ''),
+            tags=record.get('tags'), end=_optional_datetime(record.get('end')),
+            recurrence=parse_recurrence(record.get('recurrence')), on_duplicate=on_duplicate)
+        created_at = None
+    elif kind == 'note':
+        item = database.add_note(record['title'], record.get('note_type') or 'general',
+                                 record.get('content', ''))
+    elif kind == 'dependent_note':
+        # A 'note' parent is a dependent note (see Database._get_entity)
+        parent_kind = 'dependent_note' if record['parent_type'] == 'note' else record['parent_type']
+        parent_id = id_map.get((parent_kind, record['parent_id']))
+        if parent_id is None:
+            raise ValueError(f"parent {record['parent_type']} {record['parent_id']} was not imported")
+        item = database.add_dependent_note(record['title'], record.get('content', ''),
+                                           record['parent_type'], parent_id)
+    elif kind == 'link':
+        from_id = id_map.get((record['from_type'], record['from_id']))
+        to_id = id_map.get((record['to_type'], record['to_id']))
+        if from_id is None or to_id is None:
+            raise ValueError("linked items were not imported")
+        item = database.create_link(record['from_type'], from_id, record['to_type'], to_id)
+    else:
+        raise ValueError(f"unknown record type {kind!r}")
+
+    if old_id is not None:
+        id_map[(kind, old_id)] = item.id
+    if items is not None and len(items) == count:
+        return False  # Merged: the existing item keeps its own state
+
+    # Restore state that the add_* methods don't take
+    changed = []
+    if record.get('completed') and hasattr(item, 'completed') and not item.completed:
+        item.completed = True
+        changed.append('completed')
+    if created_at and hasattr(item, 'created_at'):
+        item.created_at = created_at
+        changed.append('created_at')
+    if changed:
+        database.commit([Change(kind, item.id, 'update', changed)])
+    return True
+
+
+def import_records(records: Iterable[dict], database: Optional[Database] = None,
+                   chunk_size: int = IMPORT_CHUNK_SIZE, on_duplicate: Optional[str] = None,
+                   progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Insert records in chunks, with one save and one change notification per chunk.
+
+    Invalid records are reported and skipped. Duplicates are checked against items that
+    existed before the current chunk (indexes catch up when each chunk commits).
+
+    Args:
+        records: Record dicts, e.g. from read_ics/read_csv/read_jsonl
+        on_duplicate: Duplicate policy for todos, goals and events (see db.DUPLICATE_POLICIES)
+        progress: Called with the running stats after each chunk
+
+    Returns:
+        Stats dict with 'imported', 'duplicates' (merged or rejected), 'skipped' and 'chunks' counts
+    """
+    database = database or default_db
+    records = iter(records)
+    stats = {'imported': 0, 'duplicates': 0, 'skipped': 0, 'chunks': 0}
+    id_map = {}  # (type, ID in the file) -> new ID
+    number = 0
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        with database.batch():
+            for record in chunk:
+                number += 1
+                try:
+                    if _import_record(database, record, id_map, on_duplicate):
+                        stats['imported'] += 1
+                    else:
+                        stats['duplicates'] += 1
+                except DuplicateError as e:
+                    stats['duplicates'] += 1
+                    # Children in the file attach to the existing item instead
+                    if record.get('id') is not None:
+                        id_map[(record['type'], record['id'])] = e.duplicates[0]['id']
+                except (KeyError, TypeError, ValueError) as e:
+                    stats['skipped'] += 1
+                    print(f"Skipping record {number}: {e}")
+        stats['chunks'] += 1
+        if progress:
+            progress(stats)
+    return stats
+
+
+def import_file(path: str, fmt: Optional[str] = None, **kwargs) -> dict:
+    """Stream a file into the database. Keyword arguments are passed to import_records."""
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', encoding='utf-8', newline='' if fmt == 'csv' else None) as f:
+        return import_records(READERS[fmt](f), **kwargs)
+
+
+# Export
+
+def iter_records(types: Iterable[str] = ENTITY_TYPES, database: Optional[Database] = None) -> Iterator[dict]:
+    """Yield serialized records of the given entity types, parents before children."""
+    database = database or default_db
+    sources = {
+        'note': (database.notes, database._serialize_note),
+        'todo': (database.todos, database._serialize_todo),
+        'goal': (database.goals, database._serialize_goal),
+        'event': (database.events, database._serialize_event),
+        'dependent_note': (database.dependent_notes, database._serialize_dependent_note),
+        'link': (database.links, database._serialize_link),
+    }
+    for kind in ENTITY_TYPES:
+        if kind not in types:
+            continue
+        items, serialize = sources[kind]
+        for item in items:
+            record = serialize(item)
+            if kind == 'note':
+                record['note_type'] = record.pop('type')  # 'type' holds the record type
+            yield {'type': kind, **record}
+
+
+def export_file(path: str, fmt: Optional[str] = None, types: Optional[List[str]] = None,
+                database: Optional[Database] = None, progress: Optional[Callable[[int], None]] = None,
+                progress_every: int = IMPORT_CHUNK_SIZE) -> int:
+    """
+    Stream entities to a file under the read lock, so the export is a consistent snapshot.
+
+    Args:
+        types: Entity types to export (default: all types the format supports)
+        progress: Called with the number of records written every `progress_every` records
+
+    Returns:
+        Number of records written
+    """
+    fmt = fmt or detect_format(path)
+    database = database or default_db
+    supported = EXPORT_TYPES[fmt]
+    types = types or supported
+    unsupported = [t for t in types if t not in supported]
+    if unsupported:
+        raise ValueError(f"{fmt} export supports {', '.join(supported)}, not {', '.join(unsupported)}")
+    count = 0
+    with database.lock.read(), open(path, 'w', encoding='utf-8', newline='' if fmt == 'csv' else None) as f:
+        for _ in WRITERS[fmt](iter_records(types, database), f):
+            count += 1
+            if progress and count % progress_every == 0:
+                progress(count)
+    if progress:
+        progress(count)
+    return count
+
+
+# Command line (python main.py import|export ...)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='main.py', description='Bulk import and export of Jarvis data')
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help='Import events (.ics), todos (.csv) or any items (.jsonl)')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension')
+    import_parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    import_parser.add_argument('--on-duplicate', choices=['warn', 'merge', 'reject'],
+                               help='What to do with items similar to existing ones (default: warn)')
+    export_parser = commands.add_parser('export', help='Export events (.ics), todos (.csv) or all items (.jsonl)')
+    export_parser.add_argument('file')
+    export_parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension')
+    export_parser.add_argument('--types', help=f"Comma-separated entity types ({', '.join(ENTITY_TYPES)})")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'import':
+            def report(stats):
+                print(f"\rImported {stats['imported']} ({stats['duplicates']} duplicates, "
+                      f"{stats['skipped']} skipped)...", end='', file=sys.stderr, flush=True)
+            stats = import_file(args.file, args.format, chunk_size=args.chunk_size,
+                                on_duplicate=args.on_duplicate, progress=report)
+            print(f"\rImported {stats['imported']} records from {args.file} "
+                  f"({stats['duplicates']} duplicates, {stats['skipped']} skipped)", file=sys.stderr)
+        else:
+            types = [t.strip() for t in args.types.split(',')] if args.types else None
+            count = export_file(args.file, args.format, types,
+                                progress=lambda n: print(f"\rExported {n}...", end='', file=sys.stderr, flush=True))
+            print(f"\rExported {count} records to {args.file}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Deterministic fast path for common questions.
+
+Queries like "what's overdue?" or "list my goals" need one tool call and a plain
+listing, yet cost two model round trips. Each Intent here maps such phrasings to
+a read-only tool and a template that renders its result locally, in milliseconds.
+
+A message is answered locally only if an intent's pattern explains almost all of
+it (confidence >= MIN_CONFIDENCE once fillers like "please" or "can you" are
+ignored). Anything more specific ("what's overdue for the kitchen project?") goes
+to the model. Add or remove entries in INTENTS to change what is recognized.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+MIN_CONFIDENCE = 0.85  # Share of the (filler-free) message an intent's pattern must cover
+MAX_LISTED = 15  # Items listed in an answer before "...and N more"
+
+# Words that don't change what is being asked
+_FILLERS = re.compile(
+    r"\b(please|pls|hey|hi|jarvis|can you|could you|would you|will you|tell me|show me|show|give me|"
+    r"let me know|i want to know|do i have|have i got|are there|is there|any|my|me|all|the|"
+    r"currently|right now|now|so far|thanks|thank you)\b"
+)
+
+
+@dataclass
+class Intent:
+    name: str
+    pattern: str  # Regex matched against the normalized message
+    tool: str  # Read-only tool to call
+    render: Callable[[object], str]  # Tool result -> answer text
+    args: Optional[dict] = None
+
+    def __post_init__(self):
+        self._regex = re.compile(self.pattern)
+
+
+def _when(value: Optional[str], with_time: bool = True) -> str:
+    if not value:
+        return ''
+    dt = datetime.fromisoformat(value)
+    if with_time and (dt.hour or dt.minute):
+        return dt.strftime('%a, %b %d %H:%M')
+    return dt.strftime('%a, %b %d')
+
+
+def _bullets(items: List[dict], line: Callable[[dict], str]) -> str:
+    lines = [f"- {line(item)}" for item in items[:MAX_LISTED]]
+    if len(items) > MAX_LISTED:
+        lines.append(f"...and {len(items) - MAX_LISTED} more")
+    return "\n".join(lines)
+
+
+def _item_line(item: dict) -> str:
+    details = []
+    if item.get('due_date'):
+        details.append(f"due {_when(item['due_date'])}")
+    if item.get('priority'):
+        details.append(f"priority {item['priority']}")
+    notes = item.get('notes')
+    if notes:
+        details.append(f"{len(notes)} note{'s' if len(notes) != 1 else ''}")
+    return f"{item['title']} (ID {item['id']}{'; ' + '; '.join(details) if details else ''})"
+
+
+def _event_line(event: dict) -> str:
+    end = datetime.fromisoformat(event['end']).strftime('-%H:%M') if event.get('end') else ''
+    return f"{_when(event['date'])}{end}: {event['title']}"
+
+
+def _plural(count: int, noun: str) -> str:
+    return f"{count} {noun}{'s' if count != 1 else ''}"
+
+
+def _render_items(noun: str, empty: str, heading: str, line=_item_line) -> Callable[[list], str]:
+    def render(items: list) -> str:
+        if not items:
+            return empty
+        return f"{heading.format(count=_plural(len(items), noun))}\n{_bullets(items, line)}"
+    return render
+
+
+def _render_events(items: list) -> str:
+    if not items:
+        return "You have no events in the next 7 days."
+    items = sorted(items, key=lambda e: e['date'])
+    return f"You have {_plural(len(items), 'event')} in the next 7 days:\n{_bullets(items, _event_line)}"
+
+
+INTENTS: List[Intent] = [
+    Intent('overdue_todos',
+           r"(what s|what is|what are|which|list|anything|things|what)? ?(todos?|tasks?|things|items)? ?(are |is )?overdue( todos?| tasks?| items?)?",
+           'get_overdue_todos',
+           _render_items('overdue todo', "Nothing is overdue.", "You have {count}:")),
+    Intent('events_this_week',
+           r"(what s|what is|what do i have|what have i got|what)? ?(on|happening|scheduled|planned|coming up)? ?"
+           r"(events?|schedule|calendar|agenda|plans)? ?(on |for |in )?(this|the|next) (week|7 days)",
+           'get_events_this_week',
+           _render_events),
+    Intent('goals',
+           r"(list|what are|what s|what is|see|view)? ?(open |current |active )?goals",
+           'get_goals',
+           _render_items('open goal', "You have no open goals.", "You have {count}:")),
+    Intent('todos',
+           r"(list|what are|what s|what is|see|view)? ?(open |current |incomplete )?(todos?|to dos?|tasks?|todo list|to do list)( list)?",
+           'get_all_todos',
+           _render_items('open todo', "Your todo list is empty.", "You have {count}:")),
+    Intent('upcoming_todos',
+           r"(what s|what is|what are|which|list)? ?(todos?|tasks?|things)? ?(is |are )?(due|coming up) (soon|this week|in the next 7 days)",
+           'get_upcoming_todos',
+           _render_items('todo', "Nothing is due in the next 7 days.", "{count} due in the next 7 days:"),
+           {'days': 7}),
+    Intent('notes',
+           r"(list|what are|see|view)? ?notes",
+           'get_notes',
+           _render_items('note', "You have no notes.", "You have {count}:", line=lambda n: f"{n['title']} (ID {n['id']})")),
+]
+
+
+def normalize(text: str) -> str:
+    """Lower-case, drop punctuation and filler words, collapse whitespace."""
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.lower())
+    text = _FILLERS.sub(" ", text)
+    return " ".join(text.split())
+
+
+def match(text: str) -> Tuple[Optional[Intent], float]:
+    """The best matching intent and its confidence (share of the normalized message it covers)."""
+    normalized = normalize(text)
+    if not normalized:
+        return None, 0.0
+    best, confidence = None, 0.0
+    for intent in INTENTS:
+        found = intent._regex.search(normalized)
+        if found:
+            covered = len(found.group(0).strip()) / len(normalized)
+            if covered > confidence:
+                best, confidence = intent, covered
+    return best, confidence
+
+
+def answer(text: str, run_tool: Callable[[str, dict], object]) -> Optional[Tuple[str, Intent]]:
+    """
+    Answer a message locally if it confidently matches an intent.
+
+    Args:
+        text: The user's message
+        run_tool: Function (tool name, args) -> tool result, e.g. tool_registry.dispatch
+
+    Returns:
+        (answer text, intent), or None if the model should handle the message
+    """
+    intent, confidence = match(text)
+    if intent is None or confidence < MIN_CONFIDENCE:
+        return None
+    result = run_tool(intent.tool, intent.args or {})
+    if isinstance(result, dict) and (result.get('error') or result.get('success') is False):
+        return None  # Let the model deal with anything unexpected
+    return intent.render(result), intent
@@ -0,0 +1,143 @@
+"""
+Dynamic interval tree for half-open [start, end) ranges.
+
+Implemented as a treap ordered by (start, key) where every node also stores the
+largest end in its subtree. Insert and remove are O(log n) expected; overlap and
+stabbing queries are O(log n + k) for k results, because subtrees whose maximum
+end lies before the query (or whose starts lie after it) are skipped entirely.
+"""
+
+import random
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'key', 'value', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, start, end, key, value):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.priority = random.random()
+        self.left: Optional['_Node'] = None
+        self.right: Optional['_Node'] = None
+        self.max_end = end
+
+    def update(self):
+        m = self.end
+        if self.left is not None and self.left.max_end > m:
+            m = self.left.max_end
+        if self.right is not None and self.right.max_end > m:
+            m = self.right.max_end
+        self.max_end = m
+
+
+def _split(node: Optional[_Node], order: tuple) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split into nodes ordered before `order` and nodes at or after it."""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < order:
+        node.right, right = _split(node.right, order)
+        node.update()
+        return node, right
+    left, node.left = _split(node.left, order)
+    node.update()
+    return left, node
+
+
+def _split_after(node: Optional[_Node], order: tuple) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split into nodes ordered at or before `order` and nodes after it."""
+    if node is None:
+        return None, None
+    if (node.start, node.key) <= order:
+        node.right, right = _split_after(node.right, order)
+        node.update()
+        return node, right
+    left, node.left = _split_after(node.left, order)
+    node.update()
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """Merge two treaps where every node of `left` orders before every node of `right`."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+class IntervalTree:
+    """Index of keyed [start, end) intervals. Keys must be unique, hashable, and mutually orderable."""
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._intervals: Dict[Hashable, Tuple[Any, Any]] = {}  # key -> (start, end)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._intervals
+
+    def insert(self, key: Hashable, start, end, value=None):
+        """Add an interval, replacing any existing interval with the same key."""
+        if end < start:
+            raise ValueError(f"Interval end {end} is before its start {start}")
+        if key in self._intervals:
+            self.remove(key)
+        left, right = _split(self._root, (start, key))
+        self._root = _merge(_merge(left, _Node(start, end, key, value)), right)
+        self._intervals[key] = (start, end)
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove the interval with this key. Returns False if it isn't indexed."""
+        interval = self._intervals.pop(key, None)
+        if interval is None:
+            return False
+        order = (interval[0], key)
+        left, rest = _split(self._root, order)
+        _, right = _split_after(rest, order)
+        self._root = _merge(left, right)
+        return True
+
+    def clear(self):
+        self._root = None
+        self._intervals = {}
+
+    def overlapping(self, start, end) -> List[Any]:
+        """Values of intervals overlapping [start, end), in start order."""
+        results = []
+        self._collect(self._root, start, end, False, results)
+        return results
+
+    def at(self, point) -> List[Any]:
+        """Values of intervals containing `point` (start <= point < end), in start order."""
+        results = []
+        self._collect(self._root, point, point, True, results)
+        return results
+
+    def _collect(self, node: Optional[_Node], start, end, stab: bool, results: list):
+        # Iterative in-order walk with pruning; intervals overlap when s < end and e > start
+        # (for stabbing queries: s <= point and e > point)
+        stack = []
+        while stack or node is not None:
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start > end or (node.start == end and not stab):
+                return  # This and every later node start after the query
+            if node.end > start:
+                results.append(node.value)
+            node = node.right
+
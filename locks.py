@@ -0,0 +1,84 @@
+"""
+Readers-writer lock used to guard the in-memory database.
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    Many concurrent readers or a single writer.
+
+    Re-entrant per thread: a thread holding the read lock may take it again, and the
+    writer may take either lock again. Waiting writers block new readers so a stream
+    of queries cannot starve a mutation. Upgrading a held read lock to a write lock
+    is not supported and raises RuntimeError.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = {}  # Thread id -> re-entrant read depth
+        self._writer = None  # Thread id of the writer, if any
+        self._writer_depth = 0
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me or me in self._readers:
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers[me] = 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            depth = self._readers[me] - 1
+            if depth:
+                self._readers[me] = depth
+            else:
+                del self._readers[me]
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot acquire the write lock while holding the read lock")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
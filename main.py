@@ -1,8 +1,9 @@
-from ai_client import ask_ai
-from db import db
 import sys
 
 def main():
+    from ai_client import ask_ai, summarize_conversation
+    from history import ConversationHistory
+    
     # Check for debug flag in command line arguments
     debug = "--debug" in sys.argv or "-d" in sys.argv
     
@@ -17,7 +18,8 @@ def main():
         print("\n[DEBUG MODE ENABLED]")
     print("\nType 'quit' to exit.\n")
 
-    conversation_history = []  # Maintain conversation context across messages
+    # Conversation context across messages, summarized as it grows so requests stay small
+    conversation_history = ConversationHistory(summarizer=summarize_conversation)
 
     while True:
         user_input = input("> ").strip()
@@ -32,7 +34,7 @@ def main():
             continue
         
         if user_input.lower() == "clear history":
-            conversation_history = []
+            conversation_history.clear()
             print("Conversation history cleared.\n")
             continue
         
@@ -40,17 +42,27 @@ def main():
             continue
 
         try:
-            ai_message, usage = ask_ai(user_input, debug=debug, messages_history=conversation_history)
-            print(f"\n{ai_message}")
-            print(f"\n(Tokens used: {usage})\n")
+            # Stream the reply: text is printed as it arrives
+            print()
+            ai_message, usage = ask_ai(user_input, debug=debug, messages_history=conversation_history.messages(),
+                                       on_delta=lambda text: print(text, end="", flush=True))
+            print(f"\n\n(Tokens used: {usage})\n")
             
             # Add this exchange to conversation history for context
-            conversation_history.append({"role": "user", "content": user_input})
-            conversation_history.append({"role": "assistant", "content": ai_message})
+            conversation_history.add_turn(user_input, ai_message)
             
         except Exception as e:
             print(f"Error: {e}\n")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] in ("import", "export"):
+        # Bulk data commands don't need the AI client
+        from importexport import main as import_export_main
+        import_export_main(sys.argv[1:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "stats":
+        # Percentiles of the per-turn metrics recorded by ask_ai
+        from metrics import main as stats_main
+        stats_main(sys.argv[2:])
+    else:
+        main()
 
@@ -0,0 +1,187 @@
+"""
+Per-turn performance metrics.
+
+ask_ai and ask_ai_async append one JSON line per turn to METRICS_FILE (rotated at
+METRICS_MAX_BYTES, keeping METRICS_BACKUPS old files). A record holds:
+
+- mode ("sync" or "async"), streamed, fast_path (the intent that answered locally, if any)
+- ms (whole turn), first_token_ms, round_trips (completion requests), error (exception name)
+- requests: per request {ms, retries, prompt_tokens, cached_tokens, completion_tokens, tools_offered, tool_tokens_saved}
+- usage: those token counts summed over the turn
+- tools: per call {name, ms, chars (of the result sent to the model), parallel, cached}
+- budget_hit: the TurnBudget limit that cut the tool loop short ("rounds", "time" or "tokens"), if any
+
+The message text is never recorded. `python main.py stats` reports percentiles.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Iterator, List, Optional
+
+METRICS_FILE = os.getenv("JARVIS_METRICS_FILE", "metrics.jsonl")
+METRICS_MAX_BYTES = 5_000_000  # Rotate the file at this size
+METRICS_BACKUPS = 3  # Rotated files kept (metrics.jsonl.1 ... .3)
+ENABLED = True  # Set to False to stop recording
+
+USAGE_FIELDS = ("prompt_tokens", "cached_tokens", "completion_tokens", "tool_tokens_saved")
+
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+def _get_logger() -> logging.Logger:
+    """The metrics logger, writing bare JSON lines to METRICS_FILE (created on first use)."""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            logger = logging.getLogger("jarvis.metrics")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(METRICS_FILE, maxBytes=METRICS_MAX_BYTES,
+                                          backupCount=METRICS_BACKUPS, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+def turn_record(mode: str, ms: float, requests: List[dict], tools: List[dict], streamed: bool = False,
+                first_token_ms: Optional[float] = None, fast_path: Optional[str] = None,
+                error: Optional[str] = None, budget_hit: Optional[str] = None) -> dict:
+    """Build the record of one turn (see the module docstring) from its requests and tool calls."""
+    return {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "mode": mode,
+        "streamed": streamed,
+        "fast_path": fast_path,
+        "ms": round(ms, 1),
+        "first_token_ms": None if first_token_ms is None else round(first_token_ms, 1),
+        "round_trips": len(requests),
+        "requests": requests,
+        "usage": {field: sum(r.get(field) or 0 for r in requests) for field in USAGE_FIELDS},
+        "tools": tools,
+        "budget_hit": budget_hit,
+        "error": error,
+    }
+
+
+def record_turn(record: dict):
+    """Append a turn record to the metrics file."""
+    if not ENABLED:
+        return
+    try:
+        _get_logger().info(json.dumps(record, default=str))
+    except (OSError, ValueError) as e:
+        print(f"Error writing metrics: {e}")
+
+
+def read_turns(path: Optional[str] = None) -> Iterator[dict]:
+    """Turn records from the metrics file and its rotated backups, oldest first."""
+    path = path or METRICS_FILE
+    for name in [f"{path}.{i}" for i in range(METRICS_BACKUPS, 0, -1)] + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by a crash
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """The pct-th percentile of values (linear interpolation), or None if there are none."""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _distribution(values: List[float]) -> Dict[str, Optional[float]]:
+    return {"count": len(values), "p50": percentile(values, 50), "p90": percentile(values, 90),
+            "p99": percentile(values, 99), "max": max(values) if values else None}
+
+
+def stats(turns: List[dict]) -> dict:
+    """Percentiles of the main measurements over the given turns."""
+    model_turns = [t for t in turns if not t.get("fast_path") and not t.get("error")]
+    requests = [r for t in model_turns for r in t["requests"]]
+    calls = [c for t in turns for c in t.get("tools", [])]
+    prompt = sum(r.get("prompt_tokens") or 0 for r in requests)
+    by_tool = {}
+    for call in calls:
+        by_tool.setdefault(call["name"], []).append(call["ms"])
+    return {
+        "turns": len(turns),
+        "fast_path": sum(1 for t in turns if t.get("fast_path")),
+        "errors": sum(1 for t in turns if t.get("error")),
+        "budget_hits": {reason: sum(1 for t in turns if t.get("budget_hit") == reason)
+                        for reason in sorted({t["budget_hit"] for t in turns if t.get("budget_hit")})},
+        "turn_ms": _distribution([t["ms"] for t in model_turns]),
+        "fast_path_ms": _distribution([t["ms"] for t in turns if t.get("fast_path")]),
+        "first_token_ms": _distribution([t["first_token_ms"] for t in model_turns if t.get("first_token_ms") is not None]),
+        "round_trips": _distribution([t["round_trips"] for t in model_turns]),
+        "request_ms": _distribution([r["ms"] for r in requests if r.get("ms") is not None]),
+        "retries": sum(r.get("retries") or 0 for t in turns for r in t["requests"]),
+        "prompt_tokens": _distribution([t["usage"]["prompt_tokens"] for t in model_turns]),
+        "completion_tokens": _distribution([t["usage"]["completion_tokens"] for t in model_turns]),
+        "cached_share": sum(r.get("cached_tokens") or 0 for r in requests) / prompt if prompt else None,
+        "tool_tokens_saved": sum(t["usage"].get("tool_tokens_saved") or 0 for t in model_turns),
+        "tool_calls": len(calls),
+        "tool_cache_hits": sum(1 for c in calls if c.get("cached")),
+        "tool_ms": {name: _distribution(ms) for name, ms in sorted(by_tool.items())},
+        "tool_chars": _distribution([c["chars"] for c in calls if c.get("chars") is not None]),
+    }
+
+
+def _format_distribution(label: str, d: dict, unit: str = "") -> str:
+    if not d["count"]:
+        return f"{label:<22} -"
+    return (f"{label:<22} p50 {d['p50']:>9.1f}{unit}  p90 {d['p90']:>9.1f}{unit}  "
+            f"p99 {d['p99']:>9.1f}{unit}  max {d['max']:>9.1f}{unit}  (n={d['count']})")
+
+
+def format_stats(s: dict) -> List[str]:
+    """Lines of a human-readable report of stats()."""
+    lines = [f"{s['turns']} turn(s): {s['fast_path']} answered locally, {s['errors']} failed"]
+    if s["budget_hits"]:
+        hits = ", ".join(f"{count} {reason}" for reason, count in s["budget_hits"].items())
+        lines.append(f"Turn budget reached in {sum(s['budget_hits'].values())} turn(s) ({hits})")
+    for key, label, unit in (("turn_ms", "Turn", " ms"), ("fast_path_ms", "Local answer", " ms"),
+                             ("first_token_ms", "First token", " ms"), ("request_ms", "Model request", " ms"),
+                             ("round_trips", "Round trips / turn", ""), ("prompt_tokens", "Prompt tokens / turn", ""),
+                             ("completion_tokens", "Output tokens / turn", ""), ("tool_chars", "Tool result chars", "")):
+        lines.append(_format_distribution(label, s[key], unit))
+    if s["cached_share"] is not None:
+        lines.append(f"{'Prompt cache':<22} {s['cached_share']:.0%} of prompt tokens served from the cache")
+    lines.append(f"{'Retries':<22} {s['retries']} (after rate limits, timeouts or server errors)")
+    lines.append(f"{'Tool routing':<22} ~{s['tool_tokens_saved']} schema tokens saved")
+    lines.append(f"{'Tool calls':<22} {s['tool_calls']} ({s['tool_cache_hits']} served from the result cache)")
+    for name, d in s["tool_ms"].items():
+        lines.append(_format_distribution(f"  {name}", d, " ms"))
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="main.py stats", description="Percentiles of the recorded per-turn metrics")
+    parser.add_argument("file", nargs="?", default=METRICS_FILE, help="Metrics file (default: %(default)s)")
+    parser.add_argument("--last", type=int, help="Only the most recent N turns")
+    parser.add_argument("--json", action="store_true", help="Print the statistics as JSON")
+    args = parser.parse_args(argv)
+
+    turns = list(read_turns(args.file))
+    if args.last:
+        turns = turns[-args.last:]
+    if not turns:
+        print(f"No metrics recorded in {args.file}")
+        return
+    report = stats(turns)
+    print(json.dumps(report, indent=2) if args.json else "\n".join(format_stats(report)))
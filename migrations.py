@@ -0,0 +1,74 @@
+"""
+Schema migrations for the JSON database file.
+
+The file records a ``schema_version``. Each registered migration upgrades the raw
+file contents by exactly one version, in place. Migrations run once: after an
+upgrade the database rewrites the file at SCHEMA_VERSION, so every later load
+goes straight to decoding.
+"""
+
+from typing import Callable, Dict
+from data import normalize_tags
+
+# Bump this and register a migration from the previous version when the file layout changes
+SCHEMA_VERSION = 2
+
+# Maps a schema version to the step that upgrades it to the next version
+MIGRATIONS: Dict[int, Callable[[dict], None]] = {}
+
+
+def migration(from_version: int):
+    """Register a migration step that upgrades data from `from_version` to `from_version + 1`."""
+    def register(fn: Callable[[dict], None]) -> Callable[[dict], None]:
+        if from_version in MIGRATIONS:
+            raise ValueError(f"Migration from schema version {from_version} already registered")
+        MIGRATIONS[from_version] = fn
+        return fn
+    return register
+
+
+def migrate(data: dict) -> bool:
+    """Upgrade raw database contents to SCHEMA_VERSION in place. Returns True if anything ran."""
+    version = data.get('schema_version', 0)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Database schema version {version} is newer than supported version {SCHEMA_VERSION}")
+
+    migrated = False
+    while version < SCHEMA_VERSION:
+        step = MIGRATIONS.get(version)
+        if step is None:
+            raise ValueError(f"No migration registered from schema version {version}")
+        step(data)
+        version += 1
+        data['schema_version'] = version
+        migrated = True
+    return migrated
+
+
+@migration(0)
+def _drop_attachment_fields(data: dict):
+    """Remove the old attachment fields (replaced by links) and normalize stored tags."""
+    for todo_data in data.get('todos', []):
+        todo_data.pop('attached_to_todo_id', None)
+        todo_data.pop('attached_to_goal_id', None)
+        todo_data['tags'] = normalize_tags(todo_data.get('tags'))
+
+    for goal_data in data.get('goals', []):
+        goal_data.pop('attached_todo_ids', None)
+        goal_data.pop('attached_goal_ids', None)
+        goal_data.pop('attached_event_ids', None)
+        goal_data['tags'] = normalize_tags(goal_data.get('tags'))
+
+    for event_data in data.get('events', []):
+        event_data.pop('attached_to_goal_id', None)
+        event_data['tags'] = normalize_tags(event_data.get('tags'))
+
+
+@migration(1)
+def _rename_event_start_to_date(data: dict):
+    """Store event start times under `date` (older files used `start`) and make `end` explicit."""
+    for event_data in data.get('events', []):
+        if 'start' in event_data:
+            start = event_data.pop('start')
+            event_data.setdefault('date', start)
+        event_data.setdefault('end', None)
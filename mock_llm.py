@@ -0,0 +1,549 @@
+"""
+Local stand-in for the OpenAI chat-completions client, for offline benchmarks and load tests.
+
+MockLLM (and AsyncMockLLM) answer client.chat.completions.create(...) with objects
+shaped like the real responses, streamed or not, after a configurable latency.
+What they answer comes from a responder, a function (messages, tools) -> Reply:
+
+- RuleResponder: matches the latest user message against regex rules, each giving the
+  rounds of tool calls to make before a final text answer (DEFAULT_RULES covers the
+  common queries)
+- ScriptedResponder: returns a fixed list of replies in order
+
+Usage is estimated from the request (history.estimate_tokens), including cached
+prompt tokens for the prefix shared with the previous request, as the provider's
+prompt cache would report them.
+
+Use it with `JARVIS_LLM_BACKEND=mock` or ai_client.set_client(MockLLM(), AsyncMockLLM()).
+MockServer serves the same over HTTP (POST /v1/chat/completions, JSON or server-sent
+events), for testing the real OpenAI client, retries and rate limiting: a
+FailureInjector makes a share of the requests fail with 429 (with Retry-After) or 5xx.
+
+`python mock_llm.py` runs sample conversations through ask_ai against a generated database
+and reports the turn latencies:
+
+    python mock_llm.py --size 1000 --turns 50 --latency 0.2
+    python mock_llm.py --concurrency 20 --stream --output load.json
+    python mock_llm.py --http --fail-rate 0.2 --concurrency 10   # Through the HTTP server
+    python mock_llm.py --serve 8765 --fail-rate 0.1              # Just the server; then run main.py with
+                                                                 # OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Callable, List, Optional, Tuple, Union
+from history import estimate_tokens
+
+DEFAULT_LATENCY = 0.0  # Seconds before the first token (or the whole response)
+DEFAULT_TOKEN_LATENCY = 0.0  # Seconds per generated token
+CACHE_MIN_TOKENS = 1024  # Prompts shorter than this are never cached by the provider
+CACHE_BLOCK_TOKENS = 128  # Cached prefixes are counted in blocks of this size
+
+ToolCall = Tuple[str, dict]  # (tool name, arguments)
+
+
+@dataclass
+class Reply:
+    """One model response: tool calls to make, or (if there are none) the final content."""
+    content: Optional[str] = None
+    tool_calls: List[ToolCall] = field(default_factory=list)
+
+
+Responder = Callable[[List[dict], List[dict]], Reply]
+
+
+def _round(messages: List[dict]) -> int:
+    """Number of tool-call rounds since the latest user message."""
+    count = 0
+    for message in reversed(messages):
+        if message["role"] == "user":
+            break
+        if message["role"] == "assistant" and message.get("tool_calls"):
+            count += 1
+    return count
+
+
+def _last_user_message(messages: List[dict]) -> str:
+    return next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+
+@dataclass
+class Rule:
+    pattern: str  # Regex searched in the lower-cased user message
+    # Rounds of tool calls; arguments may be a function of the regex match
+    rounds: List[List[Tuple[str, Union[dict, Callable[[re.Match], dict]]]]]
+
+    def __post_init__(self):
+        self._regex = re.compile(self.pattern)
+
+
+DEFAULT_RULES = [
+    Rule(r"overdue", [[("get_overdue_todos", {})]]),
+    Rule(r"goals?\b", [[("get_goals", {})]]),
+    Rule(r"calendar|this week|schedule", [[("get_events_this_week", {})]]),
+    Rule(r"(?:tagged|about) (\w+)", [[("search_all_by_tag", lambda m: {"tag": m.group(1)})]]),
+    Rule(r"add a todo (?:to )?(.+)",
+         [[("search_todos_by_title", lambda m: {"title": m.group(1)[:20]})],
+          [("add_todo", lambda m: {"title": m.group(1)})]]),
+    Rule(r"todos?|tasks?", [[("get_all_todos", {}), ("get_upcoming_todos", {"days": 7})]]),
+]
+
+
+class RuleResponder:
+    """Tool calls chosen by the first rule matching the user message, then a short final answer."""
+
+    def __init__(self, rules: List[Rule] = None, answer: str = "Here is what I found."):
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.answer = answer
+
+    def __call__(self, messages: List[dict], tools: List[dict]) -> Reply:
+        text = _last_user_message(messages).lower()
+        step = _round(messages)
+        for rule in self.rules if tools else []:  # Requests without tools (e.g. summaries) get text
+            found = rule._regex.search(text)
+            if found:
+                if step < len(rule.rounds):
+                    return Reply(tool_calls=[(name, args(found) if callable(args) else args)
+                                             for name, args in rule.rounds[step]])
+                break
+        results = 0
+        for message in reversed(messages):
+            if message["role"] == "user":
+                break
+            results += message["role"] == "tool"
+        return Reply(content=f"{self.answer} ({results} tool result(s) used)" if results else self.answer)
+
+
+class ScriptedResponder:
+    """Replies from a fixed list, in order (a str is a final answer, a list a round of tool calls)."""
+
+    def __init__(self, replies: List[Union[str, Reply, List[ToolCall]]], repeat: bool = False):
+        self.replies = [r if isinstance(r, Reply) else Reply(content=r) if isinstance(r, str) else Reply(tool_calls=r)
+                        for r in replies]
+        self.repeat = repeat
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, messages: List[dict], tools: List[dict]) -> Reply:
+        with self._lock:
+            if self._next >= len(self.replies):
+                if not self.repeat:
+                    raise RuntimeError("Mock script exhausted")
+                self._next = 0
+            reply = self.replies[self._next]
+            self._next += 1
+        return reply
+
+
+class _Backend:
+    """Shared by the sync and async clients: builds responses and usage from a responder's reply."""
+
+    def __init__(self, responder: Responder = None, latency: float = DEFAULT_LATENCY,
+                 token_latency: float = DEFAULT_TOKEN_LATENCY):
+        self.responder = responder or RuleResponder()
+        self.latency = latency
+        self.token_latency = token_latency
+        self.requests = 0
+        self._last_prompt = ""
+        self._lock = threading.Lock()
+
+    def reply(self, kwargs: dict) -> Tuple[Reply, list, SimpleNamespace]:
+        """The reply to a create() call, its tool calls in API form, and its usage."""
+        messages, tools = kwargs["messages"], kwargs.get("tools") or []
+        if kwargs.get("tool_choice") == "none":
+            tools = []  # Tools may be sent for context but can't be called
+        reply = self.responder(messages, tools)
+        if reply.tool_calls and not tools:
+            reply = Reply(content=reply.content or "Here is what I have so far.")
+        with self._lock:
+            self.requests += 1
+            call_ids = [f"call_{self.requests}_{i}" for i in range(len(reply.tool_calls))]
+            # The provider serializes tools before the messages
+            prompt = json.dumps(tools) + json.dumps(messages, default=str)
+            prefix = os.path.commonprefix([self._last_prompt, prompt])
+            self._last_prompt = prompt
+        calls = [SimpleNamespace(id=call_id, type="function",
+                                 function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+                 for call_id, (name, args) in zip(call_ids, reply.tool_calls)]
+        prompt_tokens = estimate_tokens(prompt)
+        cached = estimate_tokens(prefix)
+        cached = cached // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS if cached >= CACHE_MIN_TOKENS else 0
+        completion_tokens = estimate_tokens(reply.content or "") + sum(
+            estimate_tokens(c.function.name + c.function.arguments) for c in calls)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+        return reply, calls, usage
+
+    def response(self, reply: Reply, calls: list, usage) -> SimpleNamespace:
+        message = SimpleNamespace(role="assistant", content=reply.content, tool_calls=calls or None)
+        choice = SimpleNamespace(index=0, message=message, finish_reason="tool_calls" if calls else "stop")
+        return SimpleNamespace(id=f"mock-{self.requests}", object="chat.completion", created=int(time.time()),
+                               model="mock", choices=[choice], usage=usage)
+
+    def chunks(self, reply: Reply, calls: list, usage, include_usage: bool) -> List[Tuple[SimpleNamespace, int]]:
+        """Stream chunks of a response, each with the number of tokens it carries."""
+        header = {"id": f"mock-{self.requests}", "object": "chat.completion.chunk", "created": int(time.time()),
+                  "model": "mock"}
+
+        def chunk(content=None, tool_calls=None, finish_reason=None):
+            delta = SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls)
+            return SimpleNamespace(**header, choices=[SimpleNamespace(index=0, delta=delta, finish_reason=finish_reason)],
+                                   usage=None)
+
+        chunks = []
+        for word in re.findall(r"\S+\s*", reply.content or ""):
+            chunks.append((chunk(content=word), 1))
+        for index, call in enumerate(calls):
+            # The first delta carries the id and name, the next ones the arguments in pieces
+            chunks.append((chunk(tool_calls=[SimpleNamespace(index=index, id=call.id, type="function",
+                                                             function=SimpleNamespace(name=call.function.name, arguments=""))]), 1))
+            arguments = call.function.arguments
+            for start in range(0, len(arguments), 16):
+                piece = SimpleNamespace(name=None, arguments=arguments[start:start + 16])
+                chunks.append((chunk(tool_calls=[SimpleNamespace(index=index, id=None, type=None, function=piece)]), 4))
+        chunks.append((chunk(finish_reason="tool_calls" if calls else "stop"), 0))
+        if include_usage:
+            chunks.append((SimpleNamespace(**header, choices=[], usage=usage), 0))
+        return chunks
+
+
+class _Completions:
+    def __init__(self, backend: _Backend):
+        self._backend = backend
+
+    def create(self, **kwargs):
+        backend = self._backend
+        reply, calls, usage = backend.reply(kwargs)
+        time.sleep(backend.latency)
+        if not kwargs.get("stream"):
+            time.sleep(backend.token_latency * usage.completion_tokens)
+            return backend.response(reply, calls, usage)
+        include_usage = (kwargs.get("stream_options") or {}).get("include_usage", False)
+        return self._stream(backend.chunks(reply, calls, usage, include_usage))
+
+    def _stream(self, chunks):
+        for chunk, tokens in chunks:
+            time.sleep(self._backend.token_latency * tokens)
+            yield chunk
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, **kwargs):
+        backend = self._backend
+        reply, calls, usage = backend.reply(kwargs)
+        await asyncio.sleep(backend.latency)
+        if not kwargs.get("stream"):
+            await asyncio.sleep(backend.token_latency * usage.completion_tokens)
+            return backend.response(reply, calls, usage)
+        include_usage = (kwargs.get("stream_options") or {}).get("include_usage", False)
+        return self._stream(backend.chunks(reply, calls, usage, include_usage))
+
+    async def _stream(self, chunks):
+        for chunk, tokens in chunks:
+            await asyncio.sleep(self._backend.token_latency * tokens)
+            yield chunk
+
+
+class MockLLM:
+    """Drop-in for OpenAI(): client.chat.completions.create(model=..., messages=..., tools=..., stream=...)."""
+
+    _completions = _Completions
+    rate_limited = False  # In process: ai_client skips the client-side rate limits of scheduler.py
+
+    def __init__(self, responder: Responder = None, latency: float = DEFAULT_LATENCY,
+                 token_latency: float = DEFAULT_TOKEN_LATENCY):
+        """
+        Args:
+            responder: Function (messages, tools) -> Reply (default: RuleResponder())
+            latency: Seconds before each response (or its first chunk)
+            token_latency: Seconds per generated token
+        """
+        self.backend = _Backend(responder, latency, token_latency)
+        self.chat = SimpleNamespace(completions=self._completions(self.backend))
+
+
+class AsyncMockLLM(MockLLM):
+    """Drop-in for AsyncOpenAI()."""
+
+    _completions = _AsyncCompletions
+
+
+class FailureInjector:
+    """Picks the requests MockServer fails, and the HTTP status they fail with."""
+
+    def __init__(self, rate: float = 0.0, statuses: Tuple[int, ...] = (429, 500, 503),
+                 retry_after: Optional[float] = 1.0, seed: int = 0):
+        """
+        Args:
+            rate: Share of requests that fail
+            statuses: HTTP statuses to fail with, picked at random
+            retry_after: Retry-After header (seconds) sent with 429s, or None for none
+            seed: Seed of the random choices, for repeatable runs
+        """
+        self.rate = rate
+        self.statuses = statuses
+        self.retry_after = retry_after
+        self.injected = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Optional[int]:
+        """The status to fail the next request with, or None to serve it."""
+        with self._lock:
+            if self._random.random() >= self.rate:
+                return None
+            self.injected += 1
+            return self._random.choice(self.statuses)
+
+
+def _plain(value):
+    """A response object as JSON-serializable data."""
+    if isinstance(value, SimpleNamespace):
+        return {key: _plain(item) for key, item in vars(value).items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can reuse their connections
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; don't let Nagle's algorithm hold the body back
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass  # Quiet; the server counts requests instead
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        server.count("requests")
+        status = server.failures()
+        if status:
+            headers = {}
+            if status == 429 and server.failures.retry_after is not None:
+                headers["Retry-After"] = f"{server.failures.retry_after:g}"
+            kind = "rate_limit_exceeded" if status == 429 else "server_error"
+            self._send_json(status, {"error": {"message": f"Injected failure ({status})", "type": kind, "code": kind}},
+                            headers)
+            return
+
+        backend = server.backend
+        reply, calls, usage = backend.reply(body)
+        time.sleep(backend.latency)
+        if not body.get("stream"):
+            time.sleep(backend.token_latency * usage.completion_tokens)
+            self._send_json(200, _plain(backend.response(reply, calls, usage)))
+            return
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")  # The stream ends when the connection does
+        self.end_headers()
+        for chunk, tokens in backend.chunks(reply, calls, usage, include_usage):
+            time.sleep(backend.token_latency * tokens)
+            self.wfile.write(f"data: {json.dumps(_plain(chunk))}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class MockServer(ThreadingHTTPServer):
+    """The mock model over HTTP: POST {url}/chat/completions, as the OpenAI API."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, responder: Responder = None, latency: float = DEFAULT_LATENCY,
+                 token_latency: float = DEFAULT_TOKEN_LATENCY, failures: FailureInjector = None,
+                 host: str = "127.0.0.1"):
+        """Bind to host:port (0: any free port); call start() or serve_forever() to serve."""
+        super().__init__((host, port), _Handler)
+        self.backend = _Backend(responder, latency, token_latency)
+        self.failures = failures or FailureInjector()
+        self.stats = {"requests": 0, "connections": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Base URL for the OpenAI client (base_url=... or OPENAI_BASE_URL)."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def start(self) -> "MockServer":
+        """Serve on a daemon thread."""
+        threading.Thread(target=self.serve_forever, name="mock-llm-server", daemon=True).start()
+        return self
+
+
+# Conversations run by `python mock_llm.py`, one message per turn
+SAMPLE_CONVERSATION = [
+    "What's overdue?",
+    "Anything about work?",
+    "What's on my calendar this week?",
+    "How are my goals going, and which ones are behind?",
+    "Add a todo to renew my passport",
+    "Which tasks are due soon?",
+]
+
+
+def _load_test(args) -> dict:
+    import tempfile
+    from datetime import datetime
+    import ai_client
+    import metrics
+    from datagen import generate
+    from db import db
+    from history import ConversationHistory
+    from storage import write_snapshot
+
+    metrics.ENABLED = False  # Reported here instead
+    with tempfile.TemporaryDirectory() as workdir:
+        db.path = os.path.join(workdir, "mock-db.json")
+        write_snapshot(db.path, generate(args.size, args.seed, datetime.now().replace(second=0, microsecond=0)))
+        db.load()
+        ai_client.tool_cache.clear()
+        server = None
+        if args.http:
+            from openai import AsyncOpenAI, OpenAI
+            failures = FailureInjector(args.fail_rate, retry_after=args.retry_after, seed=args.seed)
+            server = MockServer(latency=args.latency, token_latency=args.token_latency, failures=failures).start()
+            # Retries are left to scheduler.py, as in ai_client
+            ai_client.set_client(OpenAI(base_url=server.url, api_key="mock", max_retries=0),
+                                 AsyncOpenAI(base_url=server.url, api_key="mock", max_retries=0))
+        else:
+            ai_client.set_client(MockLLM(latency=args.latency, token_latency=args.token_latency),
+                                 AsyncMockLLM(latency=args.latency, token_latency=args.token_latency))
+        on_delta = (lambda text: None) if args.stream else None
+        turns = []
+
+        def record(ms, requests, timings):
+            turns.append({"ms": ms, "round_trips": len(requests), "tool_calls": len(timings),
+                          "retries": sum(r["retries"] for r in requests),
+                          "cache_hits": sum(1 for t in timings if t["cached"]),
+                          "prompt_tokens": sum(r["prompt_tokens"] for r in requests),
+                          "cached_tokens": sum(r["cached_tokens"] for r in requests)})
+
+        start = time.perf_counter()
+        if args.concurrency <= 1:
+            history = ConversationHistory()
+            for i in range(args.turns):
+                text = SAMPLE_CONVERSATION[i % len(SAMPLE_CONVERSATION)]
+                turn_start = time.perf_counter()
+                answer, _ = ai_client.ask_ai(text, messages_history=history.messages(), on_delta=on_delta)
+                record((time.perf_counter() - turn_start) * 1000, ai_client.last_request_usage,
+                       ai_client.last_tool_timings)
+                history.add_turn(text, answer)
+        else:
+            async def conversation():
+                history = ConversationHistory()
+                for i in range(args.turns):
+                    text = SAMPLE_CONVERSATION[i % len(SAMPLE_CONVERSATION)]
+                    turn_start = time.perf_counter()
+                    answer, usage = await ai_client.ask_ai_async(text, messages_history=history.messages(),
+                                                                 on_delta=on_delta)
+                    turns.append({"ms": (time.perf_counter() - turn_start) * 1000, "prompt_tokens": usage.prompt_tokens})
+                    history.add_turn(text, answer)
+
+            async def run_all():
+                await asyncio.gather(*(conversation() for _ in range(args.concurrency)))
+            asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    ms = [t["ms"] for t in turns]
+    report = {
+        "size": args.size, "concurrency": args.concurrency, "turns": len(turns), "stream": args.stream,
+        "latency": args.latency, "token_latency": args.token_latency,
+        "elapsed_s": round(elapsed, 3), "turns_per_s": round(len(turns) / elapsed, 2) if elapsed else None,
+        "turn_ms": {f"p{p}": round(metrics.percentile(ms, p), 2) for p in (50, 90, 99)},
+        "prompt_tokens_per_turn": round(sum(t["prompt_tokens"] for t in turns) / len(turns), 1),
+    }
+    if args.concurrency <= 1:
+        calls = sum(t["tool_calls"] for t in turns)
+        prompt = sum(t["prompt_tokens"] for t in turns)
+        report.update(round_trips_per_turn=round(sum(t["round_trips"] for t in turns) / len(turns), 2),
+                      retries=sum(t["retries"] for t in turns),
+                      tool_calls=calls, tool_cache_hits=sum(t["cache_hits"] for t in turns),
+                      cached_prompt_share=round(sum(t["cached_tokens"] for t in turns) / prompt, 3) if prompt else None)
+    if server:
+        report["http"] = dict(server.stats, injected_failures=server.failures.injected)
+    return report
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run sample conversations through ask_ai on the mock model")
+    parser.add_argument("--size", type=int, default=1000, help="Entities in the generated database")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--turns", type=int, default=30, help="Turns per conversation")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent conversations (ask_ai_async if > 1)")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="Seconds before each response")
+    parser.add_argument("--token-latency", type=float, default=DEFAULT_TOKEN_LATENCY, help="Seconds per generated token")
+    parser.add_argument("--stream", action="store_true", help="Stream the responses")
+    parser.add_argument("--output", help="Also write the JSON report here")
+    parser.add_argument("--http", action="store_true", help="Go through MockServer and the OpenAI client")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of HTTP requests that fail (429/500/503)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--rpm", type=float, help="Client-side request limit per minute (default: scheduler.py)")
+    parser.add_argument("--tpm", type=float, help="Client-side prompt token limit per minute (default: scheduler.py)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Only run the HTTP server on this port")
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        server = MockServer(args.serve, latency=args.latency, token_latency=args.token_latency,
+                            failures=FailureInjector(args.fail_rate, retry_after=args.retry_after, seed=args.seed))
+        print(f"Serving the mock model at {server.url} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+    # The client-side rate limits only apply with --http: MockLLM runs in process
+    import scheduler
+    if args.rpm:
+        scheduler.request_limiter.rate = args.rpm / 60
+    if args.tpm:
+        scheduler.token_limiter.rate = args.tpm / 60
+    report = _load_test(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
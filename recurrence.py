@@ -0,0 +1,153 @@
+"""
+Lazy expansion of recurring events and todos.
+
+A recurring item is stored once, with a Recurrence rule anchored at its start
+(events) or first due date (todos, whose due date then advances as occurrences are
+completed; the rule keeps the original in `anchor`). Occurrences are computed only for the window being
+queried: the first occurrence in the window is found arithmetically rather than
+by stepping from the anchor, so the cost depends on the window, not on how long
+the series has been running.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+from data import Recurrence
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+
+
+def parse_recurrence(d: Optional[dict]) -> Optional[Recurrence]:
+    """Build a Recurrence from its serialized form (as stored in db.json or passed by the AI)."""
+    if not d:
+        return None
+    freq = d.get('freq')
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Invalid recurrence frequency {freq!r}; expected one of {', '.join(FREQUENCIES)}")
+    interval = int(d.get('interval') or 1)
+    if interval < 1:
+        raise ValueError("Recurrence interval must be at least 1")
+    count = d.get('count')
+    if count is not None and int(count) < 1:
+        raise ValueError("Recurrence count must be at least 1")
+    return Recurrence(
+        freq=freq,
+        interval=interval,
+        until=datetime.fromisoformat(d['until']) if d.get('until') else None,
+        count=int(count) if count is not None else None,
+        exceptions=dict(d.get('exceptions') or {}),
+        anchor=datetime.fromisoformat(d['anchor']) if d.get('anchor') else None,
+    )
+
+
+def serialize_recurrence(rule: Optional[Recurrence]) -> Optional[dict]:
+    if rule is None:
+        return None
+    return {
+        'freq': rule.freq,
+        'interval': rule.interval,
+        'until': rule.until.isoformat() if rule.until else None,
+        'count': rule.count,
+        'exceptions': rule.exceptions,
+        'anchor': rule.anchor.isoformat() if rule.anchor else None,
+    }
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    """Shift by whole months, clamping the day to the length of the target month."""
+    years, month_index = divmod(dt.month - 1 + months, 12)
+    year = dt.year + years
+    month = month_index + 1
+    return dt.replace(year=year, month=month, day=min(dt.day, calendar.monthrange(year, month)[1]))
+
+
+def nth_occurrence(start: datetime, rule: Recurrence, n: int) -> datetime:
+    """Start of the n-th occurrence (0 = the anchor itself), ignoring count/until and exceptions."""
+    if rule.freq == 'daily':
+        return start + timedelta(days=n * rule.interval)
+    if rule.freq == 'weekly':
+        return start + timedelta(weeks=n * rule.interval)
+    if rule.freq == 'monthly':
+        return _add_months(start, n * rule.interval)
+    return _add_months(start, 12 * n * rule.interval)
+
+
+def _first_index_at_or_after(start: datetime, rule: Recurrence, when: datetime) -> int:
+    """Index of the first occurrence starting at or after `when`."""
+    if when <= start:
+        return 0
+    if rule.freq in ('daily', 'weekly'):
+        period = timedelta(days=rule.interval * (7 if rule.freq == 'weekly' else 1))
+        return -((start - when) // period)  # Ceiling division
+    months_per = rule.interval * (12 if rule.freq == 'yearly' else 1)
+    n = ((when.year - start.year) * 12 + when.month - start.month) // months_per
+    while nth_occurrence(start, rule, n) < when:
+        n += 1
+    return n
+
+
+def _in_series(rule: Recurrence, n: int, when: datetime) -> bool:
+    return (rule.count is None or n < rule.count) and (rule.until is None or when <= rule.until)
+
+
+def occurrences(start: datetime, rule: Recurrence, window_start: datetime, window_end: datetime) -> Iterator[datetime]:
+    """Yield original occurrence starts in [window_start, window_end), before exceptions are applied."""
+    n = _first_index_at_or_after(start, rule, window_start)
+    while True:
+        when = nth_occurrence(start, rule, n)
+        if when >= window_end or not _in_series(rule, n, when):
+            return
+        yield when
+        n += 1
+
+
+def is_occurrence(start: datetime, rule: Recurrence, when: datetime) -> bool:
+    """True if a series occurrence starts exactly at `when`."""
+    n = _first_index_at_or_after(start, rule, when)
+    return nth_occurrence(start, rule, n) == when and _in_series(rule, n, when)
+
+
+def next_occurrence(start: datetime, rule: Recurrence, after: datetime) -> Optional[datetime]:
+    """
+    Original start of the first occurrence after `after` that isn't cancelled, or None if
+    the series has ended. A moved occurrence is returned by its original start, like the
+    keys of rule.exceptions.
+    """
+    n = _first_index_at_or_after(start, rule, after)
+    while True:
+        when = nth_occurrence(start, rule, n)
+        if not _in_series(rule, n, when):
+            return None
+        if when > after and rule.exceptions.get(when.isoformat(), {}) is not None:
+            return when
+        n += 1
+
+
+def expand(start: datetime, rule: Recurrence, window_start: datetime,
+           window_end: datetime) -> Iterator[Tuple[datetime, dict]]:
+    """
+    Yield (original start, override) for every occurrence that starts in the window once
+    exceptions are applied: cancelled occurrences are skipped, and occurrences moved into
+    or out of the window by a 'date' override are placed by their new start.
+    """
+    for original in occurrences(start, rule, window_start, window_end):
+        key = original.isoformat()
+        if key not in rule.exceptions:
+            yield original, {}
+            continue
+        override = rule.exceptions[key]
+        if override is None:
+            continue  # Cancelled
+        moved = datetime.fromisoformat(override['date']) if override.get('date') else original
+        if window_start <= moved < window_end:
+            yield original, override
+
+    # Occurrences whose original start lies outside the window but were moved into it
+    for key, override in rule.exceptions.items():
+        if not override or not override.get('date'):
+            continue
+        original = datetime.fromisoformat(key)
+        moved = datetime.fromisoformat(override['date'])
+        if (window_start <= moved < window_end and not window_start <= original < window_end
+                and is_occurrence(start, rule, original)):
+            yield original, override
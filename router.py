@@ -0,0 +1,125 @@
+"""
+Keyword router that picks the tool groups relevant to a user message.
+
+Sending all ~45 tool schemas costs thousands of prompt tokens per request. The
+router matches the message against keywords per tool group (see the group= of
+each @tool in tools.py) and offers only those groups, plus request_all_tools: a
+tool the model calls when what it needs is missing, after which the full set is
+sent for the rest of the turn. Messages that match no group (e.g. "yes, do it")
+get the full set straight away.
+
+Subsets are built in registration order, so a given set of groups always gives
+byte-identical tool schemas and keeps the provider's prompt cache warm.
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
+from history import estimate_tokens
+from tool_registry import REGISTRY, tool_schemas
+from tools import TOOLS
+
+EXPAND_TOOL = "request_all_tools"
+EXPAND_SCHEMA = {
+    "type": "function",
+    "function": {
+        "name": EXPAND_TOOL,
+        "description": "Call this if none of the available tools can do what the user asked; all tools become available in the next step",
+        "parameters": {"type": "object", "properties": {}, "required": []}
+    }
+}
+
+_WEEKDAYS = r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|weekend"
+# Group -> pattern matched against the lower-cased message (word-prefix matches)
+GROUP_PATTERNS = {
+    'calendar': r"\b(events?|calendar|schedul|meeting|appointment|agenda|busy|free|slots?|book|reschedul|"
+                r"conflict|overlap|double.booked|today|tonight|tomorrow|week|month|" + _WEEKDAYS +
+                r"|\d{1,2}(:\d\d)?\s*(am|pm)|lunch|dinner|call with|party|birthday)",
+    'todos': r"\b(todos?|to-dos?|tasks?|overdue|due|deadline|priorit|urgent|chores?|errands?|finish|"
+             r"complete|done|remind|need to|have to|plan my)",
+    'goals': r"\b(goals?|objectives?|aims?|milestones?|progress|achiev|resolution|aspir)",
+    'notes': r"\b(notes?|ideas?|jot|write down|memo|remember that|journal)",
+    'links': r"\b(link|connect|relat|attach|subtasks?|sub-?goals?|contribut|part of|belongs? to|depend)",
+    'search': r"\b(find|search|look up|look for|tag|where|which|about|anything on)",
+}
+_COMPILED = {group: re.compile(pattern) for group, pattern in GROUP_PATTERNS.items()}
+
+# Groups offered alongside any routed subset: searching is how the model finds item IDs
+ALWAYS_GROUPS = frozenset({'search'})
+
+
+def route(text: str) -> Optional[FrozenSet[str]]:
+    """Tool groups relevant to the message, or None if it matches none (offer every tool)."""
+    text = text.lower()
+    groups = frozenset(group for group, pattern in _COMPILED.items() if pattern.search(text))
+    if not groups:
+        return None
+    if 'links' in groups:
+        # Links connect todos, goals and events, so the model needs tools for both ends
+        groups |= {'todos', 'goals', 'calendar'}
+    return groups | ALWAYS_GROUPS
+
+
+@lru_cache(maxsize=64)
+def tools_for_groups(groups: FrozenSet[str]) -> List[dict]:
+    """Schemas of the tools in the given groups (in registration order) plus request_all_tools."""
+    return tool_schemas([name for name, t in REGISTRY.items() if t.group in groups]) + [EXPAND_SCHEMA]
+
+
+def select_tools(text: str) -> List[dict]:
+    """Tools to offer for a user message: a routed subset, or all of TOOLS."""
+    groups = route(text)
+    return TOOLS if groups is None else tools_for_groups(groups)
+
+
+def needs_all_tools(tool_calls: list, offered: List[dict]) -> bool:
+    """True if the model asked for more tools, or called one it wasn't offered."""
+    if offered is TOOLS:
+        return False
+    names = {t["function"]["name"] for t in offered}
+    return any(tc["function"]["name"] == EXPAND_TOOL or tc["function"]["name"] not in names for tc in tool_calls)
+
+
+def tools_tokens(tools: List[dict]) -> int:
+    """Estimated prompt tokens taken by a list of tool schemas."""
+    return sum(_schema_tokens(t["function"]["name"]) for t in tools)
+
+
+@lru_cache(maxsize=None)
+def _schema_tokens(name: str) -> int:
+    schema = EXPAND_SCHEMA if name == EXPAND_TOOL else REGISTRY[name].schema
+    return estimate_tokens(json.dumps(schema))
+
+
+# Typical requests, used by `python router.py` to report the savings
+SAMPLE_QUERIES = [
+    "What's overdue?",
+    "What's on my calendar this week?",
+    "List my goals",
+    "Add a todo to renew my passport by Friday, high priority",
+    "Book a dentist appointment Thursday at 3pm",
+    "Link the report task to my launch goal",
+    "Add a note with ideas for the kitchen",
+    "Find everything tagged apartment",
+    "Yes, do it",
+]
+
+
+def main():
+    import sys
+    queries = sys.argv[1:] or SAMPLE_QUERIES
+    full = tools_tokens(TOOLS)
+    print(f"All tools: {len(TOOLS)} schemas, ~{full} tokens")
+    saved = []
+    for query in queries:
+        groups = route(query)
+        tools = select_tools(query)
+        saved.append(full - tools_tokens(tools))
+        routed = ', '.join(sorted(groups)) if groups else 'all'
+        print(f"{query!r:<60} {routed:<40} {len(tools):>3} tools  ~{saved[-1]:>5} tokens saved")
+    print(f"Average saved per first request: ~{sum(saved) // len(saved)} tokens ({sum(saved) * 100 // (full * len(saved))}%)")
+
+
+if __name__ == '__main__':
+    main()
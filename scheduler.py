@@ -0,0 +1,196 @@
+"""
+Retries and client-side rate limiting of model requests.
+
+call_with_retry (and call_with_retry_async) wrap one request:
+
+- Before each attempt it waits for the shared token buckets: request_limiter
+  (REQUESTS_PER_MINUTE) and token_limiter (TOKENS_PER_MINUTE, charged with the
+  estimated prompt tokens). They are shared by every conversation in the process, so
+  concurrent conversations queue here instead of getting 429s from the provider.
+  Requests to an in-process model (mock_llm.MockLLM) skip them with limit=False.
+- A rate limit (429), timeout, connection error or 5xx is retried up to MAX_RETRIES
+  times, after Retry-After if the server sent one and otherwise after a jittered
+  exponential backoff ("full jitter": uniform in [0, BACKOFF_BASE * 2**attempt]).
+  A 429 also pauses request_limiter, so other conversations back off as well.
+
+Only the failed request is repeated: tool calls already made in the turn are not,
+so a transient error no longer throws away a turn with half-applied changes.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+from openai import APIConnectionError
+
+MAX_RETRIES = 4  # Retries after the first attempt
+BACKOFF_BASE = 0.5  # Seconds; the backoff cap doubles with each attempt...
+BACKOFF_MAX = 20.0  # ...up to this
+RETRY_AFTER_MAX = 60.0  # Give up instead of waiting longer than this for a Retry-After
+RETRY_STATUSES = {408, 409, 429}  # Retried, besides every 5xx
+
+REQUESTS_PER_MINUTE = 500
+REQUEST_BURST = 20  # Requests that may go out at once after a quiet period
+TOKENS_PER_MINUTE = 200_000  # Estimated prompt tokens
+TOKEN_BURST = 100_000  # At least budget.MAX_TURN_TOKENS, so a whole turn fits in a burst
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`.
+    Callers reserve tokens up front (the balance may go negative) and then wait out
+    their share, so waiters are served in order without polling, across threads and
+    event loops alike.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` tokens and return the seconds to wait before using them."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, seconds: float):
+        """Hold back every caller for at least `seconds` (e.g. after a 429)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def acquire(self, amount: float = 1) -> float:
+        """Block until `amount` tokens are available; returns the seconds waited."""
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, amount: float = 1) -> float:
+        wait = self.reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+# Shared by every model request of the process
+request_limiter = TokenBucket(REQUESTS_PER_MINUTE / 60, REQUEST_BURST)
+token_limiter = TokenBucket(TOKENS_PER_MINUTE / 60, TOKEN_BURST)
+
+
+def status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed request may succeed if sent again."""
+    if isinstance(error, (APIConnectionError, TimeoutError)):
+        return True  # Includes the client's own timeouts
+    status = status_code(error)
+    return status is not None and (status in RETRY_STATUSES or status >= 500)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked to wait (retry-after-ms or Retry-After header), if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())  # An HTTP date
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retry number `attempt` (from 1), or None to give up."""
+    requested = retry_after(error)
+    if requested is not None:
+        if requested > RETRY_AFTER_MAX:
+            return None
+        return requested + random.uniform(0, BACKOFF_BASE)  # Spread out clients told the same time
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _next_delay(error: Exception, attempt: int, max_retries: int,
+                on_retry: Optional[Callable[[int, Exception, float], None]]) -> Optional[float]:
+    if attempt > max_retries or not is_retryable(error):
+        return None
+    delay = retry_delay(error, attempt)
+    if delay is None:
+        return None
+    if status_code(error) == 429:
+        request_limiter.pause(delay)
+    if on_retry:
+        on_retry(attempt, error, delay)
+    return delay
+
+
+def call_with_retry(fn: Callable[[], T], tokens: int = 0, max_retries: int = MAX_RETRIES,
+                    on_retry: Optional[Callable[[int, Exception, float], None]] = None, limit: bool = True) -> T:
+    """
+    Call fn (one model request) within the rate limits, retrying transient failures.
+
+    Args:
+        fn: The request
+        tokens: Estimated prompt tokens, charged to token_limiter
+        max_retries: Retries after the first attempt
+        on_retry: Called with (retry number, error, delay in seconds) before each retry
+        limit: Wait for request_limiter and token_limiter before each attempt
+
+    Raises:
+        The last error, if it isn't retryable or the retries are used up
+    """
+    attempt = 0
+    while True:
+        if limit:
+            request_limiter.acquire()
+            if tokens:
+                token_limiter.acquire(tokens)
+        try:
+            return fn()
+        except Exception as e:
+            attempt += 1
+            delay = _next_delay(e, attempt, max_retries, on_retry)
+            if delay is None:
+                raise
+        time.sleep(delay)
+
+
+async def call_with_retry_async(fn: Callable[[], Awaitable[T]], tokens: int = 0, max_retries: int = MAX_RETRIES,
+                                on_retry: Optional[Callable[[int, Exception, float], None]] = None,
+                                limit: bool = True) -> T:
+    """Async version of call_with_retry: fn returns an awaitable (e.g. an AsyncOpenAI request)."""
+    attempt = 0
+    while True:
+        if limit:
+            await request_limiter.acquire_async()
+            if tokens:
+                await token_limiter.acquire_async(tokens)
+        try:
+            return await fn()
+        except Exception as e:
+            attempt += 1
+            delay = _next_delay(e, attempt, max_retries, on_retry)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
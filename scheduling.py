@@ -0,0 +1,164 @@
+"""
+Calendar algorithms that work on [start, end) time ranges: conflict detection,
+free-time computation, and placing todos into free time.
+"""
+
+from datetime import datetime, time, timedelta
+from typing import Any, Iterable, List, Tuple
+
+
+def find_overlapping_pairs(intervals: Iterable[Tuple[Any, Any, Any]]) -> List[Tuple[Any, Any]]:
+    """
+    Report every pair of overlapping half-open intervals with a sweep line.
+
+    Interval endpoints are sorted once (O(n log n)). The sweep keeps the set of
+    intervals in progress, and each interval that starts is paired with every
+    interval still in progress, so the total cost is O(n log n + k) for k pairs.
+    Intervals that merely touch (one ends exactly when the other starts) do not
+    overlap.
+
+    Args:
+        intervals: (start, end, item) tuples
+
+    Returns:
+        (earlier item, later item) pairs, ordered by when the overlap begins
+    """
+    points = []
+    items = []
+    for start, end, item in intervals:
+        if end <= start:
+            continue  # Empty intervals overlap nothing
+        index = len(items)
+        items.append(item)
+        # At equal times ends (0) sort before starts (1), so touching intervals don't overlap
+        points.append((end, 0, index))
+        points.append((start, 1, index))
+    points.sort()
+
+    active = {}
+    pairs = []
+    for _, is_start, index in points:
+        if is_start:
+            pairs.extend((items[other], items[index]) for other in active)
+            active[index] = True
+        else:
+            active.pop(index, None)
+    return pairs
+
+
+def merge_intervals(intervals: Iterable[Tuple[Any, Any]]) -> List[Tuple[Any, Any]]:
+    """Merge overlapping or touching (start, end) intervals into a sorted, disjoint list."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slots(busy: Iterable[Tuple[datetime, datetime]], start: datetime, end: datetime,
+               work_start: time = time(9), work_end: time = time(17),
+               min_duration: timedelta = timedelta(minutes=30),
+               workdays: Tuple[int, ...] = (0, 1, 2, 3, 4)) -> List[Tuple[datetime, datetime]]:
+    """
+    Compute free windows within working hours between start and end.
+
+    Busy intervals are merged once and then walked together with the working-hours
+    windows of each day, so the cost is O(b log b + d) for b busy intervals over d days.
+
+    Args:
+        busy: (start, end) intervals that are already taken
+        work_start, work_end: Working hours on each working day
+        min_duration: Shorter gaps are not reported
+        workdays: Weekdays (Monday = 0) that have working hours
+
+    Returns:
+        Sorted, disjoint (start, end) free windows
+    """
+    merged = merge_intervals((max(s, start), min(e, end)) for s, e in busy if e > start and s < end)
+    slots = []
+    i = 0
+    day = start.date()
+    while day <= end.date():
+        if day.weekday() in workdays:
+            window_start = max(datetime.combine(day, work_start), start)
+            window_end = min(datetime.combine(day, work_end), end)
+            # Busy intervals that end before this window can't affect it or any later one
+            while i < len(merged) and merged[i][1] <= window_start:
+                i += 1
+            cursor = window_start
+            j = i
+            while cursor < window_end:
+                if j < len(merged) and merged[j][0] < window_end:
+                    gap_end = min(merged[j][0], window_end)
+                    if gap_end - cursor >= min_duration:
+                        slots.append((cursor, gap_end))
+                    cursor = max(cursor, merged[j][1])
+                    j += 1
+                else:
+                    if window_end - cursor >= min_duration:
+                        slots.append((cursor, window_end))
+                    break
+        day += timedelta(days=1)
+    return slots
+
+
+def propose_schedule(tasks: List[dict], slots: List[Tuple[datetime, datetime]],
+                     min_chunk: timedelta = timedelta(minutes=30)) -> Tuple[List[dict], List[dict]]:
+    """
+    Greedily place tasks into free slots, earliest deadline first, then by priority.
+
+    Each task is placed in the earliest free time that ends by its deadline. Tasks
+    longer than a single slot are split across slots in chunks of at least
+    `min_chunk`. Earliest-deadline-first ordering is optimal for meeting deadlines
+    when all tasks fit; otherwise lower-priority tasks with later deadlines are
+    the ones left over.
+
+    Args:
+        tasks: Dicts with 'id', 'duration' (timedelta), 'priority', and optional 'earliest'
+            and 'deadline' (datetime). Tasks flagged 'urgent' (e.g. overdue) are placed first.
+        slots: Sorted, disjoint free (start, end) windows (see free_slots)
+
+    Returns:
+        Tuple of (placements, unscheduled tasks). Each placement is
+        {'id', 'start', 'end'}; a split task has several placements.
+    """
+    # Mutable copy of the free windows, consumed as tasks are placed
+    free = [list(slot) for slot in slots]
+    never = datetime.max
+    ordered = sorted(tasks, key=lambda t: (not t.get('urgent'), t.get('deadline') or never, -t.get('priority', 0)))
+
+    placements = []
+    unscheduled = []
+    for task in ordered:
+        remaining = task['duration']
+        deadline = task.get('deadline') or never
+        earliest = task.get('earliest')
+        chunks = []
+        for slot in free:
+            if remaining <= timedelta(0) or slot[0] >= deadline:
+                break
+            chunk_start = max(slot[0], earliest) if earliest else slot[0]
+            chunk_end = min(slot[1], deadline, chunk_start + remaining)
+            # Leave a useful remainder: don't create a chunk shorter than min_chunk unless it finishes the task
+            if chunk_end - chunk_start < min(min_chunk, remaining):
+                continue
+            chunks.append((slot, chunk_start, chunk_end))
+            remaining -= chunk_end - chunk_start
+        if remaining > timedelta(0):
+            unscheduled.append(task)
+            continue
+        for slot, chunk_start, chunk_end in chunks:
+            placements.append({'id': task['id'], 'start': chunk_start, 'end': chunk_end})
+            if chunk_start == slot[0]:
+                slot[0] = chunk_end
+            else:
+                # Task started mid-slot (earliest start); keep the time before it free as its own window
+                free.insert(free.index(slot), [slot[0], chunk_start])
+                slot[0] = chunk_end
+        free = [slot for slot in free if slot[1] - slot[0] > timedelta(0)]
+
+    placements.sort(key=lambda p: p['start'])
+    return placements, unscheduled
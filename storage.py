@@ -0,0 +1,134 @@
+"""
+Crash-safe snapshot storage for the JSON database file.
+
+Every save writes a complete, compact snapshot to a temporary file, fsyncs it and
+atomically renames it over the database file. The previous snapshot is kept next
+to it as a backup. Each snapshot ends with a SHA-256 checksum of its contents so
+a torn or corrupted file can be detected on load. In that case the newest intact
+copy is used instead.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+TEMP_SUFFIX = ".tmp"
+BACKUP_SUFFIX = ".bak"
+CORRUPT_SUFFIX = ".corrupt"
+
+# Saves slower than this print a warning (see Database.last_save_stats for measurements)
+SAVE_BUDGET_SECONDS = 0.25
+
+# The checksum is stored as the last key of the top-level object
+_CHECKSUM_PREFIX = ',"checksum":"'
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is truncated, unparsable, or fails its checksum."""
+
+
+def _checksum(body: str) -> str:
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def encode_snapshot(data: dict) -> str:
+    """Serialize data compactly and append a checksum over the serialized text."""
+    body = json.dumps(data, separators=(',', ':'))
+    if not data:
+        return f'{{{_CHECKSUM_PREFIX[1:]}{_checksum(body)}"}}'  # No comma before the only key
+    return f'{body[:-1]}{_CHECKSUM_PREFIX}{_checksum(body)}"}}'
+
+
+def decode_snapshot(text: str) -> dict:
+    """Parse a snapshot, verifying its checksum if it has one. Hand-written files without one are accepted."""
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise SnapshotError(f"unreadable snapshot: {e}")
+    if not isinstance(data, dict):
+        raise SnapshotError("snapshot is not a JSON object")
+
+    stored = data.pop('checksum', None)
+    if stored is None:
+        return data
+
+    idx = text.rfind(_CHECKSUM_PREFIX)
+    if idx != -1:
+        body = text[:idx] + '}'
+    else:
+        body = None if data else '{}'  # {"checksum":...} alone is the snapshot of an empty object
+    if body is None or _checksum(body) != stored:
+        raise SnapshotError("checksum mismatch")
+    return data
+
+
+def write_snapshot(path: str, data: dict) -> dict:
+    """Atomically replace `path` with a checksummed snapshot of data. Returns write statistics."""
+    started = time.perf_counter()
+    text = encode_snapshot(data)
+    tmp_path = path + TEMP_SUFFIX
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+    # Keep the previous snapshot so a damaged file can still be recovered
+    if os.path.exists(path):
+        os.replace(path, path + BACKUP_SUFFIX)
+    os.replace(tmp_path, path)
+    _fsync_directory(path)
+
+    seconds = time.perf_counter() - started
+    stats = {'seconds': seconds, 'bytes': len(text)}
+    if seconds > SAVE_BUDGET_SECONDS:
+        print(f"Warning: saving database took {seconds:.3f}s ({len(text)} bytes), over the {SAVE_BUDGET_SECONDS}s budget")
+    return stats
+
+
+def read_snapshot(path: str) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Read the newest intact snapshot for `path`.
+
+    Tries the database file, then a completed temp file left by an interrupted save,
+    then the backup of the previous snapshot. A damaged database file is set aside
+    with a `.corrupt` suffix so it is not silently overwritten.
+
+    Returns:
+        Tuple of (data, path it was read from), or (None, None) if no snapshot exists
+    """
+    errors = []
+    for candidate in (path, path + TEMP_SUFFIX, path + BACKUP_SUFFIX):
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, 'r', encoding='utf-8') as f:
+                data = decode_snapshot(f.read())
+        except (OSError, SnapshotError) as e:
+            errors.append(f"{candidate}: {e}")
+            if candidate == path:
+                os.replace(path, path + CORRUPT_SUFFIX)
+            continue
+        if errors:
+            print(f"Recovered database from {candidate} ({'; '.join(errors)})")
+        return data, candidate
+
+    if errors:
+        raise SnapshotError(f"no intact database snapshot found ({'; '.join(errors)})")
+    return None, None
+
+
+def _fsync_directory(path: str):
+    """Flush the rename itself to disk where the platform supports it."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # Not supported on Windows
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
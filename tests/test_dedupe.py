@@ -0,0 +1,42 @@
+"""Near-duplicate title detection of dedupe.py."""
+
+from dedupe import DUPLICATE_THRESHOLD, DuplicateIndex, jaccard, normalize_title, shingles
+
+
+def test_normalize_title_drops_case_punctuation_and_filler():
+    assert normalize_title('Finish the report!') == 'finish report'
+    assert normalize_title('The') == 'the'  # Kept when nothing else is left
+
+
+def test_rewordings_are_above_the_threshold():
+    assert jaccard(shingles('Finish the report'), shingles('finish report')) == 1.0
+    assert jaccard(shingles('Renew passport'), shingles('Renew my passport soon')) >= DUPLICATE_THRESHOLD
+
+
+def test_unrelated_titles_are_below_the_threshold():
+    assert jaccard(shingles('Renew passport'), shingles('Buy groceries')) < DUPLICATE_THRESHOLD
+    assert jaccard(shingles('Call mom'), shingles('Call the plumber')) < DUPLICATE_THRESHOLD
+
+
+def test_index_finds_matches_at_or_above_threshold():
+    index = DuplicateIndex()
+    index.add(1, 'Finish the quarterly report')
+    index.add(2, 'Buy groceries')
+    index.add(3, 'Renew passport')
+    assert [key for key, _ in index.find('finish quarterly report')] == [1]
+    assert index.find('Book a dentist appointment') == []
+    assert index.find('Renew passport', exclude=3) == []
+    # Raising the threshold above a match's similarity drops it
+    (key, score), = index.find('Finish report')
+    assert key == 1 and score < 1.0
+    assert index.find('Finish report', threshold=score + 0.01) == []
+
+
+def test_index_add_replaces_and_remove_forgets():
+    index = DuplicateIndex()
+    index.add(1, 'Renew passport')
+    index.add(1, 'Buy groceries')
+    assert len(index) == 1
+    assert index.find('Renew passport') == []
+    assert index.remove(1) and not index.remove(1)
+    assert index.find('Buy groceries') == []
@@ -0,0 +1,60 @@
+"""Overlap and stabbing queries of interval_tree.IntervalTree."""
+
+import random
+
+import pytest
+
+from interval_tree import IntervalTree
+
+
+def test_overlapping_excludes_touching_intervals():
+    tree = IntervalTree()
+    tree.insert('a', 0, 10, 'a')
+    tree.insert('b', 10, 20, 'b')
+    tree.insert('c', 5, 15, 'c')
+    assert tree.overlapping(10, 12) == ['c', 'b']
+    assert tree.overlapping(0, 5) == ['a']
+    assert tree.overlapping(20, 30) == []
+
+
+def test_at_is_half_open():
+    tree = IntervalTree()
+    tree.insert(1, 0, 10, 'first')
+    tree.insert(2, 10, 20, 'second')
+    assert tree.at(10) == ['second']
+    assert tree.at(9) == ['first']
+
+
+def test_insert_replaces_and_remove_forgets():
+    tree = IntervalTree()
+    tree.insert('a', 0, 10, 'old')
+    tree.insert('a', 20, 30, 'new')
+    assert len(tree) == 1
+    assert tree.overlapping(0, 10) == []
+    assert tree.overlapping(25, 26) == ['new']
+    assert tree.remove('a')
+    assert not tree.remove('a')
+    assert 'a' not in tree
+
+
+def test_rejects_end_before_start():
+    with pytest.raises(ValueError):
+        IntervalTree().insert('a', 5, 1)
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    tree = IntervalTree()
+    intervals = {}
+    for key in range(300):
+        start = rng.randrange(1000)
+        intervals[key] = (start, start + rng.randrange(1, 50))
+        tree.insert(key, *intervals[key], key)
+    for key in rng.sample(range(300), 100):
+        tree.remove(key)
+        del intervals[key]
+    for _ in range(200):
+        start = rng.randrange(1000)
+        end = start + rng.randrange(0, 60)
+        expected = {k for k, (s, e) in intervals.items() if s < end and e > start}
+        assert set(tree.overlapping(start, end)) == expected
@@ -0,0 +1,63 @@
+"""Schema upgrades of migrations.py, and how Database.load treats files it can't read."""
+
+import json
+
+import pytest
+
+from db import Database
+from migrations import SCHEMA_VERSION, migrate
+
+V0_FILE = {
+    'todos': [{'id': 1, 'title': 'Pay rent', 'description': '', 'priority': 3, 'due_date': None,
+               'completed': False, 'created_at': '2024-01-01T00:00:00', 'tags': [' Home', 'home', 'BILLS'],
+               'attached_to_todo_id': None, 'attached_to_goal_id': 2}],
+    'goals': [{'id': 2, 'title': 'Save money', 'description': '', 'priority': 4, 'due_date': None,
+               'completed': False, 'created_at': '2024-01-01T00:00:00', 'tags': None,
+               'attached_todo_ids': [1], 'attached_goal_ids': [], 'attached_event_ids': []}],
+    'events': [{'id': 3, 'title': 'Standup', 'description': '', 'start': '2024-01-02T09:00:00',
+                'created_at': '2024-01-01T00:00:00', 'tags': ['Work'], 'attached_to_goal_id': None}],
+}
+
+
+def test_upgrades_version_0_to_current():
+    data = json.loads(json.dumps(V0_FILE))
+    assert migrate(data)
+    assert data['schema_version'] == SCHEMA_VERSION == 2
+    todo, goal, event = data['todos'][0], data['goals'][0], data['events'][0]
+    assert 'attached_to_goal_id' not in todo and 'attached_todo_ids' not in goal
+    assert todo['tags'] == ['home', 'bills']
+    assert goal['tags'] == []
+    assert event['date'] == '2024-01-02T09:00:00' and 'start' not in event
+    assert event['end'] is None
+
+
+def test_current_version_is_left_alone():
+    data = {'schema_version': SCHEMA_VERSION, 'todos': []}
+    assert not migrate(data)
+
+
+def test_refuses_newer_schema():
+    with pytest.raises(ValueError, match="newer"):
+        migrate({'schema_version': SCHEMA_VERSION + 1})
+
+
+def test_loading_upgrades_and_rewrites_the_file(tmp_path):
+    path = tmp_path / 'db.json'
+    path.write_text(json.dumps(V0_FILE))
+    database = Database(str(path))
+    assert [t.title for t in database.todos] == ['Pay rent']
+    assert database.events[0].date.hour == 9
+    assert json.loads(path.read_text())['schema_version'] == SCHEMA_VERSION
+
+
+def test_newer_file_is_never_overwritten(tmp_path):
+    path = tmp_path / 'db.json'
+    original = json.dumps({'schema_version': SCHEMA_VERSION + 1, 'todos': [{'id': 1}]})
+    path.write_text(original)
+    database = Database(str(path))
+    assert database.load_error
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            database.add_todo('New', '', 3)
+    assert path.read_text() == original
+    assert not (tmp_path / 'db.json.bak').exists()
@@ -0,0 +1,57 @@
+"""Occurrence expansion of recurrence.py: month ends, exceptions and series limits."""
+
+from datetime import datetime
+
+from data import Recurrence
+from recurrence import expand, next_occurrence, nth_occurrence, occurrences, parse_recurrence, serialize_recurrence
+
+JAN_31 = datetime(2027, 1, 31, 9)
+
+
+def test_monthly_clamps_to_month_end_without_drifting():
+    rule = Recurrence('monthly')
+    starts = list(occurrences(JAN_31, rule, datetime(2027, 1, 1), datetime(2027, 6, 1)))
+    assert [d.day for d in starts] == [31, 28, 31, 30, 31]
+
+
+def test_yearly_from_leap_day():
+    rule = Recurrence('yearly')
+    assert nth_occurrence(datetime(2028, 2, 29), rule, 1) == datetime(2029, 2, 28)
+    assert nth_occurrence(datetime(2028, 2, 29), rule, 4) == datetime(2032, 2, 29)
+
+
+def test_window_is_half_open():
+    rule = Recurrence('daily')
+    start = datetime(2027, 1, 1, 9)
+    assert list(occurrences(start, rule, start, start.replace(day=3))) == [start, start.replace(day=2)]
+
+
+def test_count_and_until_end_the_series():
+    assert len(list(occurrences(JAN_31, Recurrence('monthly', count=3), JAN_31, datetime(2028, 1, 1)))) == 3
+    until = Recurrence('weekly', until=datetime(2027, 2, 14, 9))
+    assert list(occurrences(JAN_31, until, JAN_31, datetime(2028, 1, 1)))[-1] == datetime(2027, 2, 14, 9)
+
+
+def test_expand_skips_cancelled_and_places_moved_occurrences():
+    rule = Recurrence('monthly', exceptions={
+        datetime(2027, 2, 28, 9).isoformat(): None,
+        datetime(2027, 3, 31, 9).isoformat(): {'date': datetime(2027, 4, 2, 9).isoformat(), 'title': 'Moved'},
+    })
+    march = list(expand(JAN_31, rule, datetime(2027, 2, 1), datetime(2027, 4, 1)))
+    assert march == []  # February is cancelled and March moved out of the window
+    april = list(expand(JAN_31, rule, datetime(2027, 4, 1), datetime(2027, 5, 1)))
+    assert [original for original, _ in april] == [datetime(2027, 4, 30, 9), datetime(2027, 3, 31, 9)]
+    assert april[1][1]['title'] == 'Moved'
+
+
+def test_next_occurrence_steps_from_the_anchor_and_skips_cancelled():
+    rule = Recurrence('monthly', count=4, exceptions={datetime(2027, 3, 31, 9).isoformat(): None})
+    assert next_occurrence(JAN_31, rule, JAN_31) == datetime(2027, 2, 28, 9)
+    assert next_occurrence(JAN_31, rule, datetime(2027, 2, 28, 9)) == datetime(2027, 4, 30, 9)
+    assert next_occurrence(JAN_31, rule, datetime(2027, 4, 30, 9)) is None
+
+
+def test_serialized_rule_round_trips():
+    rule = Recurrence('weekly', interval=2, until=datetime(2027, 6, 1), exceptions={'2027-02-14T09:00:00': None},
+                      anchor=JAN_31)
+    assert parse_recurrence(serialize_recurrence(rule)) == rule
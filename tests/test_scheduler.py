@@ -0,0 +1,120 @@
+"""
+Retries and rate limiting of scheduler.py against mock_llm.MockServer, through the
+real OpenAI client (with its own retries disabled, as in ai_client).
+
+Run from the repository root: python -m pytest tests
+"""
+
+import time
+
+import pytest
+from openai import BadRequestError, OpenAI
+
+import scheduler
+from mock_llm import FailureInjector, MockServer
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+class FailFirst(FailureInjector):
+    """Fails the first requests with the given statuses, then serves every request."""
+
+    def __init__(self, *statuses: int, retry_after: float = None):
+        super().__init__(retry_after=retry_after)
+        self.pending = list(statuses)
+
+    def __call__(self):
+        with self._lock:
+            if not self.pending:
+                return None
+            self.injected += 1
+            return self.pending.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def limiters(monkeypatch):
+    """Fresh rate limits for each test, and short backoffs."""
+    monkeypatch.setattr(scheduler, "request_limiter", scheduler.TokenBucket(scheduler.REQUESTS_PER_MINUTE / 60,
+                                                                            scheduler.REQUEST_BURST))
+    monkeypatch.setattr(scheduler, "token_limiter", scheduler.TokenBucket(scheduler.TOKENS_PER_MINUTE / 60,
+                                                                          scheduler.TOKEN_BURST))
+    monkeypatch.setattr(scheduler, "BACKOFF_BASE", 0.01)
+
+
+def serve(failures):
+    server = MockServer(latency=0, token_latency=0, failures=failures).start()
+    client = OpenAI(base_url=server.url, api_key="mock", max_retries=0)
+    return server, client
+
+
+def request(client, on_retry=None):
+    return scheduler.call_with_retry(
+        lambda: client.chat.completions.create(model="mock", messages=MESSAGES), tokens=10, on_retry=on_retry)
+
+
+def test_retries_until_success():
+    server, client = serve(FailFirst(429, 500, 503, retry_after=0))
+    retries = []
+    try:
+        response = request(client, lambda attempt, error, delay: retries.append(scheduler.status_code(error)))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert response.choices[0].message.content
+    assert retries == [429, 500, 503]
+    assert server.stats["requests"] == 4
+
+
+def test_gives_up_after_max_retries():
+    server, client = serve(FailFirst(*[500] * (scheduler.MAX_RETRIES + 1)))
+    try:
+        with pytest.raises(Exception) as raised:
+            request(client)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert scheduler.status_code(raised.value) == 500
+    assert server.stats["requests"] == scheduler.MAX_RETRIES + 1
+
+
+def test_honours_retry_after():
+    server, client = serve(FailFirst(429, retry_after=0.5))
+    delays = []
+    start = time.perf_counter()
+    try:
+        request(client, lambda attempt, error, delay: delays.append(delay))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert delays and delays[0] >= 0.5
+    assert time.perf_counter() - start >= 0.5
+
+
+def test_client_error_is_not_retried():
+    server, client = serve(FailFirst(400))
+    try:
+        with pytest.raises(BadRequestError):
+            request(client, lambda attempt, error, delay: pytest.fail("A 400 was retried"))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert server.stats["requests"] == 1
+
+
+def test_rate_limit_pauses_request_limiter():
+    server, client = serve(FailFirst(429, retry_after=0.3))
+    waits = []
+    try:
+        # Checked before the retry: every other request now has to wait as well
+        request(client, lambda attempt, error, delay: waits.append(scheduler.request_limiter.reserve(0)))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert waits and waits[0] >= 0.3
+
+
+def test_token_bucket_spaces_out_requests():
+    bucket = scheduler.TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
@@ -0,0 +1,40 @@
+"""Sweep-line overlap detection and interval merging of scheduling.py."""
+
+import random
+
+from scheduling import find_overlapping_pairs, merge_intervals
+
+
+def test_touching_intervals_do_not_overlap():
+    assert find_overlapping_pairs([(0, 10, 'a'), (10, 20, 'b'), (20, 30, 'c')]) == []
+
+
+def test_reports_each_overlapping_pair_once():
+    pairs = find_overlapping_pairs([(0, 10, 'a'), (5, 15, 'b'), (10, 20, 'c'), (0, 30, 'd')])
+    assert sorted(map(sorted, pairs)) == [['a', 'b'], ['a', 'd'], ['b', 'c'], ['b', 'd'], ['c', 'd']]
+
+
+def test_pairs_are_ordered_by_when_the_overlap_begins():
+    assert find_overlapping_pairs([(5, 15, 'b'), (0, 10, 'a')]) == [('a', 'b')]
+
+
+def test_identical_and_empty_intervals():
+    assert len(find_overlapping_pairs([(0, 10, 'a'), (0, 10, 'b')])) == 1
+    assert find_overlapping_pairs([(5, 5, 'empty'), (0, 10, 'a')]) == []
+
+
+def test_matches_brute_force():
+    rng = random.Random(3)
+    intervals = []
+    for i in range(200):
+        start = rng.randrange(500)
+        intervals.append((start, start + rng.randrange(1, 30), i))
+    expected = {frozenset((a[2], b[2])) for n, a in enumerate(intervals) for b in intervals[n + 1:]
+                if a[0] < b[1] and b[0] < a[1]}
+    pairs = find_overlapping_pairs(intervals)
+    assert len(pairs) == len(expected)
+    assert {frozenset(p) for p in pairs} == expected
+
+
+def test_merge_intervals_joins_touching_ranges():
+    assert merge_intervals([(10, 20), (0, 5), (5, 8), (15, 30), (40, 50)]) == [(0, 8), (10, 30), (40, 50)]
@@ -0,0 +1,56 @@
+"""Checksummed snapshots of storage.py and recovery from a damaged database file."""
+
+import os
+
+import pytest
+
+from storage import (BACKUP_SUFFIX, CORRUPT_SUFFIX, SnapshotError, decode_snapshot, encode_snapshot,
+                     read_snapshot, write_snapshot)
+
+
+@pytest.mark.parametrize("data", [{}, {'todos': []}, {'a': 1, 'b': [{'c': None}]}])
+def test_snapshot_round_trips(data):
+    assert decode_snapshot(encode_snapshot(data)) == data
+
+
+def test_detects_a_changed_body():
+    text = encode_snapshot({'title': 'Pay rent'}).replace('rent', 'tent')
+    with pytest.raises(SnapshotError):
+        decode_snapshot(text)
+
+
+def test_accepts_hand_written_files_without_checksum():
+    assert decode_snapshot('{"todos": []}') == {'todos': []}
+
+
+def test_save_keeps_the_previous_snapshot(tmp_path):
+    path = str(tmp_path / 'db.json')
+    write_snapshot(path, {'n': 1})
+    write_snapshot(path, {'n': 2})
+    assert read_snapshot(path) == ({'n': 2}, path)
+    with open(path + BACKUP_SUFFIX) as f:
+        assert decode_snapshot(f.read()) == {'n': 1}
+
+
+def test_recovers_from_backup_when_main_file_is_corrupt(tmp_path):
+    path = str(tmp_path / 'db.json')
+    write_snapshot(path, {'n': 1})
+    write_snapshot(path, {'n': 2})
+    with open(path, 'r+') as f:
+        f.truncate(os.path.getsize(path) // 2)  # Torn write
+    data, source = read_snapshot(path)
+    assert (data, source) == ({'n': 1}, path + BACKUP_SUFFIX)
+    assert not os.path.exists(path)
+    assert os.path.exists(path + CORRUPT_SUFFIX)  # Set aside, not overwritten
+
+
+def test_fails_when_no_snapshot_is_intact(tmp_path):
+    path = str(tmp_path / 'db.json')
+    with open(path, 'w') as f:
+        f.write('{"n": ')
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+
+def test_missing_file_is_an_empty_database(tmp_path):
+    assert read_snapshot(str(tmp_path / 'db.json')) == (None, None)
@@ -0,0 +1,288 @@
+"""
+Registry of AI-callable tools.
+
+A tool is a plain function registered with @tool. Its OpenAI function schema is
+built once, at import, from the signature: the docstring is the tool description,
+parameters without a default are required, and each parameter's JSON type comes
+from its type hint. Parameter descriptions (and any extra schema keys) are given
+with typing.Annotated:
+
+    @tool(group='todos', read_only=True)
+    def get_upcoming_todos(days: Annotated[int, "Number of days to look ahead"] = 7) -> list:
+        '''Get todos due within a specified number of days'''
+        ...
+
+Calls are dispatched by name through a dict, and arguments are validated against
+the schema first, so handlers receive arguments of the declared types (optional
+arguments the model sent as null are left at their defaults).
+
+Results of read-only tools can be memoized with ResultCache, keyed by cache_key():
+the tool name, its canonical arguments and the version of the data it read.
+"""
+
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Annotated, Any, Callable, Dict, List, Literal, Optional, Union, get_args, get_origin, get_type_hints
+
+TOOL_CACHE_SIZE = 256  # Results kept by ResultCache
+# Seconds a cached result stays valid even without mutations, since tools like
+# get_overdue_todos depend on the current time as well as on the data
+TOOL_CACHE_TTL = 120.0
+
+_JSON_TYPES = {str: 'string', int: 'integer', float: 'number', bool: 'boolean', dict: 'object', list: 'array'}
+
+
+class ToolArgumentError(ValueError):
+    """Arguments from the model don't match a tool's schema."""
+
+
+class Param:
+    """Annotated metadata for a tool parameter: its description, extra schema keys, or a complete schema."""
+
+    def __init__(self, description: Optional[str] = None, schema: Optional[dict] = None, **extra):
+        self.description = description
+        self.schema = schema
+        self.extra = extra
+
+
+@dataclass
+class Tool:
+    name: str
+    description: str
+    handler: Callable
+    parameters: dict  # JSON schema of the arguments object
+    group: str = 'general'
+    read_only: bool = False  # True if the tool never changes the database
+
+    @property
+    def schema(self) -> dict:
+        """OpenAI function-calling tool definition."""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+            },
+        }
+
+    def validate(self, args: Optional[dict]) -> dict:
+        """Check arguments against the schema and return them as keyword arguments for the handler."""
+        args = args or {}
+        if not isinstance(args, dict):
+            raise ToolArgumentError("arguments must be a JSON object")
+        properties = self.parameters["properties"]
+        unknown = [name for name in args if name not in properties]
+        if unknown:
+            expected = ', '.join(properties) or 'none'
+            raise ToolArgumentError(f"unknown argument(s) {', '.join(unknown)} (expected: {expected})")
+        missing = [name for name in self.parameters["required"] if args.get(name) is None]
+        if missing:
+            raise ToolArgumentError(f"missing required argument(s) {', '.join(missing)}")
+        kwargs = {}
+        for name, value in args.items():
+            if value is None:
+                continue  # Optional argument sent as null: use the handler's default
+            kwargs[name] = _check(name, value, properties[name])
+        return kwargs
+
+
+REGISTRY: Dict[str, Tool] = {}
+
+
+def _check(name: str, value: Any, schema: dict) -> Any:
+    """Validate one value against a (simple) JSON schema, coercing numeric strings and integral floats."""
+    expected = schema.get("type")
+    if expected == "integer":
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, str) and value.strip().lstrip('-').isdigit():
+            value = int(value)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ToolArgumentError(f"{name} must be an integer, got {value!r}")
+    elif expected == "number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ToolArgumentError(f"{name} must be a number, got {value!r}")
+    elif expected == "boolean":
+        if not isinstance(value, bool):
+            raise ToolArgumentError(f"{name} must be true or false, got {value!r}")
+    elif expected == "string":
+        if not isinstance(value, str):
+            raise ToolArgumentError(f"{name} must be a string, got {value!r}")
+    elif expected == "array":
+        if not isinstance(value, list):
+            raise ToolArgumentError(f"{name} must be an array, got {value!r}")
+        items = schema.get("items")
+        if items:
+            value = [_check(f"{name}[{i}]", item, items) for i, item in enumerate(value)]
+    elif expected == "object":
+        if not isinstance(value, dict):
+            raise ToolArgumentError(f"{name} must be an object, got {value!r}")
+        for key in schema.get("required", []):
+            if value.get(key) is None:
+                raise ToolArgumentError(f"{name} is missing {key}")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if value.get(key) is not None:
+                value = {**value, key: _check(f"{name}.{key}", value[key], sub_schema)}
+    if "enum" in schema and value not in schema["enum"]:
+        raise ToolArgumentError(f"{name} must be one of {', '.join(map(str, schema['enum']))}, got {value!r}")
+    return value
+
+
+def _type_schema(hint) -> dict:
+    """JSON schema for a type hint (Optional[X] is treated as X; optionality comes from the default)."""
+    origin = get_origin(hint)
+    if origin is Union:
+        args = [a for a in get_args(hint) if a is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f"Unsupported union type {hint}")
+        return _type_schema(args[0])
+    if origin is Literal:
+        values = list(get_args(hint))
+        return {"type": _JSON_TYPES[type(values[0])], "enum": values}
+    if origin in (list, List):
+        args = get_args(hint)
+        return {"type": "array", "items": _type_schema(args[0])} if args else {"type": "array"}
+    if origin in (dict, Dict):
+        return {"type": "object"}
+    if hint in _JSON_TYPES:
+        return {"type": _JSON_TYPES[hint]}
+    raise TypeError(f"Unsupported parameter type {hint}")
+
+
+def _build_parameters(fn: Callable):
+    hints = get_type_hints(fn, include_extras=True)
+    properties = {}
+    required = []
+    for name, param in inspect.signature(fn).parameters.items():
+        hint = hints.get(name, str)
+        metadata = []
+        if get_origin(hint) is Annotated:
+            hint, *metadata = get_args(hint)
+        description = next((m for m in metadata if isinstance(m, str)), None)
+        options = next((m for m in metadata if isinstance(m, Param)), None)
+        if options and options.schema is not None:
+            schema = options.schema
+        else:
+            schema = _type_schema(hint)
+            if options and options.description:
+                description = options.description
+            if description:
+                schema["description"] = description
+            if options:
+                schema.update(options.extra)
+        properties[name] = schema
+        if param.default is inspect.Parameter.empty:
+            required.append(name)
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def tool(group: str = 'general', read_only: bool = False, name: Optional[str] = None):
+    """
+    Register a function as an AI tool.
+
+    Args:
+        group: Topic used to offer related tools together (e.g. 'calendar', 'todos')
+        read_only: True if the tool never changes the database
+        name: Tool name (default: the function name)
+    """
+    def decorator(fn: Callable) -> Callable:
+        tool_name = name or fn.__name__
+        if tool_name in REGISTRY:
+            raise ValueError(f"Tool {tool_name!r} is already registered")
+        description = inspect.getdoc(fn)
+        if not description:
+            raise ValueError(f"Tool {tool_name!r} needs a docstring (it is the tool description)")
+        REGISTRY[tool_name] = Tool(tool_name, description, fn, _build_parameters(fn), group, read_only)
+        return fn
+    return decorator
+
+
+def cache_key(name: str, args: Optional[dict], version: int) -> Optional[tuple]:
+    """
+    Key for caching a call's result, or None if it must not be cached (unknown or
+    mutating tool, invalid arguments). Arguments are canonicalized: validated and
+    coerced, defaults filled in, and serialized with sorted keys, so equivalent
+    calls share a key.
+
+    Args:
+        name: Tool name
+        args: Arguments from the model
+        version: Version of the data the tool reads (e.g. Database.version)
+    """
+    registered = REGISTRY.get(name)
+    if registered is None or not registered.read_only:
+        return None
+    try:
+        kwargs = registered.validate(args)
+    except ToolArgumentError:
+        return None
+    bound = inspect.signature(registered.handler).bind(**kwargs)
+    bound.apply_defaults()
+    return name, json.dumps(bound.arguments, sort_keys=True, default=str), version
+
+
+class ResultCache:
+    """Thread-safe LRU cache of tool results with a time-to-live, keyed by cache_key()."""
+
+    def __init__(self, max_size: int = TOOL_CACHE_SIZE, ttl: float = TOOL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # Key -> (expiry time, result), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Any:
+        """The cached result, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, result: Any):
+        with self._lock:
+            # Keys embed the data version, so entries for older versions can never hit again
+            stale = [k for k in self._entries if k[2] != key[2]]
+            for k in stale:
+                del self._entries[k]
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def tool_schemas(names: Optional[List[str]] = None) -> List[dict]:
+    """Tool definitions for the API, in registration order (optionally only the named tools)."""
+    if names is None:
+        return [t.schema for t in REGISTRY.values()]
+    return [REGISTRY[n].schema for n in names if n in REGISTRY]
+
+
+def dispatch(name: str, args: Optional[dict]) -> Any:
+    """Validate the arguments and call the named tool. Problems are returned as results the model can act on."""
+    registered = REGISTRY.get(name)
+    if registered is None:
+        return {"error": f"Unknown function: {name}"}
+    try:
+        kwargs = registered.validate(args)
+    except ToolArgumentError as e:
+        return {"success": False, "message": f"Invalid arguments for {name}: {e}"}
+    return registered.handler(**kwargs)
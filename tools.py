@@ -0,0 +1,761 @@
+"""
+Tools the AI can call. Each function is registered with @tool (see tool_registry.py);
+its docstring, signature and Annotated parameter descriptions become the schema sent
+to the model, so this module is the single place to add or change a tool.
+
+Handlers receive validated arguments and return JSON-serializable results.
+"""
+
+from datetime import datetime, time
+from typing import Annotated, List, Optional
+from db import db, WORK_START, WORK_END
+from dedupe import DuplicateError
+from recurrence import parse_recurrence
+from tool_registry import Param, tool, tool_schemas
+
+# Recurrence rule accepted by add/update tools for events and todos
+RECURRENCE_SCHEMA = {
+    "type": "object",
+    "description": "Repeat rule (optional). Occurrences are generated automatically; do not add repeated items one by one.",
+    "properties": {
+        "freq": {
+            "type": "string",
+            "enum": ["daily", "weekly", "monthly", "yearly"],
+            "description": "How often the item repeats"
+        },
+        "interval": {
+            "type": "integer",
+            "description": "Repeat every N periods (default: 1, e.g. 2 with weekly = every other week)"
+        },
+        "until": {
+            "type": "string",
+            "description": "Last possible occurrence in ISO format (optional)"
+        },
+        "count": {
+            "type": "integer",
+            "description": "Total number of occurrences (optional)"
+        }
+    },
+    "required": ["freq"]
+}
+
+DUPLICATE_SCHEMA = {
+    "type": "string",
+    "enum": ["warn", "merge", "reject"],
+    "description": "What to do if a similar open item already exists: 'warn' adds it and lists possible_duplicates, 'merge' adds the new details to the existing item instead, 'reject' adds nothing (default: warn). No need to search for duplicates before adding"
+}
+
+Recurrence = Annotated[Optional[dict], Param(schema=RECURRENCE_SCHEMA)]
+OnDuplicate = Annotated[Optional[str], Param(schema=DUPLICATE_SCHEMA)]
+CheckConflicts = Annotated[bool, "Report events that overlap this one in the result (default: true)"]
+TagQuery = Annotated[str, "Tag to search for (case-insensitive, e.g., 'apartment', 'rent', 'urgent')"]
+TitleQuery = Annotated[str, "Title or part of title to search for"]
+WorkStart = Annotated[Optional[str], "Start of working hours as HH:MM (default: 09:00)"]
+WorkEnd = Annotated[Optional[str], "End of working hours as HH:MM (default: 17:00)"]
+
+ISO_HINT = "Please use ISO format (e.g., 2026-02-10T14:00:00)"
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _working_hours(work_start: Optional[str], work_end: Optional[str]):
+    start = time.fromisoformat(work_start) if work_start else WORK_START
+    end = time.fromisoformat(work_end) if work_end else WORK_END
+    if end <= start:
+        raise ValueError("work_end must be after work_start")
+    return start, end
+
+
+def _add_conflicts(result: dict, conflicts: list):
+    """Attach overlapping events to a tool result so the AI can warn the user without another call."""
+    if conflicts:
+        result["conflicts"] = conflicts
+        titles = ", ".join(f"'{c['title']}'" for c in conflicts[:5])
+        result["message"] += f". Warning: overlaps with {len(conflicts)} event(s): {titles}"
+
+
+def _add_duplicates(result: dict, entity_type: str, item_id: int, duplicates: list):
+    """Report near-duplicates of a newly added item, or that the item was merged into an existing one."""
+    if any(d["id"] == item_id for d in duplicates):
+        result["merged"] = True
+        result["message"] = f"Merged into existing {entity_type} '{duplicates[0]['title']}' (ID: {item_id}) instead of adding a duplicate"
+    elif duplicates:
+        result["possible_duplicates"] = duplicates
+        titles = ", ".join(f"'{d['title']}' (ID: {d['id']})" for d in duplicates[:3])
+        result["message"] += f". Note: similar {entity_type}s already exist: {titles}"
+
+
+def _duplicate_result(e: DuplicateError) -> dict:
+    return {"success": False, "message": f"{str(e)}. Nothing was added; ask the user whether to update the existing item or add it anyway (on_duplicate='warn')", "possible_duplicates": e.duplicates}
+
+
+def _deleted(kind: str, item_id: int, success: bool) -> dict:
+    if success:
+        return {"success": True, "message": f"{kind} {item_id} deleted successfully"}
+    return {"success": False, "message": f"{kind} {item_id} not found"}
+
+
+# Calendar
+
+@tool(group='calendar', read_only=True)
+def get_events_this_week() -> list:
+    """Get all events scheduled for this week"""
+    return db.get_events_this_week()
+
+
+@tool(group='calendar', read_only=True)
+def get_all_events() -> list:
+    """Get all events in the calendar"""
+    return db.get_all_events()
+
+
+@tool(group='calendar', read_only=True)
+def get_events_overlapping(
+        start: Annotated[str, "Start of the range in ISO format (e.g., 2026-02-12T14:00:00)"],
+        end: Annotated[Optional[str], "End of the range in ISO format (optional; omit to ask what is happening at 'start')"] = None):
+    """Get events overlapping a time range (e.g. 'what's on 2-4pm Thursday?'), or in progress at a single point in time if no end is given. Includes occurrences of recurring events."""
+    try:
+        return db.get_events_overlapping(datetime.fromisoformat(start), _parse(end))
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid date format: {str(e)}. {ISO_HINT}"}
+
+
+@tool(group='calendar', read_only=True)
+def get_event_conflicts(
+        start: Annotated[str, "Start of the range in ISO format"],
+        end: Annotated[str, "End of the range in ISO format"]) -> dict:
+    """Find all pairs of overlapping (double-booked) events in a time range"""
+    try:
+        return {"conflicts": db.get_event_conflicts(datetime.fromisoformat(start), datetime.fromisoformat(end))}
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid date format: {str(e)}. {ISO_HINT}"}
+
+
+@tool(group='calendar', read_only=True)
+def find_free_slots(
+        start: Annotated[str, "Start of the range in ISO format"],
+        end: Annotated[str, "End of the range in ISO format"],
+        min_minutes: Annotated[int, "Minimum length of a free window in minutes (default: 30)"] = 30,
+        work_start: WorkStart = None,
+        work_end: WorkEnd = None) -> dict:
+    """Find free time windows during working hours (Mon-Fri) in a date range, skipping all events"""
+    try:
+        hours = _working_hours(work_start, work_end)
+        return {"free_slots": db.find_free_slots(datetime.fromisoformat(start), datetime.fromisoformat(end),
+                                                 *hours, min_minutes)}
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid input: {str(e)}. Use ISO dates (e.g., 2026-02-10T14:00:00) and HH:MM working hours"}
+
+
+@tool(group='calendar', read_only=True)
+def propose_schedule(
+        start: Annotated[Optional[str], "Start of the scheduling window in ISO format (default: now)"] = None,
+        end: Annotated[Optional[str], "End of the scheduling window in ISO format (default: the latest due date, at least two weeks ahead)"] = None,
+        default_minutes: Annotated[int, "Estimated minutes for todos without an estimate in durations (default: 60)"] = 60,
+        durations: Annotated[Optional[dict], Param("Optional time estimates as {todo_id: minutes}", additionalProperties={"type": "integer"})] = None,
+        work_start: WorkStart = None,
+        work_end: WorkEnd = None) -> dict:
+    """Propose a time block in free working hours for every incomplete todo, earliest due date first, then by priority. Nothing is saved; use add_event to book blocks the user accepts"""
+    try:
+        work_start, work_end = _working_hours(work_start, work_end)
+        return db.propose_schedule(_parse(start), _parse(end), default_minutes, durations, work_start, work_end)
+    except (TypeError, ValueError) as e:
+        return {"success": False, "message": f"Invalid input: {str(e)}. Use ISO dates (e.g., 2026-02-10T14:00:00) and HH:MM working hours"}
+
+
+# Todos and goals
+
+@tool(group='todos', read_only=True)
+def get_todos_by_priority(
+        priority: Annotated[Optional[int], "Filter by priority level (1-5), omit for all priorities"] = None,
+        completed: Annotated[bool, "Filter by completion status (default: false for incomplete todos)"] = False) -> list:
+    """Get todos filtered by priority level (1=low to 5=high) and completion status"""
+    return db.get_todos_by_priority(priority, completed)
+
+
+@tool(group='todos', read_only=True)
+def get_overdue_todos() -> list:
+    """Get all todos that are overdue and not yet completed"""
+    return db.get_overdue_todos()
+
+
+@tool(group='todos', read_only=True)
+def get_upcoming_todos(days: Annotated[int, "Number of days to look ahead (default: 7)"] = 7) -> list:
+    """Get todos due within a specified number of days"""
+    return db.get_upcoming_todos(days)
+
+
+@tool(group='todos', read_only=True)
+def get_all_todos() -> list:
+    """Get all incomplete todos, regardless of due date"""
+    return db.get_all_todos()
+
+
+@tool(group='goals', read_only=True)
+def get_goals(completed: Annotated[bool, "Filter by completion status (default: false for incomplete goals)"] = False) -> list:
+    """Get all goals, optionally filtered by completion status"""
+    return db.get_goals(completed)
+
+
+@tool(group='goals', read_only=True)
+def get_goal_details(goal_id: Annotated[int, "The ID of the goal to retrieve"]) -> Optional[dict]:
+    """Get detailed information about a specific goal including attached todos and events"""
+    return db.get_goal_details(goal_id)
+
+
+@tool(group='notes', read_only=True)
+def get_notes() -> list:
+    """Get all notes"""
+    return db.get_notes()
+
+
+# Adding items
+
+@tool(group='calendar')
+def add_event(
+        title: Annotated[str, "Event title"],
+        date: Annotated[str, "Event date in ISO format (e.g., 2026-02-08T14:00:00)"],
+        end: Annotated[Optional[str], "Event end time in ISO format (optional; events without one are assumed to last an hour)"] = None,
+        description: Annotated[str, "Event description (optional)"] = "",
+        tags: Annotated[Optional[List[str]], "Tags for the event (optional)"] = None,
+        check_conflicts: CheckConflicts = True,
+        recurrence: Recurrence = None,
+        on_duplicate: OnDuplicate = None) -> dict:
+    """Add a new event to the calendar"""
+    try:
+        dt = datetime.fromisoformat(date)
+        duplicates = db.find_duplicates("event", title, dt)
+        event = db.add_event(
+            title=title,
+            date=dt,
+            end=_parse(end),
+            description=description,
+            tags=tags or [],
+            recurrence=parse_recurrence(recurrence),
+            on_duplicate=on_duplicate
+        )
+        result = {"success": True, "event": db._serialize_event(event), "message": f"Event '{title}' added successfully"}
+        _add_duplicates(result, "event", event.id, duplicates)
+        if check_conflicts and not result.get("merged"):
+            _add_conflicts(result, db.get_conflicts_for_event(event.id))
+        return result
+    except DuplicateError as e:
+        return _duplicate_result(e)
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid event: {str(e)}. Dates must use ISO format (e.g., 2026-02-10T14:00:00)"}
+
+
+@tool(group='todos')
+def add_todo(
+        title: Annotated[str, "Todo title"],
+        description: Annotated[str, "Todo description (optional)"] = "",
+        priority: Annotated[int, "Priority level 1-5 (1=low, 5=high). Default is 3."] = 3,
+        due_date: Annotated[Optional[str], "Due date in ISO format (e.g., 2026-02-15T17:00:00) (optional)"] = None,
+        tags: Annotated[Optional[List[str]], "Tags for the todo (optional)"] = None,
+        recurrence: Recurrence = None,
+        on_duplicate: OnDuplicate = None) -> dict:
+    """Add a new todo item"""
+    try:
+        duplicates = db.find_duplicates("todo", title)
+        todo = db.add_todo(
+            title=title,
+            description=description,
+            priority=priority,
+            due_date=_parse(due_date),
+            tags=tags or [],
+            recurrence=parse_recurrence(recurrence),
+            on_duplicate=on_duplicate
+        )
+        result = {"success": True, "todo": db._serialize_todo(todo), "message": f"Todo '{title}' added successfully"}
+        _add_duplicates(result, "todo", todo.id, duplicates)
+        return result
+    except DuplicateError as e:
+        return _duplicate_result(e)
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid todo: {str(e)}. Dates must use ISO format (e.g., 2026-02-15T17:00:00)"}
+
+
+@tool(group='goals')
+def add_goal(
+        title: Annotated[str, "Goal title"],
+        description: Annotated[str, "Goal description (optional)"] = "",
+        priority: Annotated[int, "Priority level 1-5 (1=low, 5=high). Default is 3."] = 3,
+        due_date: Annotated[Optional[str], "Due date in ISO format (e.g., 2026-02-28T23:59:59) (optional)"] = None,
+        tags: Annotated[Optional[List[str]], "Tags for the goal (optional)"] = None,
+        on_duplicate: OnDuplicate = None) -> dict:
+    """Add a new goal"""
+    try:
+        duplicates = db.find_duplicates("goal", title)
+        goal = db.add_goal(
+            title=title,
+            description=description,
+            priority=priority,
+            due_date=_parse(due_date),
+            tags=tags or [],
+            on_duplicate=on_duplicate
+        )
+        result = {"success": True, "goal": db._serialize_goal(goal), "message": f"Goal '{title}' added successfully"}
+        _add_duplicates(result, "goal", goal.id, duplicates)
+        return result
+    except DuplicateError as e:
+        return _duplicate_result(e)
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-28T23:59:59)"}
+
+
+@tool(group='notes')
+def add_note(
+        title: Annotated[str, "Note title"],
+        type: Annotated[str, "Note type (e.g., 'general', 'idea', 'research', 'reminder')"],
+        content: Annotated[str, "Note content"]) -> dict:
+    """Add a new note"""
+    note = db.add_note(title=title, type=type, content=content)
+    return {"success": True, "note": db._serialize_note(note), "message": f"Note '{title}' added successfully"}
+
+
+# Deleting items
+
+@tool(group='calendar')
+def delete_event(event_id: Annotated[int, "The ID of the event to delete"]) -> dict:
+    """Delete a specific event by ID"""
+    return _deleted("Event", event_id, db.delete_event(event_id))
+
+
+@tool(group='calendar')
+def delete_events_this_week() -> dict:
+    """Delete all events scheduled for this week"""
+    count = db.delete_events_this_week()
+    return {"success": True, "message": f"Deleted {count} event(s) from this week's schedule"}
+
+
+@tool(group='todos')
+def delete_todo(todo_id: Annotated[int, "The ID of the todo to delete"]) -> dict:
+    """Delete a specific todo by ID"""
+    return _deleted("Todo", todo_id, db.delete_todo(todo_id))
+
+
+@tool(group='goals')
+def delete_goal(goal_id: Annotated[int, "The ID of the goal to delete"]) -> dict:
+    """Delete a specific goal by ID"""
+    return _deleted("Goal", goal_id, db.delete_goal(goal_id))
+
+
+@tool(group='notes')
+def delete_note(note_id: Annotated[int, "The ID of the note to delete"]) -> dict:
+    """Delete a specific note by ID"""
+    return _deleted("Note", note_id, db.delete_note(note_id))
+
+
+# Updating items
+
+@tool(group='todos')
+def update_todo(
+        todo_id: Annotated[int, "The ID of the todo to update"],
+        title: Annotated[Optional[str], "New title (optional)"] = None,
+        description: Annotated[Optional[str], "New description (optional)"] = None,
+        priority: Annotated[Optional[int], "New priority 1-5 (optional)"] = None,
+        due_date: Annotated[Optional[str], "New due date in ISO format (optional)"] = None,
+        tags: Annotated[Optional[List[str]], "New tags (optional)"] = None,
+        completed: Annotated[Optional[bool], "Mark as completed/incomplete (optional). Completing a recurring todo advances it to its next occurrence."] = None,
+        recurrence: Recurrence = None) -> dict:
+    """Update a todo's fields (title, description, priority, due date, tags, etc). Preserves all links and notes."""
+    try:
+        updated_todo = db.update_todo(
+            todo_id=todo_id,
+            title=title,
+            description=description,
+            priority=priority,
+            due_date=_parse(due_date),
+            tags=tags,
+            completed=completed,
+            recurrence=parse_recurrence(recurrence)
+        )
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-15T17:00:00)"}
+    if updated_todo:
+        return {"success": True, "todo": updated_todo, "message": f"Todo {todo_id} updated successfully"}
+    return {"success": False, "message": f"Todo {todo_id} not found"}
+
+
+@tool(group='goals')
+def update_goal(
+        goal_id: Annotated[int, "The ID of the goal to update"],
+        title: Annotated[Optional[str], "New title (optional)"] = None,
+        description: Annotated[Optional[str], "New description (optional)"] = None,
+        priority: Annotated[Optional[int], "New priority 1-5 (optional)"] = None,
+        due_date: Annotated[Optional[str], "New due date in ISO format (optional)"] = None,
+        tags: Annotated[Optional[List[str]], "New tags (optional)"] = None,
+        completed: Annotated[Optional[bool], "Mark as completed/incomplete (optional)"] = None) -> dict:
+    """Update a goal's fields (title, description, priority, due date, tags, etc). Preserves all links and notes."""
+    try:
+        updated_goal = db.update_goal(
+            goal_id=goal_id,
+            title=title,
+            description=description,
+            priority=priority,
+            due_date=_parse(due_date),
+            tags=tags,
+            completed=completed
+        )
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid date format: {str(e)}. Please use ISO format (e.g., 2026-02-28T23:59:59)"}
+    if updated_goal:
+        return {"success": True, "goal": updated_goal, "message": f"Goal {goal_id} updated successfully"}
+    return {"success": False, "message": f"Goal {goal_id} not found"}
+
+
+@tool(group='calendar')
+def update_event(
+        event_id: Annotated[int, "The ID of the event to update"],
+        title: Annotated[Optional[str], "New title (optional)"] = None,
+        description: Annotated[Optional[str], "New description (optional)"] = None,
+        date: Annotated[Optional[str], "New date in ISO format (optional)"] = None,
+        end: Annotated[Optional[str], "New end time in ISO format (optional)"] = None,
+        tags: Annotated[Optional[List[str]], "New tags (optional)"] = None,
+        check_conflicts: CheckConflicts = True,
+        recurrence: Recurrence = None) -> dict:
+    """Update an event's fields (title, description, date, tags, etc). Preserves all links and notes."""
+    try:
+        updated_event = db.update_event(
+            event_id=event_id,
+            title=title,
+            description=description,
+            date=_parse(date),
+            end=_parse(end),
+            tags=tags,
+            recurrence=parse_recurrence(recurrence)
+        )
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid date format: {str(e)}. {ISO_HINT}"}
+    if not updated_event:
+        return {"success": False, "message": f"Event {event_id} not found"}
+    result = {"success": True, "event": updated_event, "message": f"Event {event_id} updated successfully"}
+    if check_conflicts:
+        _add_conflicts(result, db.get_conflicts_for_event(event_id))
+    return result
+
+
+@tool(group='calendar')
+def update_event_occurrence(
+        event_id: Annotated[int, "The ID of the recurring event"],
+        occurrence: Annotated[str, "Original start of the occurrence in ISO format (the 'occurrence' field in query results)"],
+        cancel: Annotated[bool, "Cancel this occurrence (default: false)"] = False,
+        date: Annotated[Optional[str], "New start for this occurrence in ISO format (optional)"] = None,
+        title: Annotated[Optional[str], "New title for this occurrence (optional)"] = None,
+        description: Annotated[Optional[str], "New description for this occurrence (optional)"] = None) -> dict:
+    """Cancel or change a single occurrence of a recurring event without affecting the rest of the series"""
+    try:
+        original = datetime.fromisoformat(occurrence)
+        if cancel:
+            override = None
+        else:
+            override = {k: v for k, v in (("date", date), ("title", title), ("description", description)) if v}
+            if override.get("date"):
+                override["date"] = datetime.fromisoformat(override["date"]).isoformat()
+        if db.set_occurrence_exception('event', event_id, original, override):
+            action = "cancelled" if override is None else "updated"
+            return {"success": True, "message": f"Occurrence {original.isoformat()} of event {event_id} {action}"}
+        return {"success": False, "message": f"Recurring event {event_id} not found"}
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid date format: {str(e)}. {ISO_HINT}"}
+
+
+# Links
+
+@tool(group='links')
+def link_todo_to_goal(
+        todo_id: Annotated[int, "The ID of the todo to link"],
+        goal_id: Annotated[int, "The ID of the goal"]) -> dict:
+    """Link a todo to a goal, indicating the todo contributes to the goal"""
+    todo = db._get_entity('todo', todo_id)
+    goal = db._get_entity('goal', goal_id)
+    if not (todo and goal):
+        return {"success": False, "message": f"Todo {todo_id} or Goal {goal_id} not found"}
+    db.create_link('goal', goal_id, 'todo', todo_id)
+    return {"success": True, "message": f"Linked todo '{todo.title}' to goal '{goal.title}'"}
+
+
+@tool(group='links')
+def link_todo_to_todo(
+        parent_todo_id: Annotated[int, "The ID of the parent todo"],
+        subtask_id: Annotated[int, "The ID of the subtask"]) -> dict:
+    """Link a todo to another todo as a subtask or related task"""
+    parent = db._get_entity('todo', parent_todo_id)
+    subtask = db._get_entity('todo', subtask_id)
+    if not (parent and subtask):
+        return {"success": False, "message": f"Todo {parent_todo_id} or Todo {subtask_id} not found"}
+    db.create_link('todo', parent_todo_id, 'todo', subtask_id)
+    return {"success": True, "message": f"Linked '{subtask.title}' as subtask of '{parent.title}'"}
+
+
+@tool(group='links')
+def link_event_to_goal(
+        event_id: Annotated[int, "The ID of the event to link"],
+        goal_id: Annotated[int, "The ID of the goal"]) -> dict:
+    """Link an event to a goal, indicating the event contributes to the goal"""
+    event = db._get_entity('event', event_id)
+    goal = db._get_entity('goal', goal_id)
+    if not (event and goal):
+        return {"success": False, "message": f"Event {event_id} or Goal {goal_id} not found"}
+    db.create_link('goal', goal_id, 'event', event_id)
+    return {"success": True, "message": f"Linked event '{event.title}' to goal '{goal.title}'"}
+
+
+@tool(group='links')
+def link_todo_to_event(
+        todo_id: Annotated[int, "The ID of the todo"],
+        event_id: Annotated[int, "The ID of the event"]) -> dict:
+    """Link a todo to an event, indicating they are related"""
+    todo = db._get_entity('todo', todo_id)
+    event = db._get_entity('event', event_id)
+    if not (todo and event):
+        return {"success": False, "message": f"Todo {todo_id} or Event {event_id} not found"}
+    db.create_link('todo', todo_id, 'event', event_id)
+    return {"success": True, "message": f"Linked todo '{todo.title}' to event '{event.title}'"}
+
+
+@tool(group='links')
+def link_goal_to_goal(
+        parent_goal_id: Annotated[int, "The ID of the parent goal"],
+        subgoal_id: Annotated[int, "The ID of the sub-goal"]) -> dict:
+    """Link a goal to another goal as a sub-goal"""
+    parent_goal = db._get_entity('goal', parent_goal_id)
+    subgoal = db._get_entity('goal', subgoal_id)
+    if not (parent_goal and subgoal):
+        return {"success": False, "message": f"Goal {parent_goal_id} or Goal {subgoal_id} not found"}
+    db.create_link('goal', parent_goal_id, 'goal', subgoal_id)
+    return {"success": True, "message": f"Linked '{subgoal.title}' as sub-goal of '{parent_goal.title}'"}
+
+
+@tool(group='links')
+def link_todo_to_note(
+        todo_id: Annotated[int, "The ID of the todo"],
+        note_id: Annotated[int, "The ID of the note"]) -> dict:
+    """Link a todo to a note for reference or documentation"""
+    todo = db._get_entity('todo', todo_id)
+    note = next((n for n in db.notes if n.id == note_id), None)
+    if not (todo and note):
+        return {"success": False, "message": f"Todo {todo_id} or Note {note_id} not found"}
+    db.create_link('todo', todo_id, 'note', note_id)
+    return {"success": True, "message": f"Linked todo '{todo.title}' to note '{note.title}'"}
+
+
+@tool(group='links')
+def unlink_items(
+        from_type: Annotated[str, "Type of the source item (todo, goal, event, note)"],
+        from_id: Annotated[int, "ID of the source item"],
+        to_type: Annotated[str, "Type of the target item (todo, goal, event, note)"],
+        to_id: Annotated[int, "ID of the target item"]) -> dict:
+    """Remove a link between two items"""
+    link = next((l for l in db.links if l.from_type == from_type and l.from_id == from_id
+                 and l.to_type == to_type and l.to_id == to_id), None)
+    if not link:
+        return {"success": False, "message": f"No link found between {from_type} {from_id} and {to_type} {to_id}"}
+    if db.delete_link(link.id):
+        return {"success": True, "message": f"Unlinked {from_type} {from_id} from {to_type} {to_id}"}
+    return {"success": False, "message": "Error removing link"}
+
+
+@tool(group='links', read_only=True)
+def get_linked_items(
+        item_type: Annotated[str, "Type of the item (todo, goal, event, note)"],
+        item_id: Annotated[int, "ID of the item"]) -> dict:
+    """Get all items linked to a specific item"""
+    # Lookup dictionaries for O(1) access by type and id
+    items = {
+        'todo': {t.id: t for t in db.todos},
+        'goal': {g.id: g for g in db.goals},
+        'event': {e.id: e for e in db.events},
+        'note': {n.id: n for n in db.notes},
+    }
+
+    result_outgoing = []
+    for link in db.get_links_from(item_type, item_id):
+        item = items.get(link.to_type, {}).get(link.to_id)
+        if item:
+            result_outgoing.append({
+                "relationship": f"{item_type} -> {link.to_type}",
+                "type": link.to_type,
+                "id": link.to_id,
+                "title": getattr(item, 'title', 'N/A')
+            })
+
+    result_incoming = []
+    for link in db.get_links_to(item_type, item_id):
+        item = items.get(link.from_type, {}).get(link.from_id)
+        if item:
+            result_incoming.append({
+                "relationship": f"{link.from_type} -> {item_type}",
+                "type": link.from_type,
+                "id": link.from_id,
+                "title": getattr(item, 'title', 'N/A')
+            })
+
+    return {
+        "item": {
+            "type": item_type,
+            "id": item_id
+        },
+        "links_from": result_outgoing,
+        "links_to": result_incoming
+    }
+
+
+# Dependent notes
+
+def _extract_tokens(text: str) -> List[str]:
+    tokens = []
+    for part in text.replace('/', ' ').replace('-', ' ').split():
+        t = ''.join(ch for ch in part if ch.isalnum()).lower()
+        if len(t) >= 3 and not t.isnumeric():
+            tokens.append(t)
+    return tokens
+
+
+def _parent_candidates(title: str, content: str, parent_type: str) -> dict:
+    """Items the AI may have meant when a dependent note's parent id is wrong: by tag first, then by title."""
+    candidates = {}
+
+    # Build simple token candidates from title/content to use as tag searches.
+    tag_tokens = []
+    if title:
+        tag_tokens.extend(_extract_tokens(title))
+    if content:
+        tag_tokens.extend(_extract_tokens(content))
+    # Deduplicate while preserving order, limit to first 6 tokens
+    tag_tokens = list(dict.fromkeys(tag_tokens))[:6]
+
+    # Try tag-based searches across all types (preferred)
+    tag_matches = {}
+    try:
+        for tk in tag_tokens:
+            res = db.search_all_by_tag(tk)
+            # Only include tokens that returned something
+            if any(res.values()):
+                tag_matches[tk] = res
+    except Exception:
+        tag_matches = {}
+
+    # If no tag matches found, fall back to title-based searches using short phrases
+    title_matches = {}
+    if not tag_matches:
+        # Build short title phrases (title and first sentence fragment)
+        search_terms = []
+        if title:
+            search_terms.append(title)
+        if content:
+            first_sentence = content.split('.', 1)[0]
+            if first_sentence and first_sentence not in search_terms:
+                search_terms.append(first_sentence[:40])
+
+        searches = {
+            'todo': {'todos_by_title': db.search_todos_by_title},
+            'goal': {'goals_by_title': db.search_goals_by_title},
+            'event': {'events_by_title': db.search_events_by_title},
+        }.get(parent_type, {
+            'todos_by_title': db.search_todos_by_title,
+            'goals_by_title': db.search_goals_by_title,
+            'events_by_title': db.search_events_by_title,
+        })
+        try:
+            for key, search in searches.items():
+                title_matches[key] = [match for t in search_terms for match in search(t)]
+        except Exception:
+            title_matches = {}
+
+    # Combine candidates preferring tag matches
+    if tag_matches:
+        candidates['by_tag'] = tag_matches
+    if title_matches:
+        candidates['by_title'] = title_matches
+    return candidates
+
+
+@tool(group='notes')
+def add_dependent_note(
+        title: Annotated[str, "Note title"],
+        content: Annotated[str, "Note content"],
+        parent_type: Annotated[str, "Type of parent item (event, todo, goal, or note)"],
+        parent_id: Annotated[int, "ID of the parent item"]) -> dict:
+    """Add a note attached to an event, todo, goal, or another note. The note will be deleted if the parent is deleted."""
+    try:
+        note = db.add_dependent_note(title, content, parent_type, parent_id)
+    except ValueError as e:
+        # Parent not found: return candidate matches so the AI can confirm the correct id before retrying
+        return {
+            "success": False,
+            "message": str(e),
+            "hint": "Parent id not found. Confirm the correct parent id before retrying, or pick from candidates.",
+            "candidates": _parent_candidates(title, content, parent_type)
+        }
+    return {"success": True, "note": {
+        "id": note.id,
+        "title": note.title,
+        "content": note.content,
+        "parent_type": note.parent_type,
+        "parent_id": note.parent_id
+    }, "message": f"Note '{title}' attached to {parent_type} {parent_id}"}
+
+
+@tool(group='notes', read_only=True)
+def get_dependent_notes(
+        parent_type: Annotated[str, "Type of parent item (event, todo, goal, note)"],
+        parent_id: Annotated[int, "ID of the parent item"]) -> dict:
+    """Get dependent notes for a specific item"""
+    return {"notes": db.get_dependent_notes(parent_type, parent_id)}
+
+
+@tool(group='notes')
+def delete_dependent_note(note_id: Annotated[int, "The ID of the dependent note to delete"]) -> dict:
+    """Delete a dependent note by ID"""
+    return _deleted("Dependent note", note_id, db.delete_dependent_note(note_id))
+
+
+# Search
+
+@tool(group='search', read_only=True)
+def search_todos_by_title(title: TitleQuery) -> list:
+    """Search for todos by title (partial match, case-insensitive)"""
+    return db.search_todos_by_title(title)
+
+
+@tool(group='search', read_only=True)
+def search_goals_by_title(title: TitleQuery) -> list:
+    """Search for goals by title (partial match, case-insensitive)"""
+    return db.search_goals_by_title(title)
+
+
+@tool(group='search', read_only=True)
+def search_events_by_title(title: TitleQuery) -> list:
+    """Search for events by title (partial match, case-insensitive)"""
+    return db.search_events_by_title(title)
+
+
+@tool(group='search', read_only=True)
+def search_todos_by_tag(tag: TagQuery) -> list:
+    """Search todos by tag (PRIMARY search method). Returns all todos with the specified tag."""
+    return db.search_todos_by_tag(tag)
+
+
+@tool(group='search', read_only=True)
+def search_goals_by_tag(tag: TagQuery) -> list:
+    """Search goals by tag (PRIMARY search method). Returns all goals with the specified tag."""
+    return db.search_goals_by_tag(tag)
+
+
+@tool(group='search', read_only=True)
+def search_events_by_tag(tag: TagQuery) -> list:
+    """Search events by tag (PRIMARY search method). Returns all events with the specified tag."""
+    return db.search_events_by_tag(tag)
+
+
+@tool(group='search', read_only=True)
+def search_all_by_tag(tag: Annotated[str, "Tag to search for across all item types (case-insensitive, e.g., 'apartment', 'rent', 'urgent')"]) -> dict:
+    """Search todos, goals, and events by tag simultaneously (PRIMARY search method). Most efficient way to find all items related to a topic."""
+    return db.search_all_by_tag(tag)
+
+
+# Tool definitions sent to the API, generated once from the registry
+TOOLS = tool_schemas()
@@ -115,22 +115,20 @@ def attach_event_to_goal(event_id: int, goal_id: int):
         print(f"✗ Event or goal not found")
 
 def complete_todo(todo_id: int):
-    """Mark a todo as completed."""
-    todo = next((t for t in db.todos if t.id == todo_id), None)
-    if todo:
-        todo.completed = True
-        db.save()
-        print(f"✓ Completed: {todo.title}")
+    """Mark a todo as completed (a recurring one moves on to its next occurrence)."""
+    todo = db.update_todo(todo_id, completed=True)
+    if todo and not todo['completed']:
+        print(f"✓ Completed: {todo['title']} (next due {todo['due_date']})")
+    elif todo:
+        print(f"✓ Completed: {todo['title']}")
     else:
         print(f"✗ Todo {todo_id} not found")
 
 def complete_goal(goal_id: int):
     """Mark a goal as completed."""
-    goal = next((g for g in db.goals if g.id == goal_id), None)
+    goal = db.update_goal(goal_id, completed=True)
     if goal:
-        goal.completed = True
-        db.save()
-        print(f"✓ Completed: {goal.title}")
+        print(f"✓ Completed: {goal['title']}")
     else:
         print(f"✗ Goal {goal_id} not found")
 